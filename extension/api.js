@@ -99,6 +99,8 @@ export async function login(username, password) {
   if (jwtObj.access) await storage.set('accessToken', jwtObj.access);
   if (jwtObj.refresh) await storage.set('refreshToken', jwtObj.refresh);
   await storage.set('jwt', jwtObj);
+  // the synced labels/templates belong to whoever was logged in before
+  await clearSyncState();
 
   return data;
 }
@@ -196,16 +198,11 @@ function headersContentType(providedHeaders = {}) {
    --------------------------- */
 
 /**
- * GET all labels
+ * All labels, from the local copy brought up to date by syncLocal()
  */
 export async function pullLabels(token = null) {
-  const res = await authFetch(`${BASE}/labels/`, { method: "GET" }, token);
-  if (!res.ok) {
-    // surface auth_required specially if thrown earlier
-    if (res.status === 401) throw new Error('auth_required');
-    throw new Error(`Pull labels failed: ${res.status}`);
-  }
-  return res.json();
+  const { labels } = await syncLocal(token);
+  return labels;
 }
 
 /**
@@ -272,13 +269,12 @@ export async function deleteLabel(rawId, token = null) {
    Template endpoints (CRUD)
    --------------------------- */
 
+/**
+ * All templates, from the local copy brought up to date by syncLocal()
+ */
 export async function fetchTemplates(token = null) {
-  const res = await authFetch(`${BASE}/templates/`, { method: "GET" }, token);
-  if (!res.ok) {
-    if (res.status === 401) throw new Error('auth_required');
-    throw new Error(`Fetch templates failed: ${res.status}`);
-  }
-  return res.json();
+  const { templates } = await syncLocal(token);
+  return templates;
 }
 
 export async function fetchTemplate(id, token = null) {
@@ -327,3 +323,64 @@ export async function deleteTemplate(id, token = null) {
   }
   return true;
 }
+
+/* ---------------------------
+   Delta sync (labels + templates)
+   --------------------------- */
+
+/**
+ * GET changes since the cursor stored from the last sync (null = everything).
+ * Returns { cursor, full, labels, templates, deleted: { labels, templates } };
+ * when `full` is true the caller should replace its local copy.
+ */
+export async function syncChanges(since = null, token = null) {
+  const url = since ? `${BASE}/sync/?since=${encodeURIComponent(since)}` : `${BASE}/sync/`;
+  const res = await authFetch(url, { method: "GET" }, token);
+  if (!res.ok) {
+    if (res.status === 401) throw new Error('auth_required');
+    throw new Error(`Sync failed: ${res.status}`);
+  }
+  return res.json();
+}
+
+/* Local copy of the synced rows, kept under SYNC_KEY as
+   { cursor, labels, templates } and sorted the way the list endpoints do. */
+const SYNC_KEY = 'syncState';
+let syncInFlight = null;
+
+function applyChanges(rows, changed, deletedIds, full) {
+  const byId = new Map((full ? [] : rows || []).map(row => [row.id, row]));
+  (changed || []).forEach(row => byId.set(row.id, row));
+  (deletedIds || []).forEach(id => byId.delete(id));
+  return [...byId.values()];
+}
+
+/**
+ * Bring the local copy up to date with one /sync/ call and return it.
+ * Concurrent callers (labels and templates on the same page) share the call.
+ */
+export function syncLocal(token = null) {
+  if (!syncInFlight) {
+    syncInFlight = (async () => {
+      const state = (await storage.get(SYNC_KEY)) || { cursor: null, labels: [], templates: [] };
+      const changes = await syncChanges(state.cursor, token);
+      const deleted = changes.deleted || {};
+      const labels = applyChanges(state.labels, changes.labels, deleted.labels, changes.full)
+        .sort((a, b) => (a.position - b.position) || (a.id - b.id));
+      // a renamed label doesn't touch its templates, keep label_name in step here
+      const labelNames = new Map(labels.map(label => [label.id, label.name]));
+      const templates = applyChanges(state.templates, changes.templates, deleted.templates, changes.full)
+        .map(t => (labelNames.has(t.label) ? { ...t, label_name: labelNames.get(t.label) } : t))
+        .sort((a, b) => (Date.parse(b.updated_at) || 0) - (Date.parse(a.updated_at) || 0));
+      const next = { cursor: changes.cursor, labels, templates };
+      await storage.set(SYNC_KEY, next);
+      return next;
+    })().finally(() => { syncInFlight = null; });
+  }
+  return syncInFlight;
+}
+
+/* Drop the local copy (another user logs in, or the current one logs out) */
+export async function clearSyncState() {
+  await storage.remove(SYNC_KEY);
+}
@@ -25,7 +25,7 @@ chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
       try {
         safeLog("[BG] starting logout flow");
 
-        chrome.storage.local.remove(["jwt", "access_token", "refresh_token", "labels"], () => {
+        chrome.storage.local.remove(["jwt", "access_token", "refresh_token", "labels", "syncState"], () => {
           if (chrome.runtime.lastError) {
             console.error("[BG] storage.remove error:", chrome.runtime.lastError);
             sendResponse({ success: false, error: chrome.runtime.lastError.message });
@@ -232,7 +232,7 @@ document.addEventListener("DOMContentLoaded", () => {
           console.log("[CRM] Token saved to storage.");
         
           // 1) Remove any stale labels
-          chrome.storage.local.remove(["labels"], () => {
+          chrome.storage.local.remove(["labels", "syncState"], () => {
             console.log("[CRM] Old labels cleared");
         
             // 2) Now show the labels UI and fetch fresh labels
@@ -450,7 +450,7 @@ document.addEventListener("DOMContentLoaded", () => {
       try {
         await new Promise((resolve) =>
           chrome.storage.local.remove(
-            ["access_token", "refresh_token", "labels", "jwt"],
+            ["access_token", "refresh_token", "labels", "jwt", "syncState"],
             () => resolve(chrome.runtime.lastError || null)
           )
         );
@@ -83,6 +83,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     "src.crm",
     'src.auth_app',
@@ -236,6 +237,28 @@ ALLOWED_HOSTS = ["*"]
 
 
 
+# === Cache (dashboard metrics, see crm.caching) ===
+# Without REDIS_URL every worker process gets its own local-memory cache, so
+# invalidations only reach the process that made them. Set REDIS_URL (needs
+# the `redis` package) wherever more than one worker runs.
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            # per-item entries (composed messages) outgrow the default 300
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+
 # === Password reset token lifetime (1 hour) ===
 PASSWORD_RESET_TIMEOUT = 60 * 60  # seconds
 
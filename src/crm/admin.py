@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Lead, Campaign, Label, Tag
+from .models import Lead, LeadDuplicate, Campaign, Label, Tag
+from .search import search_leads
 
 @admin.register(Campaign)
 class CampaignAdmin(admin.ModelAdmin):
@@ -9,8 +10,22 @@ class CampaignAdmin(admin.ModelAdmin):
 @admin.register(Lead)
 class LeadAdmin(admin.ModelAdmin):
     list_display = ("id", "name", "email", "status", "owner", "campaign", "created_at")
-    list_filter = ("status", "campaign")
-    search_fields = ("name", "email", "owner__username")
+    list_filter = ("status", "is_archived", "campaign")
+    # the search box goes through the search_vector GIN index, see crm.search
+    search_fields = ("name", "email")
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search_leads(queryset, search_term), False
+
+
+@admin.register(LeadDuplicate)
+class LeadDuplicateAdmin(admin.ModelAdmin):
+    list_display = ("id", "lead", "candidate", "score", "reason", "status", "created_at")
+    list_filter = ("status", "reason")
+    list_select_related = ("lead", "candidate")
+    raw_id_fields = ("lead", "candidate")
 
 
 @admin.register(Label)
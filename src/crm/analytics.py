@@ -0,0 +1,117 @@
+# src/crm/analytics.py
+"""
+Campaign performance: cost per lead, won / lost conversion and daily lead
+inflow, all computed by Postgres in one statement (aggregates with FILTER,
+generate_series for the day axis, window functions for the running total
+and 7-day average) and cached per campaign.
+
+Leads already moved to the archive table still count, so archiving never
+rewrites a campaign's history. Invalidation follows crm.dashboard: signals
+for ORM saves/deletes, direct calls from the bulk paths.
+"""
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from . import caching
+
+CACHE_TIMEOUT = 15 * 60
+
+# imports / merges can move leads between any campaigns
+GLOBAL_SCOPE = "campaign-analytics"
+
+ANALYTICS_SQL = """
+    WITH campaign AS (
+        SELECT id, budget, start_date, end_date FROM crm_campaign
+        WHERE id = %(campaign)s AND owner_id = %(owner)s
+    ), leads AS (
+        SELECT status, (created_at AT TIME ZONE %(tz)s)::date AS day
+        FROM crm_lead WHERE campaign_id = %(campaign)s
+        UNION ALL
+        SELECT status, (created_at AT TIME ZONE %(tz)s)::date AS day
+        FROM crm_archivedlead WHERE campaign_id = %(campaign)s
+    ), totals AS (
+        SELECT count(*) AS leads,
+               count(*) FILTER (WHERE status = 'won') AS won,
+               count(*) FILTER (WHERE status = 'lost') AS lost,
+               min(day) AS first_day,
+               max(day) AS last_day
+        FROM leads
+    ), per_day AS (
+        SELECT day, count(*) AS leads FROM leads GROUP BY day
+    ), inflow AS (
+        SELECT d::date AS day,
+               COALESCE(p.leads, 0) AS leads,
+               sum(COALESCE(p.leads, 0)) OVER w_all AS cumulative,
+               round(avg(COALESCE(p.leads, 0)) OVER w_week, 2) AS avg_7d
+        FROM campaign c, totals t,
+             generate_series(
+                 LEAST(c.start_date, t.first_day),
+                 GREATEST(t.last_day, LEAST(COALESCE(c.end_date, %(today)s), %(today)s)),
+                 interval '1 day'
+             ) AS d
+        LEFT JOIN per_day p ON p.day = d::date
+        WINDOW w_all AS (ORDER BY d),
+               w_week AS (ORDER BY d ROWS BETWEEN 6 PRECEDING AND CURRENT ROW)
+    )
+    SELECT c.budget,
+           t.leads, t.won, t.lost,
+           round(c.budget / NULLIF(t.leads, 0), 2) AS cost_per_lead,
+           round(c.budget / NULLIF(t.won, 0), 2) AS cost_per_won,
+           round(t.won::numeric / NULLIF(t.leads, 0), 4) AS won_rate,
+           round(t.lost::numeric / NULLIF(t.leads, 0), 4) AS lost_rate,
+           round(t.won::numeric / NULLIF(t.won + t.lost, 0), 4) AS win_rate_closed,
+           COALESCE(
+               (SELECT json_agg(json_build_object(
+                           'day', i.day, 'leads', i.leads,
+                           'cumulative', i.cumulative, 'avg_7d', i.avg_7d
+                       ) ORDER BY i.day)
+                FROM inflow i),
+               '[]'::json
+           ) AS daily
+    FROM campaign c, totals t
+"""
+
+COLUMNS = [
+    "budget", "leads", "won", "lost", "cost_per_lead", "cost_per_won",
+    "won_rate", "lost_rate", "win_rate_closed", "daily",
+]
+
+
+def _campaign_scope(campaign_id):
+    return f"campaign-analytics:{campaign_id}"
+
+
+def invalidate_campaign_analytics(*campaign_ids):
+    caching.invalidate(*(_campaign_scope(pk) for pk in set(campaign_ids) if pk is not None))
+
+
+def invalidate_all_campaign_analytics():
+    caching.invalidate(GLOBAL_SCOPE)
+
+
+def compute_analytics(campaign_id, owner_id):
+    """Analytics for one of `owner_id`'s campaigns, None if there's no such campaign."""
+    params = {
+        "campaign": campaign_id,
+        "owner": owner_id,
+        "tz": settings.TIME_ZONE,
+        "today": timezone.localdate(),
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(ANALYTICS_SQL, params)
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    data = dict(zip(COLUMNS, row))
+    data["campaign"] = campaign_id
+    data["generated_at"] = timezone.now()
+    return data
+
+
+def campaign_analytics(campaign_id, owner):
+    key = caching.versioned_key(
+        f"campaign-analytics:v1:{owner.pk}:{campaign_id}", GLOBAL_SCOPE, _campaign_scope(campaign_id)
+    )
+    # a missing campaign isn't cached (get_or_compute skips None)
+    return caching.get_or_compute(key, lambda: compute_analytics(campaign_id, owner.pk), CACHE_TIMEOUT)
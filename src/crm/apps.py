@@ -6,3 +6,6 @@ class CrmConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "src.crm"
 
+    def ready(self):
+        from . import signals  # noqa: F401  (connects the receivers)
+
@@ -0,0 +1,65 @@
+# src/crm/archive.py
+"""
+Move long-archived leads out of crm_lead into crm_archivedlead.
+
+Archived leads already drop out of everyday queries (Lead.objects and the
+partial indexes skip them); moving them keeps the table and its other
+indexes small too. Each chunk is one statement in its own transaction:
+pick ids (SKIP LOCKED, so live edits never wait on it), drop their tag
+links and duplicate pairs, delete the leads and insert them into the
+archive with their tag ids.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+CHUNK_SIZE = 5000
+ARCHIVE_AFTER = timedelta(days=90)
+
+MOVE_SQL = """
+    WITH batch AS (
+        SELECT id FROM crm_lead
+        WHERE is_archived AND updated_at < %(cutoff)s
+        ORDER BY id
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    ), tags AS (
+        DELETE FROM crm_lead_tags t USING batch b
+        WHERE t.lead_id = b.id
+        RETURNING t.lead_id, t.tag_id
+    ), pairs AS (
+        DELETE FROM crm_leadduplicate d USING batch b
+        WHERE d.lead_id = b.id OR d.candidate_id = b.id
+    ), moved AS (
+        DELETE FROM crm_lead l USING batch b
+        WHERE l.id = b.id
+        RETURNING l.*
+    )
+    INSERT INTO crm_archivedlead (
+        id, name, email, profile_url, source, status, owner_id, campaign_id,
+        tag_ids, notes, created_at, updated_at, archived_at
+    )
+    SELECT m.id, m.name, m.email, m.profile_url, m.source, m.status,
+           m.owner_id, m.campaign_id,
+           COALESCE((SELECT array_agg(t.tag_id ORDER BY t.tag_id)
+                     FROM tags t WHERE t.lead_id = m.id), '{}'),
+           m.notes, m.created_at, m.updated_at, now()
+    FROM moved m
+"""
+
+
+def move_archived_leads(older_than=ARCHIVE_AFTER, chunk_size=CHUNK_SIZE):
+    """
+    Move leads archived (and untouched) for longer than `older_than` into
+    ArchivedLead, `chunk_size` at a time. Returns how many were moved.
+    """
+    cutoff = timezone.now() - older_than
+    moved = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(MOVE_SQL, {"cutoff": cutoff, "limit": chunk_size})
+            count = cursor.rowcount
+        moved += count
+        if count < chunk_size:
+            return moved
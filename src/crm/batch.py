@@ -0,0 +1,153 @@
+# src/crm/batch.py
+"""
+Batch create / update / delete for leads.
+
+Every operation is validated with LeadSerializer exactly like the single-item
+endpoints, then all writes go out as one bulk_create, one bulk_update and one
+set-based delete inside a single transaction.
+"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .analytics import invalidate_campaign_analytics
+from .dashboard import invalidate_dashboard
+from .models import Lead
+from .segments import refresh_pending_on_commit
+from .serializers import LeadSerializer
+
+MAX_OPERATIONS = 1000
+OPERATIONS = ("create", "update", "delete")
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    id = serializers.IntegerField(required=False, min_value=1)
+    data = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        if attrs["op"] != "create" and "id" not in attrs:
+            raise serializers.ValidationError({"id": "This field is required."})
+        return attrs
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    """
+    { "atomic": false,
+      "operations": [
+          {"op": "create", "data": {...}},
+          {"op": "update", "id": 12, "data": {...}},   # partial update
+          {"op": "delete", "id": 13}
+      ] }
+    """
+    atomic = serializers.BooleanField(default=False)
+    operations = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=MAX_OPERATIONS
+    )
+
+
+def _result(op, pk, status, **extra):
+    return {"op": op, "id": pk, "status": status, **extra}
+
+
+def run_lead_batch(operations, queryset, context, atomic=False):
+    """
+    Apply `operations` to the leads visible through `queryset`.
+
+    Returns (results, applied): one result per operation in request order,
+    and whether anything was written. With atomic=True a single failing
+    operation means nothing is written and the valid ones come back "skipped".
+    """
+    results = [None] * len(operations)
+    parsed = []
+    for index, raw in enumerate(operations):
+        op = BatchOperationSerializer(data=raw)
+        if op.is_valid():
+            parsed.append((index, op.validated_data))
+        else:
+            results[index] = _result(raw.get("op"), raw.get("id"), "error", errors=op.errors)
+
+    target_ids = {item["id"] for _, item in parsed if item["op"] != "create"}
+
+    with transaction.atomic():
+        # one locked fetch for every lead touched by an update or delete
+        locked = queryset.select_related("owner").select_for_update(of=("self",))
+        instances = locked.in_bulk(target_ids) if target_ids else {}
+        original_owner = {pk: instance.owner_id for pk, instance in instances.items()}
+        original_campaign = {pk: instance.campaign_id for pk, instance in instances.items()}
+
+        to_create = []           # (index, unsaved Lead)
+        to_update = []           # (index, Lead)
+        to_delete = set()
+        update_fields = {"updated_at"}
+        seen_emails = set()
+
+        for index, item in parsed:
+            op, pk, data = item["op"], item.get("id"), item["data"]
+            instance = instances.get(pk)
+
+            if op != "create" and instance is None:
+                results[index] = _result(op, pk, "error", errors={"id": ["Lead not found."]})
+                continue
+            if pk in to_delete:
+                results[index] = _result(op, pk, "error", errors={"id": ["Lead is deleted earlier in this batch."]})
+                continue
+            if op == "delete":
+                to_delete.add(pk)
+                results[index] = _result(op, pk, "ok")
+                continue
+
+            serializer = LeadSerializer(instance, data=data, partial=op == "update", context=context)
+            if not serializer.is_valid():
+                results[index] = _result(op, pk, "error", errors=serializer.errors)
+                continue
+
+            # the unique validator only checks the table, not the rest of the batch
+            email = serializer.validated_data.get("email")
+            if email is not None:
+                if email in seen_emails:
+                    results[index] = _result(op, pk, "error", errors={"email": ["Duplicate email within this batch."]})
+                    continue
+                seen_emails.add(email)
+
+            if op == "create":
+                to_create.append((index, Lead(owner=context["request"].user, **serializer.validated_data)))
+            else:
+                for attr, value in serializer.validated_data.items():
+                    setattr(instance, attr, value)
+                update_fields.update(serializer.validated_data)
+                to_update.append((index, instance))
+
+        if atomic and any(r is not None and r["status"] == "error" for r in results):
+            transaction.set_rollback(True)
+            for index, raw in enumerate(operations):
+                if results[index] is None or results[index]["status"] != "error":
+                    results[index] = _result(raw.get("op"), raw.get("id"), "skipped")
+            return results, False
+
+        if to_create:
+            Lead.all_objects.bulk_create([obj for _, obj in to_create])
+        if to_update:
+            now = timezone.now()
+            for _, instance in to_update:
+                instance.updated_at = now
+            # an id updated twice in one batch is the same object, write it once
+            unique = list({instance.pk: instance for _, instance in to_update}.values())
+            Lead.all_objects.bulk_update(unique, sorted(update_fields))
+        if to_delete:
+            Lead.all_objects.filter(pk__in=to_delete).delete()
+
+    # bulk_create/bulk_update don't send signals; owner may have changed too
+    touched = {obj.owner_id for _, obj in to_create + to_update}
+    touched.update(original_owner.values())
+    if touched:
+        invalidate_dashboard(*touched)
+        refresh_pending_on_commit(*touched)
+    campaigns = {obj.campaign_id for _, obj in to_create + to_update}
+    campaigns.update(original_campaign.values())
+    invalidate_campaign_analytics(*campaigns)
+
+    for op, written in (("create", to_create), ("update", to_update)):
+        for index, obj in written:
+            results[index] = _result(op, obj.pk, "ok", data=LeadSerializer(obj, context=context).data)
+    return results, True
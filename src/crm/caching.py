@@ -0,0 +1,93 @@
+# src/crm/caching.py
+"""
+Small helpers around Django's cache for derived CRM data.
+
+  * generation counters: invalidating a scope bumps a number that is part
+    of every key in it, so stale entries are simply never read again and a
+    recomputation racing with an invalidation can't resurrect old data;
+  * single flight: on a miss only one caller recomputes, everyone else
+    waits for its result (per key lock inside the process, cache.add lock
+    across processes).
+"""
+import threading
+import time
+
+from django.core.cache import cache
+
+LOCK_TIMEOUT = 30        # seconds a recomputation may hold the cross-process lock
+WAIT_INTERVAL = 0.05     # seconds between polls while someone else recomputes
+
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+def generation(scope):
+    """Current generation of `scope`, starting at 1."""
+    value = cache.get(f"gen:{scope}")
+    if value is None:
+        cache.add(f"gen:{scope}", 1, timeout=None)
+        value = cache.get(f"gen:{scope}", 1)
+    return value
+
+
+def invalidate(*scopes):
+    """Drop every cached entry built under these scopes."""
+    for scope in scopes:
+        try:
+            cache.incr(f"gen:{scope}")
+        except ValueError:
+            cache.add(f"gen:{scope}", 2, timeout=None)
+
+
+def versioned_key(prefix, *scopes):
+    """Key for `prefix` that changes whenever any of `scopes` is invalidated."""
+    versions = ".".join(str(generation(scope)) for scope in scopes)
+    return f"{prefix}:v{versions}"
+
+
+def _local_lock(key):
+    with _local_locks_guard:
+        lock = _local_locks.get(key)
+        if lock is None:
+            lock = _local_locks[key] = threading.Lock()
+        return lock
+
+
+def get_or_compute(key, compute, timeout):
+    """
+    cache.get(key), or compute() it exactly once across concurrent callers
+    and cache it for `timeout` seconds.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    with _local_lock(key):
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+        lock_key = f"{key}:lock"
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        acquired = cache.add(lock_key, 1, timeout=LOCK_TIMEOUT)
+        while not acquired:
+            # another process is on it, wait for its result
+            time.sleep(WAIT_INTERVAL)
+            value = cache.get(key)
+            if value is not None:
+                return value
+            if time.monotonic() >= deadline:
+                break
+            acquired = cache.add(lock_key, 1, timeout=LOCK_TIMEOUT)
+
+        try:
+            value = compute()
+            cache.set(key, value, timeout)
+        finally:
+            # after a timed-out wait the lock is still the other process's
+            if acquired:
+                cache.delete(lock_key)
+
+    with _local_locks_guard:
+        _local_locks.pop(key, None)
+    return value
@@ -0,0 +1,70 @@
+# src/crm/dashboard.py
+"""
+Per-user dashboard metrics, cached until something they depend on changes.
+
+Lead counts come from the funnel summary table (crm.funnel), so even a
+recomputation never scans crm_lead. Invalidation is explicit: signals
+(crm.signals) for ORM saves/deletes, and direct calls from the bulk paths
+that bypass signals (imports, batch, merge).
+"""
+from django.utils import timezone
+
+from . import caching
+from .funnel import funnel_counts
+from .models import Campaign, Lead, LeadFunnelCount
+
+CACHE_TIMEOUT = 5 * 60
+RECENT_LIMIT = 10
+
+# campaign changes touch every user's dashboard
+GLOBAL_SCOPE = "dashboard"
+
+
+def _user_scope(owner_id):
+    return f"dashboard:user:{owner_id}"
+
+
+def invalidate_dashboard(*owner_ids):
+    caching.invalidate(*(_user_scope(owner_id) for owner_id in set(owner_ids)))
+
+
+def invalidate_all_dashboards():
+    caching.invalidate(GLOBAL_SCOPE)
+
+
+def compute_metrics(user):
+    by_status = funnel_counts(owner=user, group_by="status")
+
+    campaign_ids = (
+        LeadFunnelCount.objects.filter(owner=user, campaign__isnull=False)
+        .values_list("campaign_id", flat=True).distinct()
+    )
+    active_campaigns = list(
+        Campaign.objects.filter(id__in=campaign_ids, is_active=True)
+        .order_by("-created_at")
+        .values("id", "name", "start_date", "end_date")
+    )
+
+    recent = (
+        Lead.objects.filter(owner=user)
+        .order_by("-updated_at")
+        .values("id", "name", "status", "updated_at")[:RECENT_LIMIT]
+    )
+
+    return {
+        "leads": {
+            "total": sum(by_status.values()),
+            "by_status": by_status,
+        },
+        "active_campaigns": active_campaigns,
+        "recent_activity": list(recent),
+        "generated_at": timezone.now(),
+    }
+
+
+def dashboard_metrics(user):
+    """Cached metrics for `user`; a burst of misses recomputes only once."""
+    key = caching.versioned_key(
+        f"dashboard:{user.pk}", GLOBAL_SCOPE, _user_scope(user.pk)
+    )
+    return caching.get_or_compute(key, lambda: compute_metrics(user), CACHE_TIMEOUT)
@@ -0,0 +1,254 @@
+# src/crm/dedupe.py
+"""
+Duplicate lead detection and merging.
+
+Candidates are only ever looked for inside cheap blocks of the same owner,
+never by comparing every pair:
+
+  * same profile_url                     (lead_owner_profile_url_idx)
+  * same normalized email local part     (lead_owner_email_key_idx,
+    crm_lead_email_key(): lowercased, "+tag" and dots stripped)
+  * similar name, pg_trgm `%` operator   (lead_owner_name_trgm_idx, GiST
+    on (owner_id, name gist_trgm_ops))
+
+The scan is incremental: each run only looks at leads with an id above the
+DedupeProgress high-water mark and pairs them with older leads, so every pair
+is found exactly once, by the newer of the two. Ids are taken at INSERT but
+show up at COMMIT, so the mark stops short of leads younger than SCAN_LAG
+rather than skipping past a slow transaction's rows for good. Leads behind
+the mark whose name / email / profile_url change are queued by a crm_lead
+trigger (migration 0024) and paired again with every other lead.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .analytics import invalidate_all_campaign_analytics
+from .dashboard import invalidate_dashboard
+from .models import DedupeProgress, Lead, LeadDuplicate
+from .segments import refresh_pending_on_commit
+
+SCAN_CHUNK_SIZE = 5000
+SCAN_LAG = timedelta(minutes=5)
+NAME_SIMILARITY_THRESHOLD = 0.6
+# email local parts shared by more leads than this ("info", "contact", ...)
+# are too generic to mean anything and would blow up the block
+MAX_EMAIL_BLOCK = 50
+PROGRESS_KEY = "leads"
+
+INSERT_PAIRS = """
+    INSERT INTO crm_leadduplicate (lead_id, candidate_id, score, reason, status, created_at)
+    {select}
+    ON CONFLICT (lead_id, candidate_id) DO NOTHING
+"""
+
+# {pair} / {scope} pick the leads to scan: new ones in an id range paired
+# with older leads, or queued ones paired with any other lead. Either way the
+# newer lead of a pair goes first.
+SCAN_PAIR = "o.id < n.id"
+SCAN_SCOPE = "n.id > %(low)s AND n.id <= %(high)s"
+REQUEUE_PAIR = "o.id <> n.id"
+REQUEUE_SCOPE = "n.id = ANY(%(lead_ids)s)"
+
+PROFILE_URL_PAIRS = """
+    SELECT GREATEST(n.id, o.id), LEAST(n.id, o.id), 1.0, 'profile_url', 'pending', now()
+    FROM crm_lead n
+    JOIN crm_lead o
+      ON o.owner_id = n.owner_id AND o.profile_url = n.profile_url AND {pair}
+    WHERE {scope}
+      AND n.profile_url IS NOT NULL AND n.profile_url <> ''
+"""
+
+EMAIL_KEY_PAIRS = """
+    SELECT GREATEST(n.id, o.id), LEAST(n.id, o.id), 0.5 + 0.5 * similarity(n.name, o.name),
+           'email', 'pending', now()
+    FROM crm_lead n
+    JOIN crm_lead o
+      ON o.owner_id = n.owner_id
+     AND crm_lead_email_key(o.email) = crm_lead_email_key(n.email)
+     AND {pair}
+    WHERE {scope}
+      AND crm_lead_email_key(n.email) <> ''
+      AND (
+          SELECT count(*) FROM (
+              SELECT 1 FROM crm_lead b
+              WHERE b.owner_id = n.owner_id
+                AND crm_lead_email_key(b.email) = crm_lead_email_key(n.email)
+              LIMIT %(max_block)s + 1
+          ) AS block
+      ) <= %(max_block)s
+"""
+
+NAME_PAIRS = """
+    SELECT GREATEST(n.id, o.id), LEAST(n.id, o.id), similarity(n.name, o.name), 'name', 'pending', now()
+    FROM crm_lead n
+    JOIN crm_lead o
+      ON o.owner_id = n.owner_id AND o.name %% n.name AND {pair}
+    WHERE {scope}
+"""
+
+DRAIN_SQL = """
+    DELETE FROM crm_pendingdedupelead
+    WHERE lead_id IN (
+        SELECT lead_id FROM crm_pendingdedupelead
+        ORDER BY lead_id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING lead_id
+"""
+
+# unnest(%s, %s) below maps duplicate id -> primary id for a whole merge batch
+MERGE_MAP = "SELECT * FROM unnest(%s::bigint[], %s::bigint[]) AS m(duplicate_id, primary_id)"
+
+MERGE_TAGS = f"""
+    INSERT INTO crm_lead_tags (lead_id, tag_id)
+    SELECT m.primary_id, t.tag_id
+    FROM crm_lead_tags t
+    JOIN ({MERGE_MAP}) AS m ON t.lead_id = m.duplicate_id
+    ON CONFLICT (lead_id, tag_id) DO NOTHING
+"""
+
+# the primary keeps its own values; blanks are filled from the newest duplicate
+# that has one, notes from every duplicate are appended oldest first
+MERGE_FIELDS = f"""
+    UPDATE crm_lead AS p SET
+        notes = concat_ws(E'\\n\\n', NULLIF(p.notes, ''), d.notes),
+        campaign_id = COALESCE(p.campaign_id, d.campaign_id),
+        profile_url = COALESCE(NULLIF(p.profile_url, ''), d.profile_url),
+        source = COALESCE(NULLIF(p.source, ''), d.source, ''),
+        updated_at = now()
+    FROM (
+        SELECT m.primary_id,
+               string_agg(NULLIF(l.notes, ''), E'\\n\\n' ORDER BY l.id) AS notes,
+               (array_agg(l.campaign_id ORDER BY l.id DESC)
+                   FILTER (WHERE l.campaign_id IS NOT NULL))[1] AS campaign_id,
+               (array_agg(l.profile_url ORDER BY l.id DESC)
+                   FILTER (WHERE l.profile_url <> ''))[1] AS profile_url,
+               (array_agg(l.source ORDER BY l.id DESC)
+                   FILTER (WHERE l.source <> ''))[1] AS source
+        FROM crm_lead l
+        JOIN ({MERGE_MAP}) AS m ON l.id = m.duplicate_id
+        GROUP BY m.primary_id
+    ) AS d
+    WHERE p.id = d.primary_id
+"""
+
+
+def find_duplicates(chunk_size=SCAN_CHUNK_SIZE, full=False,
+                    threshold=NAME_SIMILARITY_THRESHOLD):
+    """
+    Scan leads added since the last run, then the queued leads whose blocking
+    columns changed, for duplicate candidates. `full` rescans from the first
+    lead. Returns the number of new pairs.
+    """
+    progress, _ = DedupeProgress.objects.get_or_create(name=PROGRESS_KEY)
+    low = 0 if full else progress.last_lead_id
+    # newest lead at least SCAN_LAG old: the backward walk of the primary key
+    # stops after the last few minutes' rows
+    last_id = (
+        Lead.all_objects.filter(created_at__lte=timezone.now() - SCAN_LAG)
+        .order_by("-id").values_list("id", flat=True).first() or 0
+    )
+
+    found = 0
+    while low < last_id:
+        high = min(low + chunk_size, last_id)
+        params = {"low": low, "high": high, "max_block": MAX_EMAIL_BLOCK}
+        with transaction.atomic(), connection.cursor() as cursor:
+            found += _insert_pairs(cursor, SCAN_PAIR, SCAN_SCOPE, params, threshold)
+            DedupeProgress.objects.filter(name=PROGRESS_KEY).update(last_lead_id=high)
+        low = high
+
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(DRAIN_SQL, [chunk_size])
+            lead_ids = [row[0] for row in cursor.fetchall()]
+            if lead_ids:
+                params = {"lead_ids": lead_ids, "max_block": MAX_EMAIL_BLOCK}
+                found += _insert_pairs(cursor, REQUEUE_PAIR, REQUEUE_SCOPE, params, threshold)
+        if len(lead_ids) < chunk_size:
+            return found
+
+
+def _insert_pairs(cursor, pair, scope, params, threshold):
+    cursor.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", [str(threshold)])
+    found = 0
+    # strongest signal first: ON CONFLICT keeps the first reason found
+    for select in (PROFILE_URL_PAIRS, EMAIL_KEY_PAIRS, NAME_PAIRS):
+        cursor.execute(INSERT_PAIRS.format(select=select.format(pair=pair, scope=scope)), params)
+        found += cursor.rowcount
+    return found
+
+
+def group_pairs(pairs):
+    """
+    Collapse (lead_id, candidate_id) pairs into {primary_id: [duplicate ids]}
+    with union-find; the oldest lead (lowest id) of each group is the primary.
+    """
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for left, right in pairs:
+        root_left, root_right = find(left), find(right)
+        if root_left != root_right:
+            parent[max(root_left, root_right)] = min(root_left, root_right)
+
+    groups = defaultdict(list)
+    for node in list(parent):
+        root = find(node)
+        if root != node:
+            groups[root].append(node)
+    return {primary: sorted(duplicates) for primary, duplicates in groups.items()}
+
+
+def merge_leads(groups):
+    """
+    Merge every {primary_id: [duplicate ids]} group in one transaction with a
+    fixed number of statements: tags are re-pointed with one INSERT .. SELECT,
+    campaign / profile_url / source / notes are folded into the primaries
+    with one UPDATE, and the duplicates are removed with one DELETE.
+    Returns the number of leads merged away.
+    """
+    duplicate_ids, primary_ids = [], []
+    for primary, duplicates in groups.items():
+        for duplicate in duplicates:
+            if duplicate != primary:
+                duplicate_ids.append(duplicate)
+                primary_ids.append(primary)
+    if not duplicate_ids:
+        return 0
+    if set(duplicate_ids) & set(primary_ids) or len(set(duplicate_ids)) != len(duplicate_ids):
+        raise ValueError("A lead can only be merged once, into a primary that is not merged itself.")
+
+    with transaction.atomic():
+        # lock everything involved so a concurrent edit can't slip in between
+        owner_ids = set(
+            Lead.all_objects.select_for_update()
+            .filter(id__in=duplicate_ids + primary_ids)
+            .values_list("owner_id", flat=True)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(MERGE_TAGS, [duplicate_ids, primary_ids])
+            cursor.execute(MERGE_FIELDS, [duplicate_ids, primary_ids])
+        Lead.all_objects.filter(id__in=duplicate_ids).delete()
+    invalidate_dashboard(*owner_ids)
+    invalidate_all_campaign_analytics()
+    refresh_pending_on_commit(*owner_ids)
+    return len(duplicate_ids)
+
+
+def merge_pending(min_score, owner=None):
+    """Merge every pending candidate pair scoring at least `min_score`."""
+    pairs = LeadDuplicate.objects.filter(status="pending", score__gte=min_score)
+    if owner is not None:
+        pairs = pairs.filter(lead__owner=owner)
+    return merge_leads(group_pairs(pairs.values_list("lead_id", "candidate_id")))
@@ -0,0 +1,132 @@
+# src/crm/fieldsets.py
+"""
+Sparse fieldsets (?fields=id,name,status) and query planning from the
+serializer's declared sources, so a list page is one query that selects only
+the columns the response actually needs.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Serializer that accepts `fields=[...]` and drops every other field before
+    any of them is bound, so unused fields cost nothing per row.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+def _relation(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None, None
+    return field, field.related_model if field.many_to_one or field.one_to_one else None
+
+
+def plan_queryset(queryset, serializer_fields, restrict=True, extra_columns=()):
+    """
+    select_related() every forward FK reached through a dotted source
+    (e.g. source="owner.username") and, with `restrict`, only() the concrete
+    columns used plus `extra_columns`. Falls back to full rows when a field isn't a plain
+    attribute path (source="*", SerializerMethodField, properties, ...).
+    """
+    model = queryset.model
+    related, columns = set(), {model._meta.pk.name, *extra_columns}
+
+    for field in serializer_fields:
+        if isinstance(field, serializers.ManyRelatedField):
+            restrict = False  # many-to-many needs its own query, not planned here
+            continue
+        attrs = list(field.source_attrs)
+        if not attrs:
+            restrict = False
+            continue
+
+        current, path = model, []
+        for position, attr in enumerate(attrs):
+            db_field, target = _relation(current, attr)
+            if db_field is None or not db_field.concrete:
+                restrict = False
+                break
+            path.append(attr)
+            is_last = position == len(attrs) - 1
+            if target is None or is_last:
+                columns.add("__".join(path))
+                break
+            related.add("__".join(path))
+            columns.add("__".join(path))
+            current = target
+
+    if related:
+        queryset = queryset.select_related(*sorted(related))
+    if restrict:
+        # keep the ordering columns, keyset pagination reads them off each row;
+        # only real fields, an annotation (search rank) isn't a column to defer
+        ordering = queryset.query.order_by or model._meta.ordering
+        for name in ordering:
+            if isinstance(name, str) and _relation(model, name.lstrip("-"))[0] is not None:
+                columns.add(name.lstrip("-"))
+        queryset = queryset.only(*sorted(columns))
+    return queryset
+
+
+class SparseFieldsetMixin:
+    """
+    ViewSet side of sparse fieldsets.
+
+    GET /api/<resource>/?fields=id,name,status
+
+    `list_exclude_fields` are left out of list-style (non-detail) responses
+    unless asked for explicitly (e.g. large text columns). Only applies to
+    reads; writes always go through the full serializer.
+    """
+    fields_query_param = "fields"
+    list_exclude_fields = ()
+
+    def get_extra_columns(self):
+        """Columns the view itself reads off each row, whatever ?fields= says."""
+        return ()
+
+    def is_read_request(self):
+        return self.request is not None and self.request.method in ("GET", "HEAD")
+
+    def get_requested_fields(self):
+        if not self.is_read_request():
+            return None
+
+        serializer_class = self.get_serializer_class()
+        available = list(serializer_class(context=self.get_serializer_context()).fields)
+        raw = self.request.query_params.get(self.fields_query_param)
+        if raw:
+            requested = [name.strip() for name in raw.split(",") if name.strip()]
+            unknown = sorted(set(requested) - set(available))
+            if unknown:
+                raise ValidationError({self.fields_query_param: [f"Unknown field(s): {', '.join(unknown)}"]})
+            return requested
+        if not self.detail and self.list_exclude_fields:
+            return [name for name in available if name not in self.list_exclude_fields]
+        return None
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields is not None:
+            kwargs.setdefault("fields", fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer = self.get_serializer()
+        return plan_queryset(
+            queryset,
+            serializer.fields.values(),
+            restrict=self.is_read_request(),
+            extra_columns=self.get_extra_columns(),
+        )
@@ -0,0 +1,77 @@
+# src/crm/filters.py
+"""
+Lead filter expression shared by the endpoints that act on "every lead
+matching ..." (bulk tagging, export):
+
+    {"status": ["new", "contacted"], "campaign": 3, "source": "linkedin",
+     "tag": 7, "is_archived": false, "created_after": "2026-01-01T00:00:00Z",
+     "created_before": "...", "q": "jo smi", "segment": 5}
+
+Every key is optional and they AND together. The lead list and export
+take the same keys as query parameters (?status=new,contacted&campaign=3).
+`segment` reads the materialized membership (crm.segments), so it is an
+index lookup whatever the segment's rules are.
+"""
+from rest_framework import serializers
+
+from .models import Lead
+from .search import prefix_query
+from .segments import current_member_ids
+
+
+class LeadFilterSerializer(serializers.Serializer):
+    status = serializers.ListField(
+        child=serializers.ChoiceField(choices=Lead.STATUS_CHOICES), required=False, allow_empty=False
+    )
+    campaign = serializers.IntegerField(required=False, min_value=1)
+    source = serializers.CharField(required=False, max_length=100)
+    tag = serializers.IntegerField(required=False, min_value=1)
+    is_archived = serializers.BooleanField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    q = serializers.CharField(required=False, max_length=200)
+    segment = serializers.IntegerField(required=False, min_value=1)
+
+    def validate(self, attrs):
+        after, before = attrs.get("created_after"), attrs.get("created_before")
+        if after and before and after > before:
+            raise serializers.ValidationError({"created_before": "Must not be before created_after."})
+        return attrs
+
+
+def parse_query_filters(query_params):
+    """Validated filter expression from query parameters; unknown keys are ignored."""
+    data = {
+        name: query_params[name]
+        for name in LeadFilterSerializer().fields
+        if query_params.get(name) not in (None, "")
+    }
+    if "status" in data:
+        data["status"] = [value for value in data["status"].split(",") if value]
+    serializer = LeadFilterSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+def filter_leads(queryset, filters):
+    """Apply validated LeadFilterSerializer data to a lead queryset."""
+    if "status" in filters:
+        queryset = queryset.filter(status__in=filters["status"])
+    if "campaign" in filters:
+        queryset = queryset.filter(campaign_id=filters["campaign"])
+    if "source" in filters:
+        queryset = queryset.filter(source=filters["source"])
+    if "tag" in filters:
+        queryset = queryset.filter(tags__id=filters["tag"])
+    if "is_archived" in filters:
+        queryset = queryset.filter(is_archived=filters["is_archived"])
+    if "created_after" in filters:
+        queryset = queryset.filter(created_at__gte=filters["created_after"])
+    if "created_before" in filters:
+        queryset = queryset.filter(created_at__lt=filters["created_before"])
+    if "q" in filters:
+        query = prefix_query(filters["q"])
+        queryset = queryset.filter(search_vector=query) if query is not None else queryset.none()
+    if "segment" in filters:
+        queryset = queryset.filter(pk__in=current_member_ids(filters["segment"]))
+    return queryset
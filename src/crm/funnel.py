@@ -0,0 +1,90 @@
+# src/crm/funnel.py
+"""
+Lead funnel counts read from crm_leadfunnelcount, the summary table that the
+crm_lead triggers (migration 0015) keep in step with every insert, update,
+delete and archive. Nothing here reads crm_lead except the rebuild.
+"""
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from .models import Campaign, LeadFunnelCount
+
+GROUPINGS = ("status", "campaign", "owner")
+
+FRESH_COUNTS_SQL = """
+    SELECT owner_id, campaign_id, status, count(*) AS count
+    FROM crm_lead WHERE NOT is_archived
+    GROUP BY 1, 2, 3
+"""
+
+DRIFT_SQL = f"""
+    SELECT count(*)
+    FROM crm_leadfunnelcount AS f
+    FULL OUTER JOIN ({FRESH_COUNTS_SQL}) AS l
+      ON l.owner_id = f.owner_id
+     AND l.campaign_id IS NOT DISTINCT FROM f.campaign_id
+     AND l.status = f.status
+    WHERE f.count IS DISTINCT FROM l.count
+"""
+
+
+def funnel_counts(owner=None, group_by="status"):
+    """
+    Counts of active leads, optionally for a single owner.
+
+    group_by="status"   -> {"new": 12, "won": 3, ...}
+    group_by="campaign" -> [{"campaign": 4, "campaign_name": ..., "counts": {...}, "total": n}]
+    group_by="owner"    -> [{"owner": 2, "owner_username": ..., "counts": {...}, "total": n}]
+    """
+    rows = LeadFunnelCount.objects.all()
+    if owner is not None:
+        rows = rows.filter(owner=owner)
+
+    if group_by == "status":
+        totals = rows.values("status").annotate(n=Sum("count")).order_by("status")
+        return {row["status"]: row["n"] for row in totals if row["n"]}
+
+    key = f"{group_by}_id"
+    grouped = defaultdict(dict)
+    for row in rows.values(key, "status").annotate(n=Sum("count")).order_by(key, "status"):
+        if row["n"]:
+            grouped[row[key]][row["status"]] = row["n"]
+
+    ids = [pk for pk in grouped if pk is not None]
+    if group_by == "campaign":
+        label = "campaign_name"
+        names = dict(Campaign.objects.filter(id__in=ids).values_list("id", "name"))
+    else:
+        label = "owner_username"
+        names = dict(get_user_model().objects.filter(id__in=ids).values_list("id", "username"))
+
+    return [
+        {group_by: pk, label: names.get(pk), "counts": counts, "total": sum(counts.values())}
+        for pk, counts in grouped.items()
+    ]
+
+
+def funnel_drift():
+    """Number of (owner, campaign, status) groups where the summary is off."""
+    with connection.cursor() as cursor:
+        cursor.execute(DRIFT_SQL)
+        return cursor.fetchone()[0]
+
+
+def rebuild_funnel():
+    """
+    Recompute crm_leadfunnelcount from crm_lead. Holds a SHARE lock on
+    crm_lead for the duration, so lead writes wait but reads don't.
+    Returns the number of summary rows written.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("LOCK TABLE crm_lead IN SHARE MODE")
+        cursor.execute("DELETE FROM crm_leadfunnelcount")
+        cursor.execute(
+            "INSERT INTO crm_leadfunnelcount (owner_id, campaign_id, status, count) "
+            + FRESH_COUNTS_SQL
+        )
+        return cursor.rowcount
@@ -0,0 +1,269 @@
+# src/crm/imports.py
+"""
+Bulk lead import: stream-parse CSV / NDJSON, validate in chunks, COPY each
+chunk into a temp staging table and merge it into crm_lead keyed on email.
+
+Every chunk commits on its own, so one bad chunk (or bad row) never rolls
+back what was already imported. Rows that fail validation, or whose email
+already belongs to another user's lead, are reported back by row number.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+
+from django.db import DatabaseError, connection, transaction
+from rest_framework import serializers
+
+from .analytics import invalidate_all_campaign_analytics
+from .dashboard import invalidate_dashboard
+from .models import Campaign
+from .segments import refresh_pending_on_commit
+from .serializers import LeadImportSerializer
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+FORMATS = ("csv", "ndjson")
+
+# columns staged per row, in COPY order (row_no is prepended)
+IMPORT_COLUMNS = ["name", "email", "profile_url", "source", "status", "campaign", "notes"]
+
+STAGING_DDL = """
+    CREATE TEMP TABLE crm_lead_import (
+        row_no      integer NOT NULL,
+        name        varchar(200),
+        email       varchar(254),
+        profile_url varchar(200),
+        source      varchar(100),
+        status      varchar(20),
+        campaign_id bigint,
+        notes       text
+    ) ON COMMIT DROP
+"""
+
+# inside a caller's transaction the chunk's atomic() is only a savepoint and
+# ON COMMIT never comes, so every chunk drops its table itself
+DROP_STAGING_SQL = "DROP TABLE crm_lead_import"
+
+# last occurrence of an email inside the chunk wins
+LATEST_PER_EMAIL = """
+    SELECT DISTINCT ON (email) *
+    FROM crm_lead_import
+    ORDER BY email, row_no DESC
+"""
+
+# existing leads of this owner: only overwrite the columns the file provided
+UPDATE_SQL = f"""
+    UPDATE crm_lead AS l SET
+        name        = COALESCE(s.name, l.name),
+        profile_url = COALESCE(s.profile_url, l.profile_url),
+        source      = COALESCE(s.source, l.source),
+        status      = COALESCE(s.status, l.status),
+        campaign_id = COALESCE(s.campaign_id, l.campaign_id),
+        notes       = COALESCE(s.notes, l.notes),
+        updated_at  = now()
+    FROM ({LATEST_PER_EMAIL}) AS s
+    WHERE l.email = s.email AND l.owner_id = %s
+    RETURNING l.email
+"""
+
+INSERT_SQL = f"""
+    INSERT INTO crm_lead (
+        name, email, profile_url, source, status, is_archived,
+        owner_id, campaign_id, notes, created_at, updated_at
+    )
+    SELECT s.name, s.email, s.profile_url, COALESCE(s.source, ''),
+           COALESCE(s.status, 'new'), false, %s, s.campaign_id,
+           COALESCE(s.notes, ''), now(), now()
+    FROM ({LATEST_PER_EMAIL}) AS s
+    ON CONFLICT (email) DO NOTHING
+    RETURNING email
+"""
+
+
+class ImportFileError(ValueError):
+    """The upload stopped being readable part-way; `result` holds what was imported before."""
+
+    def __init__(self, message, result):
+        super().__init__(message)
+        self.result = result
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, row_no, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_no, "errors": errors})
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+def detect_format(filename="", content_type=""):
+    name = (filename or "").lower()
+    content_type = (content_type or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type:
+        return "ndjson"
+    if name.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    return None
+
+
+def iter_csv_rows(stream):
+    """Yield (row_no, dict) from a text stream; empty cells count as missing."""
+    reader = csv.DictReader(stream)
+    for row_no, row in enumerate(reader, start=1):
+        yield row_no, {
+            key.strip(): value
+            for key, value in row.items()
+            if key and value not in ("", None)
+        }
+
+
+def iter_ndjson_rows(stream):
+    """Yield (row_no, dict | None) from a text stream, skipping blank lines."""
+    row_no = 0
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        row_no += 1
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row_no, row if isinstance(row, dict) else None
+
+
+def iter_rows(stream, fmt):
+    if fmt == "csv":
+        return iter_csv_rows(stream)
+    if fmt == "ndjson":
+        return iter_ndjson_rows(stream)
+    raise ValueError(f"Unsupported import format: {fmt!r}")
+
+
+def _copy_value(value):
+    # COPY text format: \N is NULL, backslash escapes for the separators
+    if value is None:
+        return r"\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _validate_chunk(chunk, owner, result):
+    validator = LeadImportSerializer()
+    valid = []
+    for row_no, row in chunk:
+        if row is None:
+            result.add_error(row_no, {"non_field_errors": ["Malformed row."]})
+            continue
+        try:
+            valid.append((row_no, validator.run_validation(row)))
+        except serializers.ValidationError as exc:
+            result.add_error(row_no, exc.detail)
+
+    # one lookup for every campaign referenced in the chunk
+    campaign_ids = {data["campaign"] for _, data in valid if data.get("campaign")}
+    if campaign_ids:
+        known = set(
+            Campaign.objects.filter(id__in=campaign_ids, owner=owner).values_list("id", flat=True)
+        )
+        missing = campaign_ids - known
+        if missing:
+            kept = []
+            for row_no, data in valid:
+                if data.get("campaign") in missing:
+                    result.add_error(row_no, {"campaign": ["Campaign does not exist."]})
+                else:
+                    kept.append((row_no, data))
+            valid = kept
+    return valid
+
+
+def _merge_chunk(rows, owner, result):
+    buffer = io.StringIO()
+    for row_no, data in rows:
+        values = [row_no] + [data.get(column) for column in IMPORT_COLUMNS]
+        buffer.write("\t".join(_copy_value(value) for value in values))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(STAGING_DDL)
+        cursor.copy_expert("COPY crm_lead_import FROM STDIN", buffer)
+        cursor.execute(UPDATE_SQL, [owner.pk])
+        updated = {email for (email,) in cursor.fetchall()}
+        cursor.execute(INSERT_SQL, [owner.pk])
+        created = {email for (email,) in cursor.fetchall()}
+        cursor.execute(DROP_STAGING_SQL)
+
+    result.updated += len(updated)
+    result.created += len(created)
+
+    # neither updated nor inserted: the email is taken by another user's lead
+    merged = updated | created
+    for row_no, data in rows:
+        if data["email"] not in merged:
+            result.add_error(row_no, {"email": ["A lead with this email already exists."]})
+
+
+def _flush(chunk, owner, result):
+    rows = _validate_chunk(chunk, owner, result)
+    if not rows:
+        return
+    try:
+        _merge_chunk(rows, owner, result)
+    except DatabaseError as exc:
+        for row_no, _ in rows:
+            result.add_error(row_no, {"non_field_errors": [f"Database error: {exc}"]})
+
+
+def import_leads(stream, fmt, owner, chunk_size=CHUNK_SIZE):
+    """
+    Import leads for `owner` from a text stream in `fmt` ("csv" or "ndjson").
+    Memory is bounded by `chunk_size`, not by the size of the upload.
+
+    Raises ImportFileError when the file itself can't be read (bad encoding,
+    broken CSV); the rows read before that point are still imported.
+    """
+    result = ImportResult()
+    chunk = []
+    try:
+        for row in iter_rows(stream, fmt):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                _flush(chunk, owner, result)
+                chunk = []
+    except UnicodeDecodeError as exc:
+        unreadable = f"File is not valid UTF-8: {exc.reason}."
+    except csv.Error as exc:
+        unreadable = f"Malformed CSV: {exc}."
+    else:
+        unreadable = None
+    if chunk:
+        _flush(chunk, owner, result)
+    if result.created or result.updated:
+        invalidate_dashboard(owner.pk)
+        invalidate_all_campaign_analytics()
+        refresh_pending_on_commit(owner.pk)
+    if unreadable:
+        raise ImportFileError(unreadable, result)
+    return result
@@ -0,0 +1,47 @@
+# src/crm/labels.py
+"""
+Per-user label ordering. A reorder is one UPDATE .. FROM unnest(ids,
+positions) that only touches labels whose position actually changes, so
+dragging a label among hundreds is a single statement, not N saves.
+"""
+from django.db import connection, transaction
+from django.db.models import Max
+
+from .models import Label
+
+REORDER_SQL = """
+    UPDATE crm_label AS l SET position = v.position, updated_at = now()
+    FROM unnest(%s::bigint[], %s::integer[]) AS v(id, position)
+    WHERE l.id = v.id AND l.owner_id = %s AND l.position <> v.position
+"""
+
+
+def next_position(owner):
+    """Position for a new label: after all of `owner`'s existing ones."""
+    last = Label.objects.filter(owner=owner).aggregate(last=Max("position"))["last"]
+    return 0 if last is None else last + 1
+
+
+def reorder_labels(owner, order):
+    """
+    Apply `order` (label ids, first = top) to `owner`'s labels. Labels left
+    out keep their relative order after the ones listed. Raises
+    Label.DoesNotExist for ids that aren't the owner's. Returns the number
+    of labels moved.
+    """
+    with transaction.atomic():
+        current = list(
+            Label.objects.select_for_update()
+            .filter(owner=owner)
+            .order_by("position", "id")
+            .values_list("id", flat=True)
+        )
+        unknown = set(order) - set(current)
+        if unknown:
+            raise Label.DoesNotExist(f"Label(s) not found: {sorted(unknown)}")
+
+        listed = set(order)
+        ids = list(dict.fromkeys(order)) + [pk for pk in current if pk not in listed]
+        with connection.cursor() as cursor:
+            cursor.execute(REORDER_SQL, [ids, list(range(len(ids))), owner.pk])
+            return cursor.rowcount
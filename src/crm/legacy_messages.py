@@ -0,0 +1,104 @@
+# src/crm/legacy_messages.py
+"""
+Read side of the legacy message tables (auth_app: message_groups,
+message_blocks, segments; unmanaged).
+
+A group's text is its blocks in block_order: text blocks contribute
+text_value, segment blocks their segment's title. Composed groups are cached
+under (group id, updated_at, newest updated_at of its segments, block count),
+the last two annotated onto the group query by groups_for_user(), and only
+the groups missing from the cache get their blocks loaded, by one prefetch
+query with segments joined in. A page of groups therefore costs at most two
+queries, however many groups there are.
+
+message_blocks has no timestamp: an edit to a block's text that doesn't touch
+its group shows up once the entry expires, after CACHE_TIMEOUT.
+The legacy tables are tied to the Django user by email.
+"""
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models import Count, Max, OuterRef, Prefetch, Subquery, prefetch_related_objects
+
+# through the app registry: auth_app is registered as "auth_app", so importing
+# src.auth_app.models directly would define the models a second time
+MessageBlocks = apps.get_model("auth_app", "MessageBlocks")
+MessageGroups = apps.get_model("auth_app", "MessageGroups")
+
+CACHE_TIMEOUT = 10 * 60
+BLOCK_SEPARATOR = "\n"
+
+BLOCKS_PREFETCH = Prefetch(
+    "messageblocks_set",
+    queryset=MessageBlocks.objects.select_related("segment").order_by("block_order"),
+    to_attr="ordered_blocks",
+)
+
+
+def _per_group(aggregate):
+    # correlated subquery rather than a join, so the page query needs no GROUP BY
+    return Subquery(
+        MessageBlocks.objects.filter(message_group=OuterRef("pk"))
+        .order_by().values("message_group").annotate(value=aggregate).values("value")
+    )
+
+
+def groups_for_user(user):
+    """The legacy groups of a Django user, matched on email, with their cache stamps."""
+    if not user.email:
+        return MessageGroups.objects.none()
+    return MessageGroups.objects.filter(user__email__iexact=user.email).annotate(
+        segments_updated_at=_per_group(Max("segment__updated_at")),
+        block_count=_per_group(Count("id")),
+    )
+
+
+def _cache_key(group):
+    segments_updated_at = getattr(group, "segments_updated_at", None)
+    segments_stamp = segments_updated_at.timestamp() if segments_updated_at else 0
+    block_count = getattr(group, "block_count", None) or 0
+    return f"legacy-message:{group.pk}:{group.updated_at.timestamp()}:{segments_stamp}:{block_count}"
+
+
+def _compose(group):
+    blocks, parts = [], []
+    for block in group.ordered_blocks:
+        if block.block_type == "segment" and block.segment is not None:
+            text = block.segment.title
+        else:
+            text = block.text_value or ""
+        parts.append(text)
+        blocks.append({
+            "order": block.block_order,
+            "type": block.block_type,
+            "text": text,
+            "segment": {"id": block.segment_id, "title": block.segment.title} if block.segment else None,
+        })
+    return {"text": BLOCK_SEPARATOR.join(parts), "blocks": blocks}
+
+
+def compose_groups(groups):
+    """
+    Composed message dicts for `groups` (MessageGroups instances, as
+    annotated by groups_for_user()), in order.
+    """
+    groups = list(groups)
+    keys = {group.pk: _cache_key(group) for group in groups}
+    composed = cache.get_many(list(keys.values()))
+
+    stale = [group for group in groups if keys[group.pk] not in composed]
+    if stale:
+        prefetch_related_objects(stale, BLOCKS_PREFETCH)
+        fresh = {keys[group.pk]: _compose(group) for group in stale}
+        cache.set_many(fresh, CACHE_TIMEOUT)
+        composed.update(fresh)
+
+    return [
+        {
+            "id": group.pk,
+            "title": group.title,
+            "created_at": group.created_at,
+            "updated_at": group.updated_at,
+            **composed[keys[group.pk]],
+        }
+        for group in groups
+    ]
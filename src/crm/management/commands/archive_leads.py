@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from ...archive import ARCHIVE_AFTER, CHUNK_SIZE, move_archived_leads
+
+
+class Command(BaseCommand):
+    help = "Move leads archived for a while out of crm_lead into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER.days,
+                            help="Only move leads archived and untouched for this many days")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        moved = move_archived_leads(
+            older_than=timedelta(days=options["older_than_days"]),
+            chunk_size=options["chunk_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"{moved} lead(s) moved to the archive"))
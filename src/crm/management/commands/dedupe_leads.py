@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from ...dedupe import NAME_SIMILARITY_THRESHOLD, SCAN_CHUNK_SIZE, find_duplicates, merge_pending
+
+
+class Command(BaseCommand):
+    help = "Find duplicate lead candidates among leads added since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Rescan every lead, not just new ones")
+        parser.add_argument("--chunk-size", type=int, default=SCAN_CHUNK_SIZE)
+        parser.add_argument("--threshold", type=float, default=NAME_SIMILARITY_THRESHOLD,
+                            help="pg_trgm similarity needed for a name match")
+        parser.add_argument("--merge-above", type=float, default=None,
+                            help="Also merge pending pairs scoring at least this much")
+
+    def handle(self, *args, **options):
+        found = find_duplicates(
+            chunk_size=options["chunk_size"], full=options["full"], threshold=options["threshold"]
+        )
+        self.stdout.write(f"{found} new duplicate candidate(s)")
+
+        if options["merge_above"] is not None:
+            merged = merge_pending(options["merge_above"])
+            self.stdout.write(f"{merged} lead(s) merged")
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,41 @@
+import json
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from ...imports import CHUNK_SIZE, FORMATS, detect_format, import_leads
+
+
+class Command(BaseCommand):
+    help = "Bulk import leads from a CSV or NDJSON file (upsert on email)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to a .csv or .ndjson file")
+        parser.add_argument("--owner", required=True, help="Username that will own the leads")
+        parser.add_argument("--input-format", choices=FORMATS, help="Override format detection")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.is_file():
+            raise CommandError(f"No such file: {path}")
+
+        fmt = options["input_format"] or detect_format(path.name)
+        if fmt is None:
+            raise CommandError("Cannot tell the file format, pass --input-format.")
+
+        User = get_user_model()
+        try:
+            owner = User.objects.get(username=options["owner"])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user: {options['owner']}")
+
+        with path.open(encoding="utf-8-sig", newline="") as stream:
+            result = import_leads(stream, fmt, owner, chunk_size=options["chunk_size"])
+
+        for error in result.errors:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.created} created, {result.updated} updated, {result.failed} failed"
+        ))
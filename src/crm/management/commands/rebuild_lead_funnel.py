@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from ...funnel import funnel_drift, rebuild_funnel
+
+
+class Command(BaseCommand):
+    help = "Recompute the lead funnel summary table from crm_lead (drift repair)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Only report drift, don't rebuild")
+
+    def handle(self, *args, **options):
+        drift = funnel_drift()
+        self.stdout.write(f"{drift} funnel group(s) out of sync")
+        if options["check"]:
+            return
+        rows = rebuild_funnel()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt lead funnel: {rows} row(s)"))
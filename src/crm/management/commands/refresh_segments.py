@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from ...models import Segment
+from ...segments import PENDING_CHUNK_SIZE, refresh_pending, refresh_segment
+
+
+class Command(BaseCommand):
+    help = "Apply queued lead changes to segment membership (or re-evaluate segments with --full)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Re-evaluate every segment from scratch")
+        parser.add_argument("--segment", type=int, action="append", help="Only this segment (with --full)")
+        parser.add_argument("--chunk-size", type=int, default=PENDING_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if not options["full"]:
+            checked = refresh_pending(chunk_size=options["chunk_size"])
+            self.stdout.write(self.style.SUCCESS(f"Re-checked {checked} queued lead(s)"))
+            return
+
+        segments = Segment.objects.order_by("id")
+        if options["segment"]:
+            segments = segments.filter(pk__in=options["segment"])
+        for segment in segments:
+            added, removed = refresh_segment(segment)
+            self.stdout.write(f"{segment.pk} {segment.name}: +{added} -{removed}, {segment.member_count} member(s)")
+        self.stdout.write(self.style.SUCCESS("Segments rebuilt"))
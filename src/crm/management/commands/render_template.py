@@ -0,0 +1,50 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...filters import LeadFilterSerializer, filter_leads
+from ...models import Lead, Template
+from ...rendering import MAX_RENDER_WORKERS, TemplateSyntaxError, compiled_template, render_batch
+
+
+class Command(BaseCommand):
+    help = "Render a template for every matching lead of its owner as NDJSON (process pool for large batches)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("template", type=int, help="Template id")
+        parser.add_argument("--filter", default="{}", help='crm.filters expression as JSON, e.g. \'{"status": ["new"]}\'')
+        parser.add_argument("--workers", type=int, default=min(os.cpu_count() or 1, MAX_RENDER_WORKERS))
+        parser.add_argument("--output", help="File to write (default: stdout)")
+
+    def handle(self, *args, **options):
+        try:
+            template = Template.objects.get(pk=options["template"])
+        except Template.DoesNotExist:
+            raise CommandError(f"No such template: {options['template']}")
+        try:
+            compiled_template(template)
+        except TemplateSyntaxError as exc:
+            raise CommandError(f"Template {template.pk} does not compile: {exc}")
+
+        try:
+            raw = json.loads(options["filter"])
+        except ValueError:
+            raise CommandError("--filter is not valid JSON.")
+        expression = LeadFilterSerializer(data=raw)
+        if not expression.is_valid():
+            raise CommandError(f"Invalid --filter: {json.dumps(expression.errors)}")
+        filters = dict(expression.validated_data)
+        filters.setdefault("is_archived", False)
+
+        leads = filter_leads(Lead.all_objects.filter(owner_id=template.owner_id), filters).order_by("id")
+        workers = max(1, min(options["workers"], MAX_RENDER_WORKERS))
+        out = open(options["output"], "w", encoding="utf-8") if options["output"] else self.stdout
+        try:
+            for chunk in render_batch(template, leads, workers=workers):
+                out.write(chunk)
+        finally:
+            if out is not self.stdout:
+                out.close()
+        if options["output"]:
+            self.stderr.write(self.style.SUCCESS(f"Rendered template {template.pk} to {options['output']}"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from src.integrations.webpush_client import DEFAULT_WORKERS, WebPushClient
+
+from ...push import CHUNK_SIZE, PushSubscriptions, fan_out, subscriptions_for_emails
+
+
+class Command(BaseCommand):
+    help = "Send a web push to every stored push subscription (or only some users')."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", action="append", help="Only this legacy user's subscriptions (repeatable)")
+        parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent requests")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument("--urgency", choices=["very-low", "low", "normal", "high"], default="normal")
+
+    def handle(self, *args, **options):
+        if options["email"]:
+            subscriptions = subscriptions_for_emails(options["email"])
+        else:
+            subscriptions = PushSubscriptions.objects.all()
+        try:
+            client = WebPushClient(max_workers=options["workers"], urgency=options["urgency"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        with client:
+            stats = fan_out(subscriptions, client=client, chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['sent']} sent, {stats['failed']} failed, {stats['pruned']} expired pruned in {stats['seconds']}s"
+        ))
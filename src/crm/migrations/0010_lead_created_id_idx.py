@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:38
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # build the index without locking crm_lead for writes
+    atomic = False
+
+    dependencies = [
+        ("crm", "0009_template"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="lead",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="lead_created_id_idx"
+            ),
+        ),
+    ]
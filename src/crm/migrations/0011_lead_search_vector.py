@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:43
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = """
+CREATE OR REPLACE FUNCTION crm_lead_search_vector(
+    name text, email text, source text, notes text
+) RETURNS tsvector LANGUAGE sql IMMUTABLE AS $$
+    SELECT setweight(to_tsvector('simple', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('simple',
+               coalesce(email, '') || ' ' ||
+               regexp_replace(coalesce(email, ''), '[^[:alnum:]]+', ' ', 'g')), 'A')
+        || setweight(to_tsvector('simple', coalesce(source, '')), 'B')
+        || setweight(to_tsvector('simple', coalesce(notes, '')), 'C')
+$$;
+
+CREATE OR REPLACE FUNCTION crm_lead_search_vector_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := crm_lead_search_vector(NEW.name, NEW.email, NEW.source, NEW.notes);
+    RETURN NEW;
+END
+$$;
+
+CREATE TRIGGER crm_lead_search_vector_update
+    BEFORE INSERT OR UPDATE OF name, email, source, notes ON crm_lead
+    FOR EACH ROW EXECUTE FUNCTION crm_lead_search_vector_trigger();
+
+UPDATE crm_lead SET search_vector = crm_lead_search_vector(name, email, source, notes);
+"""
+
+DROP_SEARCH_VECTOR_SQL = """
+DROP TRIGGER IF EXISTS crm_lead_search_vector_update ON crm_lead;
+DROP FUNCTION IF EXISTS crm_lead_search_vector_trigger();
+DROP FUNCTION IF EXISTS crm_lead_search_vector(text, text, text, text);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0010_lead_created_id_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lead",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_SQL, DROP_SEARCH_VECTOR_SQL),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:43
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # build the index without locking crm_lead for writes
+    atomic = False
+
+    dependencies = [
+        ("crm", "0011_lead_search_vector"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="lead",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="lead_search_vector_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+# blocking key for duplicate detection: "John.Smith+fb@x.com" -> "johnsmith"
+EMAIL_KEY_SQL = r"""
+CREATE OR REPLACE FUNCTION crm_lead_email_key(email text) RETURNS text
+LANGUAGE sql IMMUTABLE STRICT AS $$
+    SELECT replace(regexp_replace(split_part(lower(email), '@', 1), '\+.*$', ''), '.', '')
+$$;
+"""
+
+DROP_EMAIL_KEY_SQL = "DROP FUNCTION IF EXISTS crm_lead_email_key(text);"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0012_lead_search_vector_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunSQL(EMAIL_KEY_SQL, DROP_EMAIL_KEY_SQL),
+        migrations.CreateModel(
+            name="DedupeProgress",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("last_lead_id", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="LeadDuplicate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.FloatField()),
+                (
+                    "reason",
+                    models.CharField(
+                        choices=[
+                            ("profile_url", "Same profile URL"),
+                            ("email", "Same email local part"),
+                            ("name", "Similar name"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("pending", "Pending"), ("dismissed", "Dismissed")],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["-score", "-id"],
+            },
+        ),
+        migrations.AddField(
+            model_name="leadduplicate",
+            name="candidate",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="crm.lead",
+            ),
+        ),
+        migrations.AddField(
+            model_name="leadduplicate",
+            name="lead",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="duplicate_candidates",
+                to="crm.lead",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="leadduplicate",
+            constraint=models.UniqueConstraint(
+                fields=("lead", "candidate"), name="uniq_lead_duplicate_pair"
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:44
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # build the indexes without locking crm_lead for writes
+    atomic = False
+
+    dependencies = [
+        ("crm", "0013_lead_duplicates"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="lead",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"], name="lead_name_trgm_idx", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="lead",
+            index=models.Index(
+                condition=models.Q(("profile_url__isnull", False)),
+                fields=["owner", "profile_url"],
+                name="lead_owner_profile_url_idx",
+            ),
+        ),
+        # expression index, not tracked in model state
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS lead_owner_email_key_idx "
+            "ON crm_lead (owner_id, crm_lead_email_key(email));",
+            "DROP INDEX CONCURRENTLY IF EXISTS lead_owner_email_key_idx;",
+        ),
+    ]
@@ -0,0 +1,172 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+FUNNEL_TRIGGERS_SQL = """
+CREATE OR REPLACE FUNCTION crm_lead_funnel_bump(
+    p_owner bigint, p_campaign bigint, p_status varchar, p_delta bigint
+) RETURNS void LANGUAGE plpgsql AS $$
+DECLARE
+    v_id bigint;
+    v_count bigint;
+BEGIN
+    IF p_campaign IS NULL THEN
+        INSERT INTO crm_leadfunnelcount (owner_id, campaign_id, status, count)
+        VALUES (p_owner, NULL, p_status, p_delta)
+        ON CONFLICT (owner_id, status) WHERE campaign_id IS NULL
+        DO UPDATE SET count = crm_leadfunnelcount.count + EXCLUDED.count
+        RETURNING id, count INTO v_id, v_count;
+    ELSE
+        INSERT INTO crm_leadfunnelcount (owner_id, campaign_id, status, count)
+        VALUES (p_owner, p_campaign, p_status, p_delta)
+        ON CONFLICT (owner_id, campaign_id, status) WHERE campaign_id IS NOT NULL
+        DO UPDATE SET count = crm_leadfunnelcount.count + EXCLUDED.count
+        RETURNING id, count INTO v_id, v_count;
+    END IF;
+    IF v_count = 0 THEN
+        DELETE FROM crm_leadfunnelcount WHERE id = v_id;
+    END IF;
+END
+$$;
+
+-- one bump per (owner, campaign, status) group touched by the statement,
+-- so a 100k row import costs a handful of upserts, not 100k
+CREATE OR REPLACE FUNCTION crm_lead_funnel_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    d record;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        FOR d IN
+            SELECT owner_id, campaign_id, status, count(*) AS n
+            FROM new_rows WHERE NOT is_archived
+            GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+        LOOP
+            PERFORM crm_lead_funnel_bump(d.owner_id, d.campaign_id, d.status, d.n);
+        END LOOP;
+    ELSIF TG_OP = 'DELETE' THEN
+        FOR d IN
+            SELECT owner_id, campaign_id, status, -count(*) AS n
+            FROM old_rows WHERE NOT is_archived
+            GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+        LOOP
+            PERFORM crm_lead_funnel_bump(d.owner_id, d.campaign_id, d.status, d.n);
+        END LOOP;
+    ELSE
+        FOR d IN
+            SELECT owner_id, campaign_id, status, sum(n) AS n
+            FROM (
+                SELECT owner_id, campaign_id, status, 1 AS n
+                FROM new_rows WHERE NOT is_archived
+                UNION ALL
+                SELECT owner_id, campaign_id, status, -1 AS n
+                FROM old_rows WHERE NOT is_archived
+            ) AS changes
+            GROUP BY 1, 2, 3 HAVING sum(n) <> 0 ORDER BY 1, 2, 3
+        LOOP
+            PERFORM crm_lead_funnel_bump(d.owner_id, d.campaign_id, d.status, d.n);
+        END LOOP;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER crm_lead_funnel_insert
+    AFTER INSERT ON crm_lead REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION crm_lead_funnel_apply();
+CREATE TRIGGER crm_lead_funnel_update
+    AFTER UPDATE ON crm_lead REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION crm_lead_funnel_apply();
+CREATE TRIGGER crm_lead_funnel_delete
+    AFTER DELETE ON crm_lead REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION crm_lead_funnel_apply();
+
+INSERT INTO crm_leadfunnelcount (owner_id, campaign_id, status, count)
+SELECT owner_id, campaign_id, status, count(*)
+FROM crm_lead WHERE NOT is_archived
+GROUP BY 1, 2, 3;
+"""
+
+DROP_FUNNEL_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS crm_lead_funnel_insert ON crm_lead;
+DROP TRIGGER IF EXISTS crm_lead_funnel_update ON crm_lead;
+DROP TRIGGER IF EXISTS crm_lead_funnel_delete ON crm_lead;
+DROP FUNCTION IF EXISTS crm_lead_funnel_apply();
+DROP FUNCTION IF EXISTS crm_lead_funnel_bump(bigint, bigint, varchar, bigint);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0014_lead_dedupe_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeadFunnelCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("new", "New"),
+                            ("contacted", "Contacted"),
+                            ("qualified", "Qualified"),
+                            ("lost", "Lost"),
+                            ("won", "Won"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("count", models.BigIntegerField(default=0)),
+                (
+                    "campaign",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="crm.campaign",
+                    ),
+                ),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("campaign__isnull", False)),
+                        fields=("owner", "campaign", "status"),
+                        name="uniq_funnel_owner_campaign_status",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("campaign__isnull", True)),
+                        fields=("owner", "status"),
+                        name="uniq_funnel_owner_status_no_campaign",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunSQL(FUNNEL_TRIGGERS_SQL, DROP_FUNNEL_TRIGGERS_SQL),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0015_lead_funnel"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="label",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="tag",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0016_tag_label_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncTombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("label", "Label"), ("template", "Template")],
+                        max_length=20,
+                    ),
+                ),
+                ("object_id", models.BigIntegerField()),
+                ("deleted_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="label",
+            index=models.Index(
+                fields=["owner", "updated_at"], name="label_owner_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="template",
+            index=models.Index(
+                fields=["label", "updated_at"], name="template_label_updated_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="synctombstone",
+            name="owner",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="synctombstone",
+            index=models.Index(
+                fields=["owner", "deleted_at"], name="tombstone_owner_deleted_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+# existing labels keep their creation order
+BACKFILL_POSITIONS_SQL = """
+UPDATE crm_label AS l SET position = o.position
+FROM (
+    SELECT id, row_number() OVER (PARTITION BY owner_id ORDER BY id) - 1 AS position
+    FROM crm_label
+) AS o
+WHERE l.id = o.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0017_sync_tombstones"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="label",
+            name="position",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(BACKFILL_POSITIONS_SQL, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name="label",
+            index=models.Index(
+                fields=["owner", "position"], name="label_owner_position_idx"
+            ),
+        ),
+    ]
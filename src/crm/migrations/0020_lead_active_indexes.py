@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:56
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # build the indexes without locking crm_lead for writes
+    atomic = False
+
+    dependencies = [
+        ("crm", "0019_archived_leads"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="lead",
+            index=models.Index(
+                condition=models.Q(("is_archived", False)),
+                fields=["owner", "status", "created_at"],
+                name="lead_active_owner_status_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="lead",
+            index=models.Index(
+                condition=models.Q(("is_archived", False)),
+                fields=["-created_at", "-id"],
+                name="lead_active_created_id_idx",
+            ),
+        ),
+    ]
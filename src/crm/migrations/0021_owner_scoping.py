@@ -0,0 +1,91 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# existing rows go to whoever uses them: a campaign / tag to the owner of its
+# oldest lead, a template to its label's owner. Anything unused stays NULL
+# (admin only).
+BACKFILL_OWNERS_SQL = """
+UPDATE crm_campaign AS c SET owner_id = l.owner_id
+FROM (
+    SELECT DISTINCT ON (campaign_id) campaign_id, owner_id
+    FROM crm_lead WHERE campaign_id IS NOT NULL
+    ORDER BY campaign_id, id
+) AS l
+WHERE c.id = l.campaign_id;
+
+UPDATE crm_tag AS t SET owner_id = l.owner_id
+FROM (
+    SELECT DISTINCT ON (lt.tag_id) lt.tag_id, ld.owner_id
+    FROM crm_lead_tags lt JOIN crm_lead ld ON ld.id = lt.lead_id
+    ORDER BY lt.tag_id, lt.lead_id
+) AS l
+WHERE t.id = l.tag_id;
+
+UPDATE crm_template AS t SET owner_id = lb.owner_id
+FROM crm_label lb
+WHERE lb.id = t.label_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0020_lead_active_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="campaign",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="campaigns",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="tag",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="tags",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="template",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="templates",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunSQL(BACKFILL_OWNERS_SQL, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name="campaign",
+            index=models.Index(
+                fields=["owner", "-created_at"], name="campaign_owner_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tag",
+            index=models.Index(fields=["owner", "name"], name="tag_owner_name_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="template",
+            index=models.Index(
+                fields=["owner", "-updated_at"], name="template_owner_updated_idx"
+            ),
+        ),
+    ]
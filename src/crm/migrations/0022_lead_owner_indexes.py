@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # build the indexes without locking crm_lead for writes
+    atomic = False
+
+    dependencies = [
+        ("crm", "0021_owner_scoping"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="lead",
+            index=models.Index(
+                condition=models.Q(("is_archived", False)),
+                fields=["owner", "-created_at", "-id"],
+                name="lead_owner_created_id_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="lead",
+            index=models.Index(
+                condition=models.Q(("is_archived", False)),
+                fields=["owner", "-updated_at"],
+                name="lead_owner_updated_idx",
+            ),
+        ),
+    ]
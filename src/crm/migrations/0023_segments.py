@@ -0,0 +1,198 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+SEGMENT_TRIGGERS_SQL = """
+-- memberships of these leads go away now (deleted, or moved to another
+-- owner whose segments they were never checked against)
+CREATE OR REPLACE FUNCTION crm_segment_drop_members(p_leads bigint[])
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    WITH dropped AS (
+        DELETE FROM crm_segmentmember WHERE lead_id = ANY(p_leads)
+        RETURNING segment_id
+    )
+    UPDATE crm_segment AS s SET member_count = s.member_count - d.n
+    FROM (SELECT segment_id, count(*) AS n FROM dropped GROUP BY 1) AS d
+    WHERE s.id = d.segment_id;
+END
+$$;
+
+-- queue changed leads for crm.segments.refresh_pending, one INSERT per
+-- statement; owners without segments queue nothing
+CREATE OR REPLACE FUNCTION crm_segment_lead_changed() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM crm_segment_drop_members(ARRAY(SELECT id FROM old_rows));
+        DELETE FROM crm_pendingsegmentlead q USING old_rows o WHERE q.lead_id = o.id;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO crm_pendingsegmentlead (lead_id, queued_at)
+        SELECT n.id, now() FROM new_rows n
+        WHERE EXISTS (SELECT 1 FROM crm_segment s WHERE s.owner_id = n.owner_id)
+        ON CONFLICT (lead_id) DO NOTHING;
+        RETURN NULL;
+    END IF;
+
+    PERFORM crm_segment_drop_members(ARRAY(
+        SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE n.owner_id <> o.owner_id
+    ));
+    -- only columns a rule can look at; updated_at / notes / search_vector
+    -- churn doesn't queue anything
+    INSERT INTO crm_pendingsegmentlead (lead_id, queued_at)
+    SELECT n.id, now() FROM new_rows n JOIN old_rows o ON o.id = n.id
+    WHERE (n.name, n.email, n.profile_url, n.source, n.status, n.is_archived,
+           n.campaign_id, n.owner_id, n.created_at)
+          IS DISTINCT FROM
+          (o.name, o.email, o.profile_url, o.source, o.status, o.is_archived,
+           o.campaign_id, o.owner_id, o.created_at)
+      AND EXISTS (SELECT 1 FROM crm_segment s WHERE s.owner_id = n.owner_id)
+    ON CONFLICT (lead_id) DO NOTHING;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION crm_segment_lead_tags_changed() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO crm_pendingsegmentlead (lead_id, queued_at)
+        SELECT DISTINCT l.id, now()
+        FROM new_rows t JOIN crm_lead l ON l.id = t.lead_id
+        WHERE EXISTS (SELECT 1 FROM crm_segment s WHERE s.owner_id = l.owner_id)
+        ON CONFLICT (lead_id) DO NOTHING;
+    ELSE
+        INSERT INTO crm_pendingsegmentlead (lead_id, queued_at)
+        SELECT DISTINCT l.id, now()
+        FROM old_rows t JOIN crm_lead l ON l.id = t.lead_id
+        WHERE EXISTS (SELECT 1 FROM crm_segment s WHERE s.owner_id = l.owner_id)
+        ON CONFLICT (lead_id) DO NOTHING;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER crm_lead_segment_insert
+    AFTER INSERT ON crm_lead REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION crm_segment_lead_changed();
+CREATE TRIGGER crm_lead_segment_update
+    AFTER UPDATE ON crm_lead REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION crm_segment_lead_changed();
+CREATE TRIGGER crm_lead_segment_delete
+    AFTER DELETE ON crm_lead REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION crm_segment_lead_changed();
+CREATE TRIGGER crm_lead_tags_segment_insert
+    AFTER INSERT ON crm_lead_tags REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION crm_segment_lead_tags_changed();
+CREATE TRIGGER crm_lead_tags_segment_delete
+    AFTER DELETE ON crm_lead_tags REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION crm_segment_lead_tags_changed();
+"""
+
+DROP_SEGMENT_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS crm_lead_segment_insert ON crm_lead;
+DROP TRIGGER IF EXISTS crm_lead_segment_update ON crm_lead;
+DROP TRIGGER IF EXISTS crm_lead_segment_delete ON crm_lead;
+DROP TRIGGER IF EXISTS crm_lead_tags_segment_insert ON crm_lead_tags;
+DROP TRIGGER IF EXISTS crm_lead_tags_segment_delete ON crm_lead_tags;
+DROP FUNCTION IF EXISTS crm_segment_lead_changed();
+DROP FUNCTION IF EXISTS crm_segment_lead_tags_changed();
+DROP FUNCTION IF EXISTS crm_segment_drop_members(bigint[]);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0022_lead_owner_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingSegmentLead",
+            fields=[
+                ("lead_id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("queued_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Segment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=120)),
+                ("rules", models.JSONField(default=dict)),
+                ("member_count", models.BigIntegerField(default=0)),
+                ("refreshed_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="segments",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="SegmentMember",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "lead",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="segment_memberships",
+                        to="crm.lead",
+                    ),
+                ),
+                (
+                    "segment",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="members",
+                        to="crm.segment",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="segment",
+            constraint=models.UniqueConstraint(
+                fields=("owner", "name"), name="uniq_segment_name_per_owner"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="segmentmember",
+            constraint=models.UniqueConstraint(
+                fields=("segment", "lead"), name="uniq_segment_member"
+            ),
+        ),
+        migrations.RunSQL(SEGMENT_TRIGGERS_SQL, DROP_SEGMENT_TRIGGERS_SQL),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:12
+
+from django.db import migrations, models
+
+DEDUPE_TRIGGER_SQL = """
+-- leads the incremental scan already went past are never looked at again,
+-- so a change to a blocking column queues them for crm.dedupe.find_duplicates
+CREATE OR REPLACE FUNCTION crm_dedupe_lead_changed() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO crm_pendingdedupelead (lead_id, queued_at)
+    SELECT n.id, now() FROM new_rows n JOIN old_rows o ON o.id = n.id
+    WHERE (n.name, n.email, n.profile_url, n.owner_id)
+          IS DISTINCT FROM
+          (o.name, o.email, o.profile_url, o.owner_id)
+      AND n.id <= (SELECT last_lead_id FROM crm_dedupeprogress WHERE name = 'leads')
+    ON CONFLICT (lead_id) DO NOTHING;
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER crm_lead_dedupe_update
+    AFTER UPDATE ON crm_lead REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION crm_dedupe_lead_changed();
+"""
+
+DROP_DEDUPE_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS crm_lead_dedupe_update ON crm_lead;
+DROP FUNCTION IF EXISTS crm_dedupe_lead_changed();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0023_segments"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingDedupeLead",
+            fields=[
+                ("lead_id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("queued_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunSQL(DEDUPE_TRIGGER_SQL, DROP_DEDUPE_TRIGGER_SQL),
+    ]
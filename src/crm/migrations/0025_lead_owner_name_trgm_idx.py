@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:15
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    BtreeGistExtension,
+    RemoveIndexConcurrently,
+)
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # build the index without locking crm_lead for writes
+    atomic = False
+
+    dependencies = [
+        ("crm", "0024_pending_dedupe_lead"),
+    ]
+
+    operations = [
+        # btree_gist: the integer owner_id column in a GiST index
+        BtreeGistExtension(),
+        AddIndexConcurrently(
+            model_name="lead",
+            index=django.contrib.postgres.indexes.GistIndex(
+                models.F("owner"),
+                django.contrib.postgres.indexes.OpClass("name", name="gist_trgm_ops"),
+                name="lead_owner_name_trgm_idx",
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name="lead",
+            name="lead_name_trgm_idx",
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:40
+
+from django.contrib.postgres.operations import RemoveIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # drop the index without locking crm_lead for writes
+    atomic = False
+
+    dependencies = [
+        ("crm", "0025_lead_owner_name_trgm_idx"),
+    ]
+
+    operations = [
+        # every active-lead page is per owner now, lead_owner_created_id_idx
+        # serves it
+        RemoveIndexConcurrently(
+            model_name="lead",
+            name="lead_active_created_id_idx",
+        ),
+    ]
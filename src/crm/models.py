@@ -1,10 +1,20 @@
 from django.db import models
 from django.conf import settings  # <--instead of get_user_model
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, GistIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import RegexValidator
 
 
 
 class Campaign(models.Model):
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="campaigns",
+        null=True,
+        blank=True
+    )
     name = models.CharField(max_length=150)
     start_date = models.DateField()
     end_date = models.DateField(null=True, blank=True)
@@ -15,19 +25,43 @@ class Campaign(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["owner", "-created_at"], name="campaign_owner_created_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
 
 class Tag(models.Model):
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="tags",
+        null=True,
+        blank=True
+    )
     name = models.CharField(max_length=50)
     color = models.CharField(max_length=7, default="#cccccc")
+    # change tracking for conditional GET / sync, see crm.conditional
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "name"], name="tag_owner_name_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class ActiveLeadManager(models.Manager):
+    """Leads that aren't archived: the hot working set the partial indexes cover."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_archived=False)
+
+
 class Lead(models.Model):
     STATUS_CHOICES = [
         ("new", "New"),
@@ -61,16 +95,194 @@ class Lead(models.Model):
         blank=True
     )
     notes = models.TextField(blank=True, default="")
+    # kept up to date by a DB trigger (migration 0011), see crm.search
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Lead.objects is active leads only; everything Django does implicitly
+    # (admin, unique validators, related managers) sees all of them
+    objects = ActiveLeadManager()
+    all_objects = models.Manager()
+
     class Meta:
         ordering = ["-created_at"]
+        default_manager_name = "all_objects"
+        indexes = [
+            # (created_at, id) across owners and archived rows: the admin
+            # changelist; tenant pages use lead_owner_created_id_idx
+            models.Index(fields=["-created_at", "-id"], name="lead_created_id_idx"),
+            GinIndex(fields=["search_vector"], name="lead_search_vector_idx"),
+            # duplicate detection blocking keys, see crm.dedupe
+            # (owner_id, name) so the trigram match stays inside one owner
+            GistIndex("owner", OpClass("name", name="gist_trgm_ops"), name="lead_owner_name_trgm_idx"),
+            models.Index(
+                fields=["owner", "profile_url"],
+                condition=models.Q(profile_url__isnull=False),
+                name="lead_owner_profile_url_idx",
+            ),
+            # hot set only: archived rows are most of the table and never
+            # looked at by everyday queries
+            models.Index(
+                fields=["owner", "status", "created_at"],
+                condition=models.Q(is_archived=False),
+                name="lead_active_owner_status_idx",
+            ),
+            # per-tenant paths: the lead list (keyset) and recent activity
+            models.Index(
+                fields=["owner", "-created_at", "-id"],
+                condition=models.Q(is_archived=False),
+                name="lead_owner_created_id_idx",
+            ),
+            models.Index(
+                fields=["owner", "-updated_at"],
+                condition=models.Q(is_archived=False),
+                name="lead_owner_updated_idx",
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # so a save that moves the lead can refresh the old campaign's analytics;
+        # crm.signals.lead_changed keeps it current after every save, which is
+        # also where instances created in Python first get it
+        instance._loaded_campaign_id = instance.__dict__.get("campaign_id")
+        return instance
 
     def __str__(self):
         return f"{self.name} <{self.email}>"
 
 
+class ArchivedLead(models.Model):
+    """
+    Cold storage for leads archived long ago, moved out of crm_lead in
+    chunks by crm.archive (`manage.py archive_leads`). Keeps the original id.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=200)
+    email = models.EmailField()
+    profile_url = models.URLField(blank=True, null=True)
+    source = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=20, choices=Lead.STATUS_CHOICES)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="archived_leads"
+    )
+    campaign = models.ForeignKey(
+        Campaign, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    tag_ids = ArrayField(models.BigIntegerField(), default=list, blank=True)
+    notes = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-archived_at"]
+
+    def __str__(self):
+        return f"{self.name} <{self.email}> (archived)"
+
+
+class LeadDuplicate(models.Model):
+    """
+    Candidate duplicate pair found by crm.dedupe. `lead` is the newer row,
+    `candidate` the older one it probably duplicates.
+    """
+    REASON_CHOICES = [
+        ("profile_url", "Same profile URL"),
+        ("email", "Same email local part"),
+        ("name", "Similar name"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("dismissed", "Dismissed"),
+    ]
+
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name="duplicate_candidates")
+    candidate = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-score", "-id"]
+        constraints = [
+            models.UniqueConstraint(fields=["lead", "candidate"], name="uniq_lead_duplicate_pair")
+        ]
+
+    def __str__(self):
+        return f"{self.lead_id} ~ {self.candidate_id} ({self.reason}, {self.score:.2f})"
+
+
+class DedupeProgress(models.Model):
+    """High-water mark of the incremental duplicate scan (crm.dedupe)."""
+    name = models.CharField(max_length=50, primary_key=True)
+    last_lead_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_lead_id}"
+
+
+class PendingDedupeLead(models.Model):
+    """
+    Already-scanned lead whose name / email / profile_url changed. Queued by
+    the crm_lead update trigger (migration 0024), drained by
+    crm.dedupe.find_duplicates.
+    """
+    lead_id = models.BigIntegerField(primary_key=True)
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.lead_id} queued {self.queued_at:%Y-%m-%d %H:%M}"
+
+
+
+
+class LeadFunnelCount(models.Model):
+    """
+    Active (non-archived) lead count per owner / campaign / status. Kept
+    current by statement-level triggers on crm_lead (migration 0015);
+    `manage.py rebuild_lead_funnel` recomputes it from scratch.
+    """
+    # rows are only ever written by the crm_lead triggers: deleting a user or
+    # campaign updates/deletes its leads, which drains these counts to zero
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        related_name="+",
+        db_constraint=False,
+    )
+    campaign = models.ForeignKey(
+        Campaign,
+        on_delete=models.DO_NOTHING,
+        null=True,
+        blank=True,
+        related_name="+",
+        db_constraint=False,
+    )
+    status = models.CharField(max_length=20, choices=Lead.STATUS_CHOICES)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # two partial uniques because NULL campaign rows never conflict
+            models.UniqueConstraint(
+                fields=["owner", "campaign", "status"],
+                condition=models.Q(campaign__isnull=False),
+                name="uniq_funnel_owner_campaign_status",
+            ),
+            models.UniqueConstraint(
+                fields=["owner", "status"],
+                condition=models.Q(campaign__isnull=True),
+                name="uniq_funnel_owner_status_no_campaign",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.owner_id}/{self.campaign_id}/{self.status}: {self.count}"
 
 
 class Label(models.Model):
@@ -89,15 +301,31 @@ class Label(models.Model):
         default="#ffffff",
         validators=[RegexValidator(regex=r'^#[0-9A-Fa-f]{6}$')]
     )
+    # user's own ordering, rewritten in one statement by labels/reorder/
+    position = models.PositiveIntegerField(default=0)
+    # change tracking for conditional GET / sync, see crm.conditional
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("owner", "name")
+        indexes = [
+            models.Index(fields=["owner", "updated_at"], name="label_owner_updated_idx"),
+            models.Index(fields=["owner", "position"], name="label_owner_position_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.color})"
 
 
 class Template(models.Model):
+    # same as label.owner, kept on the row so per-user queries don't join
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="templates",
+        null=True,
+        blank=True
+    )
     name = models.CharField(max_length=120)
     content = models.TextField()
     label = models.ForeignKey('Label', on_delete=models.PROTECT, related_name='templates')
@@ -108,4 +336,95 @@ class Template(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['name', 'label'], name='uniq_template_name_per_label')
         ]
+        indexes = [
+            models.Index(fields=['label', 'updated_at'], name='template_label_updated_idx'),
+            models.Index(fields=['owner', '-updated_at'], name='template_owner_updated_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # owner follows the label (usually already loaded by the serializer)
+        if self.label_id is not None and self.label.owner_id is not None:
+            self.owner_id = self.label.owner_id
+        super().save(*args, **kwargs)
+
+
+class SyncTombstone(models.Model):
+    """
+    A deleted Label / Template, kept so GET /api/sync/ can tell clients to
+    drop it. Pruned after crm.sync.TOMBSTONE_RETENTION.
+    """
+    KIND_CHOICES = [
+        ("label", "Label"),
+        ("template", "Template"),
+    ]
+
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "deleted_at"], name="tombstone_owner_deleted_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class Segment(models.Model):
+    """
+    A saved, rule-defined set of the owner's active leads (rules: see
+    crm.segments). Membership is materialized in SegmentMember and kept
+    current incrementally; member_count moves with it.
+    """
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="segments")
+    name = models.CharField(max_length=120)
+    rules = models.JSONField(default=dict)
+    member_count = models.BigIntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "name"], name="uniq_segment_name_per_owner"),
+        ]
 
+    def __str__(self):
+        return f"{self.name} ({self.member_count})"
+
+
+class SegmentMember(models.Model):
+    # (segment, lead) unique index serves segment lookups, the FK index on
+    # lead serves the triggers
+    segment = models.ForeignKey(Segment, on_delete=models.CASCADE, related_name="members", db_index=False)
+    # no FK constraint: leads are also deleted by raw SQL (crm.archive), the
+    # crm_lead triggers (migration 0023) drop their memberships instead
+    lead = models.ForeignKey(
+        Lead,
+        on_delete=models.DO_NOTHING,
+        related_name="segment_memberships",
+        db_constraint=False,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["segment", "lead"], name="uniq_segment_member"),
+        ]
+
+    def __str__(self):
+        return f"{self.segment_id} <- {self.lead_id}"
+
+
+class PendingSegmentLead(models.Model):
+    """
+    Lead whose segment membership needs re-checking. Queued by the crm_lead /
+    crm_lead_tags triggers (only for owners that have segments), drained by
+    crm.segments.refresh_pending.
+    """
+    lead_id = models.BigIntegerField(primary_key=True)
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.lead_id} queued {self.queued_at:%Y-%m-%d %H:%M}"
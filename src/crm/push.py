@@ -0,0 +1,91 @@
+# src/crm/push.py
+"""
+Web push fan-out over the legacy push_subscriptions table (auth_app,
+unmanaged).
+
+Subscriptions are read in keyset chunks (id > last ORDER BY id LIMIT n, so
+no cursor or transaction stays open while the network is busy) and streamed
+straight into WebPushClient.send_many: a bounded thread pool with one pooled
+Session per push-service host. Endpoints the push service reports gone
+(404 / 410) are collected and deleted in bulk, one DELETE per PRUNE_BATCH.
+"""
+import logging
+import operator
+import time
+from functools import reduce
+
+from django.apps import apps
+from django.db.models import Q
+
+from src.integrations.webpush_client import WebPushClient
+
+# see crm.legacy_messages for why this goes through the app registry
+PushSubscriptions = apps.get_model("auth_app", "PushSubscriptions")
+
+CHUNK_SIZE = 2000
+PRUNE_BATCH = 1000
+
+logger = logging.getLogger("crm")
+
+
+def subscriptions_for_emails(emails):
+    """Subscriptions of the legacy users with these emails (case-insensitive)."""
+    emails = [email for email in emails if email]
+    if not emails:
+        return PushSubscriptions.objects.none()
+    return PushSubscriptions.objects.filter(reduce(operator.or_, (Q(user__email__iexact=e) for e in emails)))
+
+
+def _stream(subscriptions, chunk_size):
+    last_id = 0
+    while True:
+        chunk = list(
+            subscriptions.filter(pk__gt=last_id).order_by("pk").values_list("pk", "endpoint")[:chunk_size]
+        )
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1][0]
+
+
+def _prune(ids):
+    if not ids:
+        return 0
+    deleted, _ = PushSubscriptions.objects.filter(pk__in=ids).delete()
+    return deleted
+
+
+def fan_out(subscriptions=None, client=None, chunk_size=CHUNK_SIZE):
+    """
+    Push to every subscription in `subscriptions` (a PushSubscriptions
+    queryset, default all of them). Returns {"sent", "failed", "pruned",
+    "seconds"}; failures other than 404 / 410 are only counted and logged.
+    """
+    if subscriptions is None:
+        subscriptions = PushSubscriptions.objects.all()
+    owns_client = client is None
+    client = client or WebPushClient()
+
+    started = time.monotonic()
+    sent = failed = pruned = 0
+    gone = []
+    try:
+        for result in client.send_many(_stream(subscriptions, chunk_size)):
+            if result.ok:
+                sent += 1
+            elif result.gone:
+                gone.append(result.key)
+                if len(gone) >= PRUNE_BATCH:
+                    pruned += _prune(gone)
+                    gone = []
+            else:
+                failed += 1
+                logger.debug("Push to %s failed: %s %s", result.endpoint, result.status, result.error)
+        pruned += _prune(gone)
+    finally:
+        if owns_client:
+            client.close()
+
+    seconds = round(time.monotonic() - started, 3)
+    logger.info("Push fan-out: %s sent, %s failed, %s pruned in %ss", sent, failed, pruned, seconds)
+    return {"sent": sent, "failed": failed, "pruned": pruned, "seconds": seconds}
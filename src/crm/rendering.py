@@ -0,0 +1,232 @@
+# src/crm/rendering.py
+"""
+Template personalization.
+
+    Hi {{ lead.first_name | "there" }}, saw you came in through {{ campaign.name }}.
+
+Content is parsed once into a CompiledTemplate: a tuple of literal strings
+and placeholder slots, plus the exact columns the placeholders read. The
+compiled form is cached per process by (template id, updated_at), so an
+edit is picked up on the next render and rendering itself is a few dict
+lookups and one "".join().
+
+Only the whitelisted fields below can be referenced; anything else is a
+TemplateSyntaxError when the template is saved.
+"""
+import json
+import multiprocessing
+import re
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from rest_framework import serializers
+
+from .filters import LeadFilterSerializer
+
+COMPILED_CACHE_SIZE = 1024
+RENDER_CHUNK_SIZE = 1000
+MAX_RENDER_WORKERS = 8
+# below this many leads a pool costs more to start than it saves
+POOL_MIN_LEADS = 20000
+
+PLACEHOLDER_RE = re.compile(
+    r"""\{\{\s*
+        (?P<root>[a-z_]+)\.(?P<attr>[a-z_]+)\s*
+        (?:\|\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[^}]*?))\s*)?
+    \}\}""",
+    re.VERBOSE,
+)
+
+
+def _first_word(value):
+    return value.split()[0] if value and value.split() else ""
+
+
+def _rest_words(value):
+    return " ".join(value.split()[1:]) if value else ""
+
+
+# root -> attr -> (column on a lead queryset, transform or None)
+FIELDS = {
+    "lead": {
+        "name": ("name", None),
+        "first_name": ("name", _first_word),
+        "last_name": ("name", _rest_words),
+        "email": ("email", None),
+        "profile_url": ("profile_url", None),
+        "source": ("source", None),
+        "status": ("status", None),
+    },
+    "campaign": {
+        "name": ("campaign__name", None),
+        "start_date": ("campaign__start_date", None),
+        "end_date": ("campaign__end_date", None),
+    },
+    "owner": {
+        "first_name": ("owner__first_name", None),
+        "last_name": ("owner__last_name", None),
+        "username": ("owner__username", None),
+        "email": ("owner__email", None),
+    },
+}
+
+
+class TemplateSyntaxError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Slot:
+    placeholder: str
+    column: str
+    transform: object
+    fallback: object  # None = no fallback given
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    parts: tuple
+    columns: tuple
+
+    def render(self, values):
+        """
+        Render against `values`, a dict of column -> value (e.g. one row of
+        Lead.objects.values(*compiled.columns)). Returns (text, missing),
+        `missing` being the placeholders that had no value and no fallback.
+        """
+        out, missing = [], []
+        for part in self.parts:
+            if part.__class__ is str:
+                out.append(part)
+                continue
+            value = values.get(part.column)
+            if value is not None and part.transform is not None:
+                value = part.transform(value)
+            if value is None or value == "":
+                if part.fallback is None:
+                    missing.append(part.placeholder)
+                    continue
+                value = part.fallback
+            out.append(value if value.__class__ is str else str(value))
+        return "".join(out), missing
+
+
+def compile_content(content):
+    parts, columns, position = [], [], 0
+    for match in PLACEHOLDER_RE.finditer(content):
+        root, attr = match["root"], match["attr"]
+        field = FIELDS.get(root, {}).get(attr)
+        if field is None:
+            raise TemplateSyntaxError(f"Unknown placeholder {{{{{root}.{attr}}}}}")
+        if match.start() > position:
+            parts.append(content[position:match.start()])
+        fallback = next((g for g in (match["dq"], match["sq"], match["bare"]) if g is not None), None)
+        column, transform = field
+        parts.append(Slot(f"{root}.{attr}", column, transform, fallback))
+        if column not in columns:
+            columns.append(column)
+        position = match.end()
+    if position < len(content):
+        parts.append(content[position:])
+
+    rest = PLACEHOLDER_RE.sub("", content)
+    if "{{" in rest or "}}" in rest:
+        raise TemplateSyntaxError("Unbalanced or malformed {{ placeholder }}")
+    return CompiledTemplate(tuple(parts), tuple(columns))
+
+
+_compiled = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def compiled_template(template):
+    """CompiledTemplate for a Template instance, parsed once per (id, updated_at)."""
+    key = (template.pk, template.updated_at)
+    with _compiled_lock:
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            _compiled.move_to_end(key)
+            return compiled
+
+    compiled = compile_content(template.content)
+    with _compiled_lock:
+        _compiled[key] = compiled
+        while len(_compiled) > COMPILED_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return compiled
+
+
+def render_for_lead(template, leads, lead_id):
+    """
+    Render `template` for the lead `lead_id` out of `leads` (a queryset
+    already scoped to the caller). One query for exactly the referenced
+    columns; None if the lead isn't there.
+    """
+    compiled = compiled_template(template)
+    values = leads.filter(pk=lead_id).values("pk", *compiled.columns).first()
+    if values is None:
+        return None
+    return compiled.render(values)
+
+
+class BatchRenderSerializer(serializers.Serializer):
+    """
+    {"filter": {<crm.filters expression>}}
+    Rendered in the request's own process; for a process pool use the
+    render_template management command.
+    """
+    filter = LeadFilterSerializer(required=False, default=dict)
+
+
+def _render_chunk(compiled, rows):
+    lines = []
+    for row in rows:
+        text, missing = compiled.render(row)
+        lines.append(json.dumps({"lead": row["pk"], "rendered": text, "missing": missing}))
+    return "\n".join(lines) + "\n"
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def render_batch(template, leads, workers=1, chunk_size=RENDER_CHUNK_SIZE):
+    """
+    NDJSON lines (one str per chunk) rendering `template` for every lead in
+    `leads`. Rows come off a server-side cursor with only the referenced
+    columns; with workers > 1 (and a batch large enough to be worth it)
+    chunks are rendered in a process pool, at most 2 per worker in flight,
+    and still come back in lead order.
+
+    The pool forks the calling process, so only pass workers > 1 from a
+    single-threaded process (the render_template command), never from a
+    web request.
+    """
+    compiled = compiled_template(template)
+    rows = leads.values("pk", *compiled.columns).iterator(chunk_size=chunk_size)
+    chunks = _chunks(rows, chunk_size)
+
+    if workers <= 1 or leads.count() < POOL_MIN_LEADS:
+        for chunk in chunks:
+            yield _render_chunk(compiled, chunk)
+        return
+
+    # fork: workers inherit the loaded apps and only ever render, never
+    # query, so the inherited connection (and open cursor) stay untouched
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_render_chunk, compiled, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
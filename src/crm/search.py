@@ -0,0 +1,47 @@
+# src/crm/search.py
+"""
+Full-text search over leads.
+
+crm_lead.search_vector is maintained by a trigger (migration 0011) from
+name and email (weight A), source (B) and notes (C), using the 'simple'
+config so names and emails aren't stemmed. Queries match every typed term
+as a prefix, which is what type-ahead needs, and are served by the GIN
+index on search_vector.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+
+SEARCH_CONFIG = "simple"
+MAX_TERMS = 8
+
+# same split the email column gets in crm_lead_search_vector()
+_TERM_RE = re.compile(r"[^\W_]+")
+
+
+def prefix_query(text):
+    """
+    "jo smi" -> to_tsquery('simple', 'jo:* & smi:*'), or None when the text
+    has nothing searchable in it.
+    """
+    terms = _TERM_RE.findall((text or "").lower())[:MAX_TERMS]
+    if not terms:
+        return None
+    return SearchQuery(
+        " & ".join(f"{term}:*" for term in terms),
+        search_type="raw",
+        config=SEARCH_CONFIG,
+    )
+
+
+def search_leads(queryset, text):
+    """Filter `queryset` to leads matching `text`, best match first."""
+    query = prefix_query(text)
+    if query is None:
+        return queryset.none()
+    return (
+        queryset.filter(search_vector=query)
+        .annotate(rank=SearchRank(F("search_vector"), query))
+        .order_by("-rank", "-created_at", "-id")
+    )
@@ -0,0 +1,300 @@
+# src/crm/segments.py
+"""
+Rule-defined lead segments with materialized membership.
+
+    {"all": [
+        {"field": "status", "op": "in", "value": ["new", "contacted"]},
+        {"field": "tag", "op": "any", "value": [3, 7]},
+        {"any": [
+            {"field": "source", "op": "eq", "value": "linkedin"},
+            {"not": {"field": "campaign", "op": "is_null"}}
+        ]}
+    ]}
+
+Rules compile to one Q (a single WHERE predicate; tag conditions are
+EXISTS subqueries on crm_lead_tags, never joins) over the owner's active
+leads. Members live in crm_segmentmember:
+
+  * refresh_segment() re-evaluates one segment against every lead, when it
+    is created or its rules change;
+  * the crm_lead / crm_lead_tags triggers (migration 0023) queue leads whose
+    rule-visible columns or tags change, and refresh_pending() re-checks only
+    those leads against their owner's segments. Write paths (lead / tag
+    signals, import, batch, bulk tagging, merge) run it for their owner once
+    their transaction commits, see refresh_pending_on_commit(); the
+    refresh_segments command on a schedule (docker-compose "segments")
+    catches writes made anywhere else. It never runs on a read.
+
+Reading members is then an index lookup on (segment_id, lead_id), and
+Segment.member_count is kept in step by both paths.
+"""
+import operator
+from datetime import datetime, time
+from functools import reduce
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Lead, Segment, SegmentMember
+
+MAX_CONDITIONS = 50
+MAX_DEPTH = 5
+PENDING_CHUNK_SIZE = 5000
+
+LeadTag = Lead.tags.through
+
+TEXT_OPS = ("eq", "ne", "in", "not_in", "contains", "startswith", "is_empty")
+CHOICE_OPS = ("eq", "ne", "in", "not_in")
+ID_OPS = ("eq", "ne", "in", "not_in", "is_null")
+TAG_OPS = ("any", "all", "none")
+DATE_OPS = ("before", "after")
+
+# field -> (lead column, kind)
+FIELDS = {
+    "name": ("name", "text"),
+    "email": ("email", "text"),
+    "source": ("source", "text"),
+    "profile_url": ("profile_url", "text"),
+    "status": ("status", "choice"),
+    "campaign": ("campaign_id", "id"),
+    "tag": (None, "tag"),
+    "created_at": ("created_at", "date"),
+}
+OPS = {"text": TEXT_OPS, "choice": CHOICE_OPS, "id": ID_OPS, "tag": TAG_OPS, "date": DATE_OPS}
+STATUSES = {value for value, _ in Lead.STATUS_CHOICES}
+
+
+class SegmentRuleError(ValueError):
+    pass
+
+
+class _Compiler:
+    def __init__(self):
+        self.conditions = 0
+        self.tags = set()
+        self.campaigns = set()
+
+    def node(self, rule, depth):
+        if not isinstance(rule, dict):
+            raise SegmentRuleError("Each rule must be an object.")
+        if depth > MAX_DEPTH:
+            raise SegmentRuleError(f"Rules nest deeper than {MAX_DEPTH} levels.")
+        if "all" in rule or "any" in rule:
+            key = "all" if "all" in rule else "any"
+            children = rule[key]
+            if len(rule) != 1 or not isinstance(children, list) or not children:
+                raise SegmentRuleError(f'"{key}" takes a non-empty list of rules.')
+            combine = operator.and_ if key == "all" else operator.or_
+            return reduce(combine, [self.node(child, depth + 1) for child in children])
+        if "not" in rule:
+            if len(rule) != 1:
+                raise SegmentRuleError('"not" takes a single rule.')
+            return ~self.node(rule["not"], depth + 1)
+        return self.condition(rule)
+
+    def condition(self, rule):
+        self.conditions += 1
+        if self.conditions > MAX_CONDITIONS:
+            raise SegmentRuleError(f"At most {MAX_CONDITIONS} conditions.")
+        field, op = rule.get("field"), rule.get("op")
+        if field not in FIELDS:
+            raise SegmentRuleError(f"Unknown field {field!r}.")
+        column, kind = FIELDS[field]
+        if op not in OPS[kind]:
+            raise SegmentRuleError(f"{field} supports {', '.join(OPS[kind])}, not {op!r}.")
+        value = rule.get("value")
+
+        if kind == "tag":
+            ids = self.ids(field, value, many=True)
+            self.tags.update(ids)
+            if op == "all":
+                q = Q()
+                for tag_id in ids:
+                    q &= Q(Exists(LeadTag.objects.filter(lead_id=OuterRef("pk"), tag_id=tag_id)))
+                return q
+            has_any = Q(Exists(LeadTag.objects.filter(lead_id=OuterRef("pk"), tag_id__in=ids)))
+            return has_any if op == "any" else ~has_any
+
+        if op == "is_null":
+            return Q(**{f"{column}__isnull": True})
+        if op == "is_empty":
+            return Q(**{f"{column}__isnull": True}) | Q(**{column: ""})
+        if kind == "date":
+            if not isinstance(value, str):
+                raise SegmentRuleError(f"{field} needs an ISO 8601 date/time.")
+            try:
+                moment = parse_datetime(value)
+                if moment is None and parse_date(value) is not None:
+                    moment = datetime.combine(parse_date(value), time.min)
+            except ValueError:
+                moment = None
+            if moment is None:
+                raise SegmentRuleError(f"{field} needs an ISO 8601 date/time.")
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+            return Q(**{f"{column}__lt" if op == "before" else f"{column}__gte": moment})
+
+        if kind == "id":
+            values = self.ids(field, value, many=op in ("in", "not_in"))
+            self.campaigns.update(values)
+        else:
+            values = self.strings(field, value, many=op in ("in", "not_in"))
+            if kind == "choice" and not STATUSES.issuperset(values):
+                raise SegmentRuleError(f"Unknown status in {sorted(set(values) - STATUSES)}.")
+
+        if op in ("in", "not_in"):
+            q = Q(**{f"{column}__in": values})
+            return q if op == "in" else ~q
+        lookup = {"eq": "", "ne": "", "contains": "__icontains", "startswith": "__istartswith"}[op]
+        q = Q(**{f"{column}{lookup}": values[0]})
+        return ~q if op == "ne" else q
+
+    def ids(self, field, value, many):
+        values = value if many else [value]
+        if not isinstance(values, list) or not values or not all(
+            isinstance(v, int) and not isinstance(v, bool) and v > 0 for v in values
+        ):
+            raise SegmentRuleError(f"{field} needs {'a list of ids' if many else 'an id'}.")
+        return sorted(set(values))
+
+    def strings(self, field, value, many):
+        values = value if many else [value]
+        if not isinstance(values, list) or not values or not all(isinstance(v, str) for v in values):
+            raise SegmentRuleError(f"{field} needs {'a list of strings' if many else 'a string'}.")
+        return values
+
+
+def compile_rules(rules):
+    """
+    Q for `rules` plus the tag and campaign ids it references, as
+    (q, {"tag": set, "campaign": set}). Raises SegmentRuleError.
+    """
+    compiler = _Compiler()
+    q = compiler.node(rules, 1)
+    return q, {"tag": compiler.tags, "campaign": compiler.campaigns}
+
+
+def matching_leads(segment, lead_ids=None):
+    """The owner's active leads that satisfy the segment's rules (optionally only `lead_ids`)."""
+    q, _ = compile_rules(segment.rules)
+    leads = Lead.objects.filter(owner_id=segment.owner_id).filter(q)
+    if lead_ids is not None:
+        leads = leads.filter(pk__in=lead_ids)
+    return leads
+
+
+SYNC_MEMBERS_SQL = """
+    WITH matching AS ({matching}),
+    added AS (
+        INSERT INTO crm_segmentmember (segment_id, lead_id)
+        SELECT %s, id FROM matching
+        ON CONFLICT (segment_id, lead_id) DO NOTHING
+        RETURNING 1
+    ), removed AS (
+        DELETE FROM crm_segmentmember m
+        WHERE m.segment_id = %s {scope}
+          AND NOT EXISTS (SELECT 1 FROM matching WHERE matching.id = m.lead_id)
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM added), (SELECT count(*) FROM removed)
+"""
+
+
+def _sync_members(cursor, segment, lead_ids=None):
+    # one statement per segment: add the matching leads, drop the rest
+    matching, params = matching_leads(segment, lead_ids).order_by().values("id").query.sql_with_params()
+    if lead_ids is None:
+        sql = SYNC_MEMBERS_SQL.format(matching=matching, scope="")
+        cursor.execute(sql, [*params, segment.pk, segment.pk])
+    else:
+        sql = SYNC_MEMBERS_SQL.format(matching=matching, scope="AND m.lead_id = ANY(%s)")
+        cursor.execute(sql, [*params, segment.pk, segment.pk, list(lead_ids)])
+    return cursor.fetchone()
+
+
+def refresh_segment(segment):
+    """
+    Re-evaluate `segment` against all of its owner's leads. Returns
+    (added, removed) and updates segment.member_count / refreshed_at.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        added, removed = _sync_members(cursor, segment)
+        # exact recount here; the incremental path only applies deltas
+        count = SegmentMember.objects.filter(segment=segment).count()
+        segment.member_count, segment.refreshed_at = count, timezone.now()
+        Segment.objects.filter(pk=segment.pk).update(member_count=count, refreshed_at=segment.refreshed_at)
+    return added, removed
+
+
+DRAIN_SQL = """
+    DELETE FROM crm_pendingsegmentlead
+    WHERE lead_id IN (
+        SELECT q.lead_id FROM crm_pendingsegmentlead q {owner_join}
+        ORDER BY q.lead_id
+        LIMIT %s
+        FOR UPDATE OF q SKIP LOCKED
+    )
+    RETURNING lead_id
+"""
+
+BUMP_COUNT_SQL = """
+    UPDATE crm_segment SET member_count = member_count + %s, refreshed_at = now()
+    WHERE id = %s
+"""
+
+
+def refresh_pending(owner=None, chunk_size=PENDING_CHUNK_SIZE):
+    """
+    Re-check queued leads (optionally only `owner`'s) against their owner's
+    segments, `chunk_size` leads per transaction. Leads another caller is
+    already handling are skipped. Returns how many leads were re-checked.
+    """
+    if owner is not None:
+        owner_id = getattr(owner, "pk", owner)
+        drain = DRAIN_SQL.format(owner_join="JOIN crm_lead l ON l.id = q.lead_id WHERE l.owner_id = %s")
+        drain_params = [owner_id, chunk_size]
+    else:
+        drain = DRAIN_SQL.format(owner_join="")
+        drain_params = [chunk_size]
+
+    checked = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(drain, drain_params)
+            lead_ids = [row[0] for row in cursor.fetchall()]
+            by_owner = {}
+            for pk, lead_owner in Lead.all_objects.filter(pk__in=lead_ids).values_list("pk", "owner_id"):
+                by_owner.setdefault(lead_owner, []).append(pk)
+            for segment in Segment.objects.filter(owner_id__in=by_owner).order_by("id"):
+                added, removed = _sync_members(cursor, segment, by_owner[segment.owner_id])
+                cursor.execute(BUMP_COUNT_SQL, [added - removed, segment.pk])
+        checked += len(lead_ids)
+        if len(lead_ids) < chunk_size:
+            return checked
+
+
+def refresh_pending_on_commit(*owner_ids):
+    """
+    refresh_pending() for these owners once the current transaction commits
+    (right away outside one). With nothing queued that is one empty DELETE.
+    """
+    owner_ids = {owner_id for owner_id in owner_ids if owner_id is not None}
+
+    def refresh():
+        for owner_id in sorted(owner_ids):
+            refresh_pending(owner_id)
+
+    if owner_ids:
+        # a failed refresh only delays membership until the scheduled run,
+        # it must not turn a committed write into an error
+        transaction.on_commit(refresh, robust=True)
+
+
+def current_member_ids(segment_id):
+    """
+    Subquery of a segment's member lead ids as last materialized (lead
+    changes still queued show up after the next refresh_pending()).
+    """
+    return SegmentMember.objects.filter(segment_id=segment_id).values("lead_id")
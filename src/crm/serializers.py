@@ -1,6 +1,9 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
-from .models import Lead, Campaign, Tag, Label, Template
+from .fieldsets import SparseFieldsSerializerMixin
+from .models import Lead, LeadDuplicate, Campaign, Tag, Label, Template, Segment
+from .rendering import TemplateSyntaxError, compile_content
+from .segments import SegmentRuleError, compile_rules
 
 
 
@@ -8,12 +11,24 @@ from .models import Lead, Campaign, Tag, Label, Template
 User = get_user_model()
 
 
+class OwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field that only accepts rows owned by the requesting user."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get("request")
+        if request is None:
+            return queryset
+        return queryset.filter(owner=request.user)
+
+
 
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = "__all__"
+        read_only_fields = ["owner", "updated_at"]
 
 
 
@@ -30,8 +45,9 @@ class CampaignSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "start_date", "end_date", "budget", "is_active", "created_at", "updated_at"]
         read_only_fields = ["id", "created_at", "updated_at"]
 
-class LeadSerializer(serializers.ModelSerializer):
+class LeadSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     owner_username = serializers.CharField(source="owner.username", read_only=True)
+    campaign = OwnedPrimaryKeyRelatedField(queryset=Campaign.objects.all(), required=False, allow_null=True)
 
     class Meta:
         model = Lead
@@ -39,16 +55,67 @@ class LeadSerializer(serializers.ModelSerializer):
             "id", "name", "email", "status", "owner", "owner_username",
             "campaign", "notes", "created_at", "updated_at"
         ]
-        read_only_fields = ["id", "owner_username", "created_at", "updated_at"]
+        read_only_fields = ["id", "owner", "owner_username", "created_at", "updated_at"]
+
+
+class LeadImportSerializer(serializers.ModelSerializer):
+    """
+    Row validator for bulk imports (crm.imports). Owner comes from the
+    importing user; email uniqueness and campaign existence are resolved
+    once per chunk instead of one query per row.
+    """
+    campaign = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Lead
+        fields = ["name", "email", "profile_url", "source", "status", "campaign", "notes"]
+        extra_kwargs = {"email": {"validators": []}}
         
 
 
+class LeadSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Lead
+        fields = ["id", "name", "email", "profile_url", "created_at"]
+        read_only_fields = fields
+
+
+class LeadDuplicateSerializer(serializers.ModelSerializer):
+    lead = LeadSummarySerializer(read_only=True)
+    candidate = LeadSummarySerializer(read_only=True)
+
+    class Meta:
+        model = LeadDuplicate
+        fields = ["id", "lead", "candidate", "score", "reason", "status", "created_at"]
+        read_only_fields = fields
+
+
+class LeadMergeSerializer(serializers.Serializer):
+    primary = serializers.IntegerField(min_value=1)
+    duplicates = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000
+    )
+
+    def validate(self, attrs):
+        if attrs["primary"] in attrs["duplicates"]:
+            raise serializers.ValidationError({"duplicates": "Cannot merge a lead into itself."})
+        attrs["duplicates"] = sorted(set(attrs["duplicates"]))
+        return attrs
+
+
 class LabelSerializer(serializers.ModelSerializer):
     owner = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = Label
-        fields = ["id", "name", "color", "owner"]
+        fields = ["id", "name", "color", "owner", "position"]
+        read_only_fields = ["position"]
+
+
+class LabelReorderSerializer(serializers.Serializer):
+    order = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=5000
+    )
         
 
         
@@ -64,6 +131,14 @@ class TemplateSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'content', 'label', 'label_name', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+    def validate_content(self, content):
+        # placeholders are checked here so rendering never has to fail
+        try:
+            compile_content(content)
+        except TemplateSyntaxError as exc:
+            raise serializers.ValidationError(str(exc))
+        return content
+
     def validate_label(self, label: Label):
         """
         Ensure the label belongs to the requesting user.
@@ -90,3 +165,27 @@ class TemplateSerializer(serializers.ModelSerializer):
         if not label:
             raise serializers.ValidationError({'label': 'Please select a label.'})
         return attrs
+
+
+class SegmentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Segment
+        fields = ["id", "name", "rules", "member_count", "refreshed_at", "created_at", "updated_at"]
+        read_only_fields = ["id", "member_count", "refreshed_at", "created_at", "updated_at"]
+
+    def validate_rules(self, rules):
+        # rules are compiled here so a saved segment always refreshes
+        try:
+            _, referenced = compile_rules(rules)
+        except SegmentRuleError as exc:
+            raise serializers.ValidationError(str(exc))
+
+        request = self.context.get("request")
+        if request is not None:
+            for model, ids in ((Tag, referenced["tag"]), (Campaign, referenced["campaign"])):
+                owned = set(model.objects.filter(id__in=ids, owner=request.user).values_list("id", flat=True))
+                if ids - owned:
+                    raise serializers.ValidationError(
+                        f"Unknown {model._meta.model_name}(s): {sorted(ids - owned)}"
+                    )
+        return rules
@@ -0,0 +1,76 @@
+# src/crm/signals.py
+# Cache invalidation and segment refresh for ORM saves/deletes. Bulk paths
+# that bypass signals (raw SQL, bulk_create/bulk_update, queryset.update)
+# invalidate explicitly.
+# Invalidation waits for COMMIT: bumped any earlier, a reader could recompute
+# from the not yet committed rows and cache them under the new generation.
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .analytics import invalidate_campaign_analytics
+from .dashboard import invalidate_all_dashboards, invalidate_dashboard
+from .models import Campaign, Label, Lead, Tag, Template
+from .segments import refresh_pending_on_commit
+from .sync import record_tombstone
+
+
+@receiver(post_save, sender=Lead)
+@receiver(post_delete, sender=Lead)
+def lead_changed(sender, instance, **kwargs):
+    owner_id = instance.owner_id
+    campaign_ids = (instance.campaign_id, getattr(instance, "_loaded_campaign_id", None))
+
+    def invalidate():
+        invalidate_dashboard(owner_id)
+        invalidate_campaign_analytics(*campaign_ids)
+
+    transaction.on_commit(invalidate)
+    refresh_pending_on_commit(owner_id)
+    # the row now holds this campaign: the next save of the same instance
+    # (or of one just created) moves the lead away from it
+    instance._loaded_campaign_id = instance.campaign_id
+
+
+@receiver(m2m_changed, sender=Lead.tags.through)
+def lead_tags_changed(sender, instance, action, **kwargs):
+    # instance is the lead, or the tag when changed from the tag's side
+    if action.startswith("post_"):
+        refresh_pending_on_commit(instance.owner_id)
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    # its crm_lead_tags rows went with it, the triggers queued those leads
+    refresh_pending_on_commit(instance.owner_id)
+
+
+@receiver(post_save, sender=Campaign)
+@receiver(post_delete, sender=Campaign)
+def campaign_changed(sender, instance, **kwargs):
+    campaign_id = instance.pk
+
+    def invalidate():
+        invalidate_all_dashboards()
+        invalidate_campaign_analytics(campaign_id)
+
+    transaction.on_commit(invalidate)
+
+
+def _deleted_directly(origin, model):
+    # a cascade from deleting the owner takes its tombstones with it anyway
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model is model
+
+
+@receiver(post_delete, sender=Label)
+def label_deleted(sender, instance, origin=None, **kwargs):
+    if instance.owner_id and _deleted_directly(origin, Label):
+        record_tombstone(instance.owner_id, "label", instance.pk)
+
+
+@receiver(post_delete, sender=Template)
+def template_deleted(sender, instance, origin=None, **kwargs):
+    if instance.owner_id and _deleted_directly(origin, Template):
+        record_tombstone(instance.owner_id, "template", instance.pk)
@@ -0,0 +1,78 @@
+# src/crm/tagging.py
+"""
+Bulk tag attach / detach on the Lead.tags through table (crm_lead_tags).
+
+Whatever the number of leads, attaching is one INSERT .. SELECT .. ON
+CONFLICT DO NOTHING (leads x tags expanded inside Postgres, never in Python)
+and detaching one DELETE .. WHERE lead_id IN (subquery). Unlike
+bulk_create(ignore_conflicts=True) the INSERT reports how many links were
+actually new.
+"""
+from django.db import connection, transaction
+from rest_framework import serializers
+
+from .filters import LeadFilterSerializer
+from .models import Lead, Tag
+
+MAX_LEAD_IDS = 10000
+MAX_TAGS = 100
+ACTIONS = ("add", "remove")
+
+LeadTag = Lead.tags.through
+
+
+class BulkTagSerializer(serializers.Serializer):
+    """
+    {"action": "add" | "remove", "tags": [1, 2],
+     "leads": [10, 11, ...]   or   "filter": {<crm.filters expression>}}
+    """
+    action = serializers.ChoiceField(choices=ACTIONS)
+    tags = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_TAGS
+    )
+    leads = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False,
+        max_length=MAX_LEAD_IDS,
+    )
+    filter = LeadFilterSerializer(required=False)
+
+    def validate(self, attrs):
+        if ("leads" in attrs) == ("filter" in attrs):
+            raise serializers.ValidationError("Pass exactly one of `leads` or `filter`.")
+        tags = set(attrs["tags"])
+        owned = Tag.objects.filter(id__in=tags, owner=self.context["request"].user)
+        unknown = tags - set(owned.values_list("id", flat=True))
+        if unknown:
+            raise serializers.ValidationError({"tags": f"Unknown tag(s): {sorted(unknown)}"})
+        attrs["tags"] = sorted(tags)
+        return attrs
+
+
+def add_tags(leads, tag_ids):
+    """Attach `tag_ids` to every lead in `leads`; returns links created."""
+    lead_sql, params = leads.order_by().values("id").query.sql_with_params()
+    sql = f"""
+        INSERT INTO {LeadTag._meta.db_table} (lead_id, tag_id)
+        SELECT l.id, t.id
+        FROM ({lead_sql}) AS l
+        CROSS JOIN unnest(%s::bigint[]) AS t(id)
+        ON CONFLICT (lead_id, tag_id) DO NOTHING
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, tag_ids])
+        return cursor.rowcount
+
+
+def remove_tags(leads, tag_ids):
+    """Detach `tag_ids` from every lead in `leads`; returns links removed."""
+    deleted, _ = LeadTag.objects.filter(
+        lead_id__in=leads.order_by().values("id"), tag_id__in=tag_ids
+    ).delete()
+    return deleted
+
+
+def bulk_tag(action, leads, tag_ids):
+    with transaction.atomic():
+        if action == "add":
+            return add_tags(leads, tag_ids)
+        return remove_tags(leads, tag_ids)
@@ -0,0 +1,606 @@
+import io
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from src.crm import caching
+from src.crm.archive import move_archived_leads
+from src.crm.dedupe import find_duplicates, group_pairs, merge_leads
+from src.crm.imports import import_leads
+from src.crm.legacy_messages import MessageBlocks, MessageGroups
+from src.crm.models import (
+    ArchivedLead, Campaign, DedupeProgress, Label, Lead, LeadDuplicate, PendingDedupeLead, PendingSegmentLead,
+    Segment, Tag, Template,
+)
+from src.crm.pagination import KeysetPagination
+from src.crm.rendering import Slot, TemplateSyntaxError, compile_content
+from src.crm.segments import SegmentRuleError, compile_rules, refresh_pending
+from src.crm.sync import InvalidCursor, decode_cursor, encode_cursor
+## python manage.py test src.crm.tests
+
+Segments = apps.get_model("auth_app", "Segments")
+Users = apps.get_model("auth_app", "Users")
+factory = APIRequestFactory()
+
+
+def drf_request(path="/api/leads/", **params):
+    return Request(factory.get(path, params))
+
+
+class KeysetPaginationTests(SimpleTestCase):
+
+    def test_cursor_round_trip(self):
+        paginator = KeysetPagination()
+        row = SimpleNamespace(pk=42, created_at=datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc))
+
+        cursor = paginator.encode_cursor(row)
+
+        self.assertNotIn("=", cursor)
+        self.assertEqual(paginator.decode_cursor(drf_request(cursor=cursor)), (row.created_at, 42))
+
+    def test_no_cursor(self):
+        self.assertIsNone(KeysetPagination().decode_cursor(drf_request()))
+
+    def test_garbage_cursor_is_not_found(self):
+        for cursor in ("not-base64!", "eyJ0IjogMX0", "e30"):
+            with self.subTest(cursor=cursor), self.assertRaises(NotFound):
+                KeysetPagination().decode_cursor(drf_request(cursor=cursor))
+
+    def test_page_size_is_clamped(self):
+        paginator = KeysetPagination()
+        self.assertEqual(paginator.get_page_size(drf_request(page_size="10000")), 500)
+        self.assertEqual(paginator.get_page_size(drf_request(page_size="-1")), 50)
+        self.assertEqual(paginator.get_page_size(drf_request(page_size="x")), 50)
+
+
+class CompileContentTests(SimpleTestCase):
+
+    def test_literals_slots_and_columns(self):
+        compiled = compile_content('Hi {{ lead.first_name | "there" }}, from {{campaign.name}}.')
+
+        self.assertEqual(compiled.columns, ("name", "campaign__name"))
+        self.assertEqual(compiled.parts[0], "Hi ")
+        self.assertIsInstance(compiled.parts[1], Slot)
+        self.assertEqual(compiled.parts[-1], ".")
+
+    def test_render_with_fallbacks(self):
+        compiled = compile_content("Hi {{ lead.first_name | 'there' }} {{ lead.last_name }}!{{ campaign.name }}")
+
+        self.assertEqual(compiled.render({"name": "Ada King", "campaign__name": "Spring"}), ("Hi Ada King!Spring", []))
+        self.assertEqual(compiled.render({"name": ""}), ("Hi there !", ["lead.last_name", "campaign.name"]))
+
+    def test_no_placeholders(self):
+        compiled = compile_content("Plain text")
+        self.assertEqual((compiled.parts, compiled.columns), (("Plain text",), ()))
+
+    def test_syntax_errors(self):
+        for content in ("{{ lead.password }}", "{{ lead.name", "Hi }} there", "{{ nope }}"):
+            with self.subTest(content=content), self.assertRaises(TemplateSyntaxError):
+                compile_content(content)
+
+
+class CompileRulesTests(SimpleTestCase):
+
+    def test_nested_rules_and_references(self):
+        q, refs = compile_rules({"all": [
+            {"field": "status", "op": "in", "value": ["new", "won"]},
+            {"field": "tag", "op": "any", "value": [7, 3, 7]},
+            {"any": [
+                {"field": "source", "op": "eq", "value": "linkedin"},
+                {"not": {"field": "campaign", "op": "eq", "value": 4}},
+            ]},
+        ]})
+
+        self.assertEqual(q.connector, "AND")
+        self.assertEqual(refs, {"tag": {3, 7}, "campaign": {4}})
+
+    def test_dates_become_aware(self):
+        q, _ = compile_rules({"field": "created_at", "op": "after", "value": "2024-05-01"})
+        ((lookup, moment),) = q.children
+        self.assertEqual(lookup, "created_at__gte")
+        self.assertFalse(timezone.is_naive(moment))
+
+    def test_invalid_rules(self):
+        bad = [
+            [],
+            {"all": []},
+            {"field": "password", "op": "eq", "value": "x"},
+            {"field": "status", "op": "contains", "value": "ne"},
+            {"field": "status", "op": "eq", "value": "maybe"},
+            {"field": "tag", "op": "any", "value": [True]},
+            {"field": "created_at", "op": "before", "value": "2024-02-30"},
+            {"not": {"not": {"not": {"not": {"not": {"field": "name", "op": "is_empty"}}}}}},
+            {"any": [{"field": "name", "op": "eq", "value": str(i)} for i in range(51)]},
+        ]
+        for rules in bad:
+            with self.subTest(rules=rules), self.assertRaises(SegmentRuleError):
+                compile_rules(rules)
+
+
+class SyncCursorTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        moment = datetime(2024, 5, 1, 12, 0, 0, 5, tzinfo=dt_timezone.utc)
+        self.assertEqual(decode_cursor(encode_cursor(moment)), moment)
+
+    def test_naive_timestamp_is_rejected(self):
+        with self.assertRaises(InvalidCursor):
+            decode_cursor(encode_cursor(datetime(2024, 5, 1, 12, 0)))
+
+    def test_garbage_is_rejected(self):
+        for cursor in ("", "%%%", "e30"):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+
+class GetOrComputeTests(SimpleTestCase):
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_waiter_leaves_another_process_lock_alone(self):
+        cache.add("slow:lock", 1, timeout=60)
+        with mock.patch.object(caching, "LOCK_TIMEOUT", 0.1):
+            self.assertEqual(caching.get_or_compute("slow", lambda: 42, timeout=60), 42)
+        self.assertEqual(cache.get("slow:lock"), 1)
+
+    def test_own_lock_is_released(self):
+        self.assertEqual(caching.get_or_compute("fast", lambda: 42, timeout=60), 42)
+        self.assertIsNone(cache.get("fast:lock"))
+
+
+class SignalInvalidationTests(TestCase):
+
+    def test_lead_save_invalidates_on_commit(self):
+        owner = get_user_model().objects.create_user(username="signals", password="x")
+        scope = f"dashboard:user:{owner.pk}"
+        before = caching.generation(scope)
+        with self.captureOnCommitCallbacks(execute=True):
+            Lead.objects.create(owner=owner, name="Ann", email="ann@example.com")
+            self.assertEqual(caching.generation(scope), before)
+        self.assertEqual(caching.generation(scope), before + 1)
+
+    def test_every_save_invalidates_the_campaign_left(self):
+        owner = get_user_model().objects.create_user(username="mover", password="x")
+        first, second, third = (
+            Campaign.objects.create(owner=owner, name=name, start_date=timezone.now().date()) for name in "abc"
+        )
+        scope = f"campaign-analytics:{second.pk}"
+        with self.captureOnCommitCallbacks(execute=True):
+            lead = Lead.objects.create(owner=owner, name="Ann", email="ann@example.com", campaign=first)
+            lead.campaign = second
+            lead.save()
+        before = caching.generation(scope)
+        with self.captureOnCommitCallbacks(execute=True):
+            lead.campaign = third
+            lead.save()
+        self.assertEqual(caching.generation(scope), before + 1)
+
+
+class GroupPairsTests(SimpleTestCase):
+
+    def test_transitive_pairs_share_the_oldest_primary(self):
+        self.assertEqual(group_pairs([(5, 9), (9, 3), (7, 8)]), {3: [5, 9], 7: [8]})
+
+    def test_repeated_and_reversed_pairs(self):
+        self.assertEqual(group_pairs([(2, 1), (1, 2), (1, 2)]), {1: [2]})
+
+    def test_no_pairs(self):
+        self.assertEqual(group_pairs([]), {})
+
+
+class MergeLeadsTests(TestCase):
+
+    def test_duplicates_fold_into_primary(self):
+        owner = get_user_model().objects.create_user(username="merger", password="x")
+        tag = Tag.objects.create(owner=owner, name="vip")
+        primary = Lead.objects.create(owner=owner, name="Jo", email="jo@example.com")
+        duplicate = Lead.objects.create(owner=owner, name="Jo S", email="jo+fb@example.com",
+                                        source="facebook", notes="met at expo")
+        duplicate.tags.add(tag)
+
+        self.assertEqual(merge_leads(group_pairs([(duplicate.pk, primary.pk)])), 1)
+
+        primary.refresh_from_db()
+        self.assertFalse(Lead.all_objects.filter(pk=duplicate.pk).exists())
+        self.assertEqual(primary.source, "facebook")
+        self.assertIn("met at expo", primary.notes)
+        self.assertEqual(list(primary.tags.all()), [tag])
+
+    def test_chained_merge_is_rejected(self):
+        with self.assertRaises(ValueError):
+            merge_leads({1: [2], 2: [3]})
+
+
+class FindDuplicatesTests(TestCase):
+
+    def setUp(self):
+        self.owner = get_user_model().objects.create_user(username="deduper", password="x")
+
+    def lead(self, name, profile_url, age=timedelta(hours=1)):
+        lead = Lead.objects.create(owner=self.owner, name=name, email=f"{name.lower()}@example.com",
+                                   profile_url=profile_url)
+        Lead.all_objects.filter(pk=lead.pk).update(created_at=timezone.now() - age)
+        return lead
+
+    def pairs(self):
+        return set(LeadDuplicate.objects.values_list("lead_id", "candidate_id", "reason"))
+
+    def test_scan_stops_short_of_recent_leads(self):
+        old = self.lead("Ann", "https://in/ann")
+        newer = self.lead("Bea", "https://in/ann")
+        fresh = self.lead("Cat", "https://in/ann", age=timedelta(0))
+
+        self.assertEqual(find_duplicates(), 1)
+        self.assertEqual(self.pairs(), {(newer.pk, old.pk, "profile_url")})
+        self.assertEqual(DedupeProgress.objects.get(name="leads").last_lead_id, newer.pk)
+
+        Lead.all_objects.filter(pk=fresh.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(find_duplicates(), 2)
+
+    def test_changed_lead_is_paired_again(self):
+        old = self.lead("Ann", "https://in/ann")
+        newer = self.lead("Bea", "https://in/bea")
+        self.assertEqual(find_duplicates(), 0)
+
+        old.profile_url = "https://in/bea"
+        old.save()
+        self.assertEqual(PendingDedupeLead.objects.count(), 1)
+        self.assertEqual(find_duplicates(), 1)
+        self.assertEqual(self.pairs(), {(newer.pk, old.pk, "profile_url")})
+        self.assertFalse(PendingDedupeLead.objects.exists())
+
+        newer.notes = "no blocking column changed"
+        newer.save()
+        self.assertFalse(PendingDedupeLead.objects.exists())
+
+
+class MoveArchivedLeadsTests(TestCase):
+
+    def test_only_long_archived_leads_move(self):
+        owner = get_user_model().objects.create_user(username="archiver", password="x")
+        tag = Tag.objects.create(owner=owner, name="old")
+        cold = Lead.all_objects.create(owner=owner, name="Cold", email="cold@example.com", is_archived=True)
+        cold.tags.add(tag)
+        recent = Lead.all_objects.create(owner=owner, name="Recent", email="recent@example.com", is_archived=True)
+        active = Lead.objects.create(owner=owner, name="Active", email="active@example.com")
+        long_ago = timezone.now() - timedelta(days=365)
+        Lead.all_objects.filter(pk__in=[cold.pk, active.pk]).update(updated_at=long_ago)
+
+        self.assertEqual(move_archived_leads(chunk_size=1), 1)
+
+        self.assertEqual(set(Lead.all_objects.values_list("pk", flat=True)), {recent.pk, active.pk})
+        archived = ArchivedLead.objects.get(pk=cold.pk)
+        self.assertEqual((archived.email, archived.tag_ids), ("cold@example.com", [tag.pk]))
+
+
+class LeadImportTests(APITestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="importer", password="x")
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content):
+        return self.client.post(
+            "/api/leads/import/", {"file": SimpleUploadedFile(name, content)}, format="multipart",
+        )
+
+    def test_csv_upsert(self):
+        response = self.upload("leads.csv", b"name,email\nAda,ada@example.com\nBob,bob@example.com\nBad,nope\n")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["created"], response.data["failed"]), (2, 1))
+        self.assertEqual(response.data["errors"][0]["row"], 3)
+
+    def test_chunks_inside_an_outer_transaction(self):
+        ## TestCase wraps every test in a transaction, so each chunk's atomic() is a savepoint
+        lines = ["name,email"] + [f"Lead {i},lead{i}@example.com" for i in range(7)]
+
+        result = import_leads(lines, "csv", owner=self.user, chunk_size=3)
+
+        self.assertEqual((result.created, result.failed), (7, 0))
+        self.assertEqual(Lead.all_objects.filter(owner=self.user).count(), 7)
+
+    def test_not_utf8_is_a_bad_request(self):
+        response = self.upload("leads.csv", b"name,email\nAda,ada@example.com\nZo\xe9,zoe@example.com\n")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("UTF-8", response.data["detail"])
+
+    def test_broken_csv_is_a_bad_request(self):
+        response = self.upload("leads.csv", b"name,email\nAda,ada@example.com\n" + b"x" * 200000 + b",y\n")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Malformed CSV", response.data["detail"])
+        ## rows read before the broken one are kept
+        self.assertEqual(response.data["created"], 1)
+        self.assertTrue(Lead.all_objects.filter(email="ada@example.com", owner=self.user).exists())
+
+
+class ConditionalListTests(APITestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="tagger", password="x")
+        self.client.force_authenticate(self.user)
+        self.old = Tag.objects.create(owner=self.user, name="old")
+        Tag.objects.create(owner=self.user, name="new")
+
+    def test_etag_round_trip(self):
+        first = self.client.get("/api/tags/")
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn("Last-Modified", first)
+
+        again = self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+    def test_deleting_an_older_row_changes_the_etag(self):
+        etag = self.client.get("/api/tags/")["ETag"]
+
+        self.old.delete()
+
+        self.assertEqual(self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since_alone_never_304s(self):
+        response = self.client.get("/api/tags/", HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT")
+        self.assertEqual(response.status_code, 200)
+
+
+class TenantIsolationTests(APITestCase):
+
+    def setUp(self):
+        users = get_user_model().objects
+        self.alice = users.create_user(username="alice", password="x")
+        self.bob = users.create_user(username="bob", password="x")
+        self.rows = {}
+        for owner in (self.alice, self.bob):
+            label = Label.objects.create(owner=owner, name=f"{owner.username}-label")
+            self.rows[owner.username] = {
+                "leads": Lead.objects.create(owner=owner, name=owner.username,
+                                             email=f"{owner.username}@example.com"),
+                "campaigns": Campaign.objects.create(owner=owner, name=owner.username,
+                                                     start_date=timezone.now().date()),
+                "tags": Tag.objects.create(owner=owner, name=owner.username),
+                "templates": Template.objects.create(owner=owner, name=owner.username, content="Hi",
+                                                     label=label),
+                "labels": label,
+            }
+        self.client.force_authenticate(self.bob)
+
+    def test_other_owners_rows_are_not_found(self):
+        for resource, row in self.rows["alice"].items():
+            with self.subTest(resource=resource):
+                self.assertEqual(self.client.get(f"/api/{resource}/{row.pk}/").status_code, 404)
+                self.assertEqual(self.client.delete(f"/api/{resource}/{row.pk}/").status_code, 404)
+        self.assertTrue(Lead.objects.filter(pk=self.rows["alice"]["leads"].pk).exists())
+
+    def test_lists_and_exports_hold_only_own_rows(self):
+        for resource, row in self.rows["bob"].items():
+            with self.subTest(resource=resource):
+                data = self.client.get(f"/api/{resource}/").json()
+                rows = data["results"] if isinstance(data, dict) else data
+                self.assertEqual([item["id"] for item in rows], [row.pk])
+
+        for fmt in ("csv", "ndjson"):
+            with self.subTest(output_format=fmt):
+                response = self.client.get(f"/api/leads/export/?output_format={fmt}")
+                body = b"".join(response.streaming_content).decode()
+                self.assertIn("bob@example.com", body)
+                self.assertNotIn("alice", body)
+
+
+class LeadBatchTests(APITestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="batcher", password="x")
+        self.client.force_authenticate(self.user)
+
+    def test_updates_reach_archived_leads(self):
+        archived = Lead.all_objects.create(owner=self.user, name="Cold", email="cold@example.com", is_archived=True)
+        active = Lead.objects.create(owner=self.user, name="Warm", email="warm@example.com")
+
+        response = self.client.post("/api/leads/batch/", {"operations": [
+            {"op": "update", "id": archived.pk, "data": {"name": "Cold again"}},
+            {"op": "update", "id": active.pk, "data": {"status": "won"}},
+            {"op": "create", "data": {"name": "New", "email": "new@example.com", "is_archived": True}},
+        ]}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["status"] for r in response.data["results"]], ["ok", "ok", "ok"])
+        archived.refresh_from_db()
+        active.refresh_from_db()
+        self.assertEqual(archived.name, "Cold again")
+        self.assertEqual(active.status, "won")
+        self.assertTrue(Lead.all_objects.filter(email="new@example.com", owner=self.user).exists())
+
+    def test_atomic_batch_writes_nothing_on_error(self):
+        lead = Lead.objects.create(owner=self.user, name="Jo", email="jo@example.com")
+
+        response = self.client.post("/api/leads/batch/", {"atomic": True, "operations": [
+            {"op": "update", "id": lead.pk, "data": {"name": "Joanna"}},
+            {"op": "update", "id": lead.pk, "data": {"email": "not-an-email"}},
+        ]}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([r["status"] for r in response.data["results"]], ["skipped", "error"])
+        lead.refresh_from_db()
+        self.assertEqual(lead.name, "Jo")
+
+
+class TemplateRenderTests(APITestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="writer", password="x")
+        self.client.force_authenticate(self.user)
+        self.lead = Lead.objects.create(owner=self.user, name="Ada King", email="ada@example.com")
+        label = Label.objects.create(owner=self.user, name="Greetings")
+        self.template = Template.objects.create(label=label, name="Hi", content='Hi {{ lead.first_name | "there" }}')
+
+    def test_preview(self):
+        response = self.client.get(f"/api/templates/{self.template.pk}/preview/", {"lead": self.lead.pk})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["rendered"], "Hi Ada")
+
+    def test_render_stream(self):
+        response = self.client.post(f"/api/templates/{self.template.pk}/render/", {}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)["rendered"] for line in lines], ["Hi Ada"])
+
+    def test_content_saved_before_validation_is_a_bad_request(self):
+        ## bypasses the serializer, like rows written before placeholders were checked
+        Template.objects.filter(pk=self.template.pk).update(content="Hi {{ lead.password }}")
+
+        preview = self.client.get(f"/api/templates/{self.template.pk}/preview/", {"lead": self.lead.pk})
+        render = self.client.post(f"/api/templates/{self.template.pk}/render/", {}, format="json")
+
+        self.assertEqual((preview.status_code, render.status_code), (400, 400))
+        self.assertIn("lead.password", render.data["content"][0])
+
+    def test_render_command(self):
+        out = io.StringIO()
+
+        call_command("render_template", str(self.template.pk), "--workers", "1", stdout=out)
+
+        self.assertEqual([json.loads(line)["rendered"] for line in out.getvalue().splitlines()], ["Hi Ada"])
+
+
+class SegmentTests(APITestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="segmenter", password="x")
+        self.client.force_authenticate(self.user)
+        self.vip = Tag.objects.create(owner=self.user, name="vip")
+        Lead.objects.create(owner=self.user, name="Won", email="won@example.com", status="won")
+        Lead.objects.create(owner=self.user, name="New", email="new@example.com")
+
+    def create_segment(self, rules):
+        response = self.client.post("/api/segments/", {"name": "s", "rules": rules}, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        return Segment.objects.get(pk=response.data["id"])
+
+    def test_created_segment_is_evaluated(self):
+        segment = self.create_segment({"field": "status", "op": "eq", "value": "won"})
+
+        self.assertEqual(segment.member_count, 1)
+        members = self.client.get(f"/api/segments/{segment.pk}/leads/")
+        self.assertEqual([lead["email"] for lead in members.data["results"]], ["won@example.com"])
+
+    def test_lead_changes_apply_on_refresh_not_on_read(self):
+        segment = self.create_segment({"any": [
+            {"field": "status", "op": "eq", "value": "won"},
+            {"field": "tag", "op": "any", "value": [self.vip.pk]},
+        ]})
+        new = Lead.objects.get(email="new@example.com")
+        new.tags.add(self.vip)
+        Lead.objects.filter(email="won@example.com").update(status="lost")
+
+        ## reads serve the materialized state and leave the queue alone
+        self.assertEqual(self.client.get(f"/api/segments/{segment.pk}/").data["member_count"], 1)
+        self.assertEqual(PendingSegmentLead.objects.count(), 2)
+
+        self.assertEqual(refresh_pending(), 2)
+        segment.refresh_from_db()
+        self.assertEqual(segment.member_count, 1)
+        members = self.client.get(f"/api/segments/{segment.pk}/leads/")
+        self.assertEqual([lead["email"] for lead in members.data["results"]], ["new@example.com"])
+
+    def member_emails(self, segment):
+        members = self.client.get(f"/api/segments/{segment.pk}/leads/")
+        return [lead["email"] for lead in members.data["results"]]
+
+    def test_api_writes_refresh_on_commit(self):
+        segment = self.create_segment({"any": [
+            {"field": "status", "op": "eq", "value": "won"},
+            {"field": "tag", "op": "any", "value": [self.vip.pk]},
+        ]})
+        won = Lead.objects.get(email="won@example.com")
+        new = Lead.objects.get(email="new@example.com")
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.patch(f"/api/leads/{won.pk}/", {"status": "lost"}, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(len(callbacks), 2)  # cache invalidation + one segment refresh
+        self.assertEqual(self.member_emails(segment), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/leads/tags/", {
+                "action": "add", "tags": [self.vip.pk], "leads": [new.pk],
+            }, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.member_emails(segment), ["new@example.com"])
+        self.assertFalse(PendingSegmentLead.objects.exists())
+
+    def test_rules_must_reference_own_tags(self):
+        other = get_user_model().objects.create_user(username="other", password="x")
+        foreign = Tag.objects.create(owner=other, name="theirs")
+
+        response = self.client.post("/api/segments/", {
+            "name": "s", "rules": {"field": "tag", "op": "any", "value": [foreign.pk]},
+        }, format="json")
+
+        self.assertEqual(response.status_code, 400)
+
+
+class LegacyMessageCacheTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        user = get_user_model().objects.create_user(username="legacy", email="legacy@example.com", password="x")
+        self.client.force_authenticate(user)
+        legacy_user = Users.objects.create(email=user.email, password_hash="x", status="active",
+                                           created_at=now, updated_at=now)
+        self.segment = Segments.objects.create(user=legacy_user, title="Hello", created_at=now, updated_at=now)
+        self.group = MessageGroups.objects.create(user=legacy_user, title="Intro", created_at=now, updated_at=now)
+        MessageBlocks.objects.create(message_group=self.group, block_order=1, block_type="segment",
+                                     segment=self.segment)
+
+    def text(self):
+        return self.client.get(f"/api/message-groups/{self.group.pk}/").json()["text"]
+
+    def test_segment_and_block_changes_miss_the_cache(self):
+        self.assertEqual(self.text(), "Hello")
+
+        Segments.objects.filter(pk=self.segment.pk).update(title="Hi", updated_at=timezone.now())
+        self.assertEqual(self.text(), "Hi")
+
+        MessageBlocks.objects.create(message_group=self.group, block_order=2, block_type="text", text_value="there")
+        self.assertEqual(self.text(), "Hi\nthere")
+
+
+class SparseFieldsetTests(APITestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="sparse", password="x")
+        self.client.force_authenticate(self.user)
+        self.lead = Lead.objects.create(owner=self.user, name="Jo Smith", email="jo@example.com", notes="long notes")
+
+    def test_notes_left_out_of_list_and_search(self):
+        for path, params in (("/api/leads/", {}), ("/api/leads/search/", {"q": "jo smi"})):
+            with self.subTest(path=path):
+                response = self.client.get(path, params)
+                self.assertEqual(response.status_code, 200)
+                (row,) = response.data["results"]
+                self.assertEqual(row["id"], self.lead.pk)
+                self.assertNotIn("notes", row)
+
+    def test_notes_on_request_and_in_detail(self):
+        search = self.client.get("/api/leads/search/", {"q": "jo", "fields": "id,notes"})
+        self.assertEqual(search.data["results"], [{"id": self.lead.pk, "notes": "long notes"}])
+
+        detail = self.client.get(f"/api/leads/{self.lead.pk}/")
+        self.assertEqual(detail.data["notes"], "long notes")
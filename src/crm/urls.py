@@ -3,13 +3,16 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
+    DashboardView,
+    SyncView,
     UserViewSet,
     LeadViewSet,
     CampaignViewSet,
     TagViewSet,
     LabelViewSet,
-    TemplateViewSet
-  
+    TemplateViewSet,
+    SegmentViewSet,
+    MessageGroupViewSet,
 )
 
 router = DefaultRouter()
@@ -19,9 +22,13 @@ router.register("campaigns", CampaignViewSet, basename="campaign")
 router.register("tags",      TagViewSet,      basename="tag")
 router.register("labels",    LabelViewSet,    basename="label")
 router.register(r'templates', TemplateViewSet, basename='template')
+router.register("segments",  SegmentViewSet,  basename="segment")
+router.register("message-groups", MessageGroupViewSet, basename="message-group")
 
 
 urlpatterns = [
+    path("dashboard/", DashboardView.as_view(), name="dashboard"),
+    path("sync/", SyncView.as_view(), name="sync"),
     # /api/users/, /api/labels/, etc.
     path("", include(router.urls)),
 ]
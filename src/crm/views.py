@@ -1,15 +1,43 @@
 
 
+import codecs
+
 from django.contrib.auth import get_user_model
-from rest_framework import viewsets, permissions
-from .models import Lead, Campaign, Tag, Label, Template
+from django.db import IntegrityError
+from django.http import StreamingHttpResponse
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from . import exports
+from .analytics import campaign_analytics
+from .batch import BatchRequestSerializer, run_lead_batch
+from .conditional import ConditionalListMixin
+from .dashboard import dashboard_metrics
+from .dedupe import merge_leads
+from .fieldsets import SparseFieldsetMixin
+from .filters import filter_leads, parse_query_filters
+from .funnel import GROUPINGS, funnel_counts
+from .imports import FORMATS, ImportFileError, detect_format, import_leads
+from .labels import next_position, reorder_labels
+from .legacy_messages import compose_groups, groups_for_user
+from .models import Lead, LeadDuplicate, Campaign, Tag, Label, Template, Segment
+from .pagination import KeysetPagination
+from .rendering import BatchRenderSerializer, TemplateSyntaxError, compiled_template, render_batch, render_for_lead
+from .search import search_leads
+from .segments import current_member_ids, refresh_pending_on_commit, refresh_segment
+from .sync import InvalidCursor, changes_since, decode_cursor
+from .tagging import BulkTagSerializer, bulk_tag
 from .serializers import (
     UserSerializer,
     LeadSerializer,
+    LeadDuplicateSerializer,
+    LeadMergeSerializer,
     CampaignSerializer,
     TagSerializer,
     LabelSerializer,
-    TemplateSerializer
+    LabelReorderSerializer,
+    TemplateSerializer,
+    SegmentSerializer,
 )
 
 
@@ -21,14 +49,53 @@ from rest_framework.response import Response
 logger = logging.getLogger("crm")
 
 class DashboardView(APIView):
+    """
+    GET /api/dashboard/
+    Lead totals, status breakdown, active campaigns and recent activity for
+    the current user, served from cache (see crm.dashboard).
+    """
     def get(self, request):
         logger.info("Dashboard requested by user %s", request.user.id)
+        return Response(dashboard_metrics(request.user))
+
+
+class SyncView(APIView):
+    """
+    GET /api/sync/?since=<cursor>
+    Labels and templates created / changed since the cursor, ids deleted
+    since then, and the cursor to send next time. No cursor (or an expired
+    one) returns everything with "full": true.
+    """
+    def get(self, request):
+        raw = request.query_params.get("since")
         try:
-            # …some external call
-            pass
-        except TimeoutError:
-            logger.error("Failed to connect to external API (timeout after 5s)")
-        return Response({"ok": True})
+            since = decode_cursor(raw) if raw else None
+        except InvalidCursor:
+            return Response({"since": ["Invalid cursor."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        changes = changes_since(request.user, since)
+        context = {"request": request}
+        return Response({
+            "cursor": changes["cursor"],
+            "full": changes["full"],
+            "labels": LabelSerializer(changes["labels"], many=True, context=context).data,
+            "templates": TemplateSerializer(changes["templates"], many=True, context=context).data,
+            "deleted": changes["deleted"],
+        })
+
+
+class OwnedQuerysetMixin:
+    """
+    Tenant scoping: every query starts from the current user's rows (the
+    leading-owner indexes), and new rows are stamped with the current user.
+    """
+    owner_field = "owner"
+
+    def get_queryset(self):
+        return super().get_queryset().filter(**{self.owner_field: self.request.user})
+
+    def perform_create(self, serializer):
+        serializer.save(**{self.owner_field: self.request.user})
 
 
 # ——— USER VIEWSET ———
@@ -46,35 +113,369 @@ class UserViewSet(viewsets.ModelViewSet):
         return get_user_model().objects.all()
 
 # ——— LEAD VIEWSET ———
-class LeadViewSet(viewsets.ModelViewSet):
-    queryset = Lead.objects.all()
+class LeadViewSet(OwnedQuerysetMixin, ConditionalListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
+    """
+    GET /api/leads/?fields=id,name,status   sparse fieldset
+    GET /api/leads/?status=new,won&campaign=3&q=jo   filters, see crm.filters
+    Lists, exports and search only cover active leads unless ?is_archived= is given.
+    `notes` is left out of list responses unless requested in ?fields=.
+    Lists honour If-None-Match (see crm.conditional).
+    """
+    queryset = Lead.all_objects.order_by("-created_at", "-id")
     serializer_class = LeadSerializer
+    pagination_class = KeysetPagination
+    list_exclude_fields = ("notes",)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in ("list", "export"):
+            filters = parse_query_filters(self.request.query_params)
+            filters.setdefault("is_archived", False)
+            queryset = filter_leads(queryset, filters)
+        elif self.action == "search":
+            queryset = queryset.filter(is_archived=False)
+        return queryset
+
+    @action(detail=False, methods=["post"], url_path="import", parser_classes=[MultiPartParser])
+    def import_file(self, request):
+        """
+        POST /api/leads/import/   multipart: file=<leads.csv | leads.ndjson>
+        Optional input_format=csv|ndjson when the filename doesn't tell.
+        Upserts on email for the current user; returns counts + per-row errors.
+        400 when the file can't be read (not UTF-8, broken CSV); rows before
+        that point are kept and counted in the response.
+        """
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"detail": "No file uploaded."}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.data.get("input_format") or detect_format(upload.name, upload.content_type)
+        if fmt not in FORMATS:
+            return Response(
+                {"detail": f"Unsupported format, expected one of: {', '.join(FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # UploadedFile iterates line by line, so nothing is read into memory at once
+        lines = codecs.iterdecode(upload, "utf-8-sig")
+        try:
+            result = import_leads(lines, fmt, owner=request.user)
+        except ImportFileError as exc:
+            logger.info("Lead import by user %s stopped: %s", request.user.id, exc)
+            return Response({"detail": str(exc), **exc.result.as_dict()}, status=status.HTTP_400_BAD_REQUEST)
+        logger.info(
+            "Lead import by user %s: %s created, %s updated, %s failed",
+            request.user.id, result.created, result.updated, result.failed,
+        )
+        return Response(result.as_dict())
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request):
+        """
+        GET /api/leads/export/?output_format=csv|ndjson&compress=gzip
+        Every lead the list endpoint would return (same filters), streamed.
+        """
+        fmt = request.query_params.get("output_format", "csv")
+        if fmt not in exports.FORMATS:
+            return Response(
+                {"output_format": [f"Expected one of: {', '.join(exports.FORMATS)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        compress = request.query_params.get("compress") == "gzip"
+
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            exports.export_leads(queryset, fmt, compress=compress),
+            content_type="application/gzip" if compress else exports.CONTENT_TYPES[fmt],
+        )
+        filename = f"leads.{fmt}.gz" if compress else f"leads.{fmt}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        logger.info("Lead export (%s) by user %s", fmt, request.user.id)
+        return response
+
+    @action(detail=False, methods=["get"], url_path="search")
+    def search(self, request):
+        """
+        GET /api/leads/search/?q=jo smi&limit=20
+        Ranked full-text search, every term matched as a prefix.
+        """
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), 100)
+        except ValueError:
+            limit = 20
+        queryset = search_leads(self.filter_queryset(self.get_queryset()), request.query_params.get("q"))
+        serializer = self.get_serializer(queryset[:limit], many=True)
+        return Response({"results": serializer.data})
+
+    @action(detail=False, methods=["get"], url_path="funnel")
+    def funnel(self, request):
+        """
+        GET /api/leads/funnel/?group_by=status|campaign|owner
+        Active lead counts from the funnel summary table, never crm_lead.
+        Staff can add ?scope=all to see every owner.
+        """
+        group_by = request.query_params.get("group_by", "status")
+        if group_by not in GROUPINGS:
+            return Response(
+                {"group_by": [f"Expected one of: {', '.join(GROUPINGS)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        everyone = request.user.is_staff and request.query_params.get("scope") == "all"
+        results = funnel_counts(owner=None if everyone else request.user, group_by=group_by)
+        return Response({"group_by": group_by, "results": results})
+
+    @action(detail=False, methods=["get"], url_path="duplicates")
+    def duplicates(self, request):
+        """
+        GET /api/leads/duplicates/?limit=50
+        Pending duplicate candidates among the current user's leads, best first.
+        """
+        try:
+            limit = min(max(int(request.query_params.get("limit", 50)), 1), 500)
+        except ValueError:
+            limit = 50
+        pairs = (
+            LeadDuplicate.objects.filter(status="pending", lead__owner=request.user)
+            .select_related("lead", "candidate")[:limit]
+        )
+        return Response({"results": LeadDuplicateSerializer(pairs, many=True).data})
+
+    @action(detail=False, methods=["post"], url_path="merge")
+    def merge(self, request):
+        """
+        POST /api/leads/merge/   {"primary": 1, "duplicates": [7, 9]}
+        Tags, campaign, profile_url, source and notes are folded into the
+        primary, then the duplicates are deleted.
+        """
+        payload = LeadMergeSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        primary = payload.validated_data["primary"]
+        duplicates = payload.validated_data["duplicates"]
+
+        owned = set(
+            self.get_queryset().filter(id__in=[primary, *duplicates])
+            .values_list("id", flat=True)
+        )
+        missing = sorted({primary, *duplicates} - owned)
+        if missing:
+            return Response({"detail": f"Lead(s) not found: {missing}"}, status=status.HTTP_404_NOT_FOUND)
+
+        merged = merge_leads({primary: duplicates})
+        lead = self.get_queryset().select_related("owner").get(pk=primary)
+        return Response({"merged": merged, "lead": LeadSerializer(lead, context=self.get_serializer_context()).data})
+
+    @action(detail=False, methods=["post"], url_path="tags")
+    def bulk_tags(self, request):
+        """
+        POST /api/leads/tags/
+        {"action": "add|remove", "tags": [1, 2], "leads": [10, 11]}
+        {"action": "add|remove", "tags": [1, 2], "filter": {"status": ["new"], ...}}
+        Only the current user's leads and tags; see crm.filters for the filter keys.
+        """
+        payload = BulkTagSerializer(data=request.data, context=self.get_serializer_context())
+        payload.is_valid(raise_exception=True)
+        data = payload.validated_data
+
+        leads = self.get_queryset()
+        if "leads" in data:
+            leads = leads.filter(id__in=data["leads"])
+        else:
+            leads = filter_leads(leads, data["filter"])
+
+        changed = bulk_tag(data["action"], leads, data["tags"])
+        if changed:
+            refresh_pending_on_commit(request.user.pk)
+        key = "added" if data["action"] == "add" else "removed"
+        return Response({key: changed})
+
+    @action(detail=False, methods=["post"], url_path="batch")
+    def batch(self, request):
+        """
+        POST /api/leads/batch/
+        {"atomic": false, "operations": [{"op": "create|update|delete", "id": .., "data": {..}}]}
+        One transaction, per-operation results in request order.
+        """
+        payload = BatchRequestSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        try:
+            results, applied = run_lead_batch(
+                payload.validated_data["operations"],
+                self.get_queryset(),
+                self.get_serializer_context(),
+                atomic=payload.validated_data["atomic"],
+            )
+        except IntegrityError as exc:
+            logger.warning("Lead batch by user %s rolled back: %s", request.user.id, exc)
+            return Response(
+                {"detail": "Batch conflicts with existing data, nothing was written."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        code = status.HTTP_200_OK if applied else status.HTTP_400_BAD_REQUEST
+        return Response({"results": results}, status=code)
+
+# ——— LEGACY MESSAGE GROUPS ———
+class MessageGroupViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    GET /api/message-groups/
+    GET /api/message-groups/{id}/
+    The current user's legacy message groups with their blocks composed
+    into text, newest first (see crm.legacy_messages).
+    """
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return groups_for_user(self.request.user).order_by("-created_at", "-id")
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response(compose_groups(page))
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(compose_groups([self.get_object()])[0])
 
 # ——— CAMPAIGN VIEWSET ———
-class CampaignViewSet(viewsets.ModelViewSet):
+class CampaignViewSet(OwnedQuerysetMixin, ConditionalListMixin, viewsets.ModelViewSet):
+    """
+    GET /api/campaigns/{id}/analytics/
+    Cost per lead, won / lost rates and daily inflow, see crm.analytics.
+    """
     queryset = Campaign.objects.all()
     serializer_class = CampaignSerializer
 
+    @action(detail=True, methods=["get"], url_path="analytics")
+    def analytics(self, request, pk=None):
+        try:
+            campaign_id = int(pk)
+        except (TypeError, ValueError):
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        data = campaign_analytics(campaign_id, request.user)
+        if data is None:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
+
 # ——— TAG VIEWSET ———
-class TagViewSet(viewsets.ModelViewSet):
-    queryset = Tag.objects.all()
+class TagViewSet(OwnedQuerysetMixin, ConditionalListMixin, viewsets.ModelViewSet):
+    queryset = Tag.objects.order_by("name", "id")
     serializer_class = TagSerializer
 
 # ——— LABEL VIEWSET ———
-class LabelViewSet(viewsets.ModelViewSet):
+class LabelViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+    """
+    Labels come back in the user's own order (owner, position index).
+    POST /api/labels/reorder/   {"order": [3, 1, 2]}
+    """
     serializer_class   = LabelSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Label.objects.filter(owner=self.request.user)
+        return Label.objects.filter(owner=self.request.user).order_by("position", "id")
 
     def perform_create(self, serializer):
-        # stamp the new Label with the current user
-        serializer.save(owner=self.request.user)
+        # stamp the new Label with the current user, at the end of their list
+        serializer.save(owner=self.request.user, position=next_position(self.request.user))
+
+    @action(detail=False, methods=["post"], url_path="reorder")
+    def reorder(self, request):
+        payload = LabelReorderSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        try:
+            moved = reorder_labels(request.user, payload.validated_data["order"])
+        except Label.DoesNotExist as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_404_NOT_FOUND)
+        labels = LabelSerializer(self.get_queryset(), many=True, context=self.get_serializer_context())
+        return Response({"moved": moved, "results": labels.data})
         
+# ——— SEGMENT VIEWSET ———
+class SegmentViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
+    """
+    Rule-defined lead segments, see crm.segments for the rule format.
+    GET /api/segments/{id}/leads/   members, newest first (keyset paginated)
+    Membership and member_count are materialized; saving new rules
+    re-evaluates the segment, lead changes are applied by the
+    refresh_segments command. Reads serve the last materialized state.
+    """
+    queryset = Segment.objects.order_by("name", "id")
+    serializer_class = SegmentSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        refresh_segment(serializer.instance)
+
+    def perform_update(self, serializer):
+        rules = serializer.instance.rules
+        super().perform_update(serializer)
+        if serializer.instance.rules != rules:
+            refresh_segment(serializer.instance)
+
+    @action(detail=True, methods=["get"], url_path="leads")
+    def leads(self, request, pk=None):
+        segment = self.get_object()
+        leads = (
+            Lead.objects.filter(owner=request.user, pk__in=current_member_ids(segment.pk))
+            .select_related("owner")
+            .order_by("-created_at", "-id")
+        )
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(leads, request, view=self)
+        serializer = LeadSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
  # ——— Template VIEWSET ———       
-class TemplateViewSet(viewsets.ModelViewSet):
+class TemplateViewSet(OwnedQuerysetMixin, ConditionalListMixin, viewsets.ModelViewSet):
+    """
+    Content may use placeholders, e.g. {{ lead.first_name | "there" }},
+    see crm.rendering for the fields available.
+    GET  /api/templates/{id}/preview/?lead=<lead id>
+    POST /api/templates/{id}/render/   {"filter": {...}}   NDJSON stream
+    """
     queryset = Template.objects.select_related('label').order_by('-updated_at')
     serializer_class = TemplateSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_validator_querysets(self, queryset):
+        # label_name is part of every row, so renaming a label changes the list
+        return [queryset, Label.objects.filter(owner=self.request.user)]
+
+    @action(detail=True, methods=["get"], url_path="preview")
+    def preview(self, request, pk=None):
+        try:
+            lead_id = int(request.query_params["lead"])
+        except (KeyError, ValueError):
+            return Response({"lead": ["A lead id is required."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        template = self.get_object()
+        try:
+            rendered = render_for_lead(template, Lead.all_objects.filter(owner=request.user), lead_id)
+        except TemplateSyntaxError as exc:
+            # saved before placeholders were checked
+            return Response({"content": [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        if rendered is None:
+            return Response({"detail": "Lead not found."}, status=status.HTTP_404_NOT_FOUND)
+        text, missing = rendered
+        return Response({"template": template.pk, "lead": lead_id, "rendered": text, "missing": missing})
+
+    @action(detail=True, methods=["post"], url_path="render")
+    def render(self, request, pk=None):
+        """
+        One {"lead", "rendered", "missing"} line per matching lead (crm.filters
+        expression, active leads unless is_archived is given), in lead id order.
+        """
+        payload = BatchRenderSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        filters = dict(payload.validated_data["filter"])
+        filters.setdefault("is_archived", False)
+
+        template = self.get_object()
+        # compile up front: once streaming starts the status can't change any more
+        try:
+            compiled_template(template)
+        except TemplateSyntaxError as exc:
+            return Response({"content": [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        leads = filter_leads(Lead.all_objects.filter(owner=request.user), filters).order_by("id")
+        logger.info("Batch render of template %s by user %s", template.pk, request.user.id)
+        return StreamingHttpResponse(
+            (chunk.encode("utf-8") for chunk in render_batch(template, leads)),
+            content_type="application/x-ndjson",
+        )
+
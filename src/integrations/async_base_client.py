@@ -0,0 +1,174 @@
+# asyncio counterpart of BaseAPIClient, on httpx
+# same timeouts, retry rules and metrics; for fanning out many calls from one process
+
+import asyncio
+import time
+import weakref
+
+import httpx
+
+from .base_client import (
+    BACKOFF_BASE,
+    BACKOFF_MAX,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_TIMEOUT,
+    IDEMPOTENT_METHODS,
+    MAX_RETRY_AFTER,
+    RETRY_STATUSES,
+    BaseAPIClient,
+    ClientMetrics,
+)
+from .rate_limit import RateLimitExceeded
+
+DEFAULT_CONCURRENCY = 100        ## requests in flight per gather()
+DEFAULT_MAX_CONNECTIONS = 100    ## per base URL
+
+## httpx.AsyncClient connections belong to one event loop: one shared client per (loop, base URL)
+_clients = weakref.WeakKeyDictionary()
+
+
+def _httpx_timeout(timeout):
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        ## pool=None: waiting for a free connection is bounded by gather(), not an error
+        return httpx.Timeout(read, connect=connect, pool=None)
+    return httpx.Timeout(timeout, pool=None)
+
+
+def shared_async_client(base_url, max_connections=DEFAULT_MAX_CONNECTIONS):
+    """The pooled httpx.AsyncClient for `base_url` on the running event loop."""
+    per_loop = _clients.setdefault(asyncio.get_running_loop(), {})
+    key = (base_url, max_connections)
+    client = per_loop.get(key)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        per_loop[key] = client
+    return client
+
+
+async def aclose_shared_clients():
+    """Close the running loop's shared clients (call before the loop ends)."""
+    per_loop = _clients.pop(asyncio.get_running_loop(), {})
+    for client in per_loop.values():
+        await client.aclose()
+
+
+async def gather_bounded(aws, limit=DEFAULT_CONCURRENCY, return_exceptions=True):
+    """
+    asyncio.gather with at most `limit` of `aws` running at once. Items may be
+    awaitables or zero-argument callables returning one (so coroutines are
+    only created when a slot frees up). Results come back in input order;
+    by default exceptions are returned in place so one failure doesn't hide
+    the rest of a bulk operation.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(item):
+        async with semaphore:
+            return await (item() if callable(item) else item)
+
+    return await asyncio.gather(*(run(item) for item in aws), return_exceptions=return_exceptions)
+
+
+def _never_sent(error):
+    ## no connection was made, safe to repeat any method
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+
+
+class AsyncBaseAPIClient:
+    def __init__(self, base_url, api_key=None, timeout=DEFAULT_TIMEOUT, max_connections=DEFAULT_MAX_CONNECTIONS,
+                 concurrency=DEFAULT_CONCURRENCY, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metrics = ClientMetrics()
+
+    @property
+    def session(self):
+        return shared_async_client(self.base_url, self.max_connections)
+
+    ## same Retry-After / full jitter policy as the sync client
+    backoff = BaseAPIClient.backoff
+
+    async def before_send(self, method, kwargs):
+        """Hook awaited before every attempt (retries included), see BaseAPIClient.before_send."""
+
+    def after_response(self, method, kwargs, response):
+        """Hook run on every response received, before deciding whether to retry."""
+
+    def _retryable(self, method, response=None, error=None):
+        if error is not None:
+            if not isinstance(error, httpx.TransportError):
+                return False
+            return method in IDEMPOTENT_METHODS or _never_sent(error)
+        if response.status_code not in RETRY_STATUSES:
+            return False
+        return method in IDEMPOTENT_METHODS or response.status_code == 429
+
+    async def request(self, method, endpoint, timeout=None, **kwargs):
+        """Same contract as BaseAPIClient.request, awaiting instead of blocking."""
+        method = method.upper()
+        url = f"{self.base_url}{endpoint}"
+        attempt, response = 0, None
+        while True:
+            try:
+                await self.before_send(method, kwargs)
+            except RateLimitExceeded:
+                ## same rule as a long Retry-After: the caller decides, with the last response if any
+                self.metrics.record_call(max(attempt - 1, 0), failed=True)
+                if response is None:
+                    raise
+                return response
+            started = time.monotonic()
+            try:
+                response = await self.session.request(
+                    method, url, timeout=_httpx_timeout(timeout or self.timeout), **kwargs
+                )
+            except httpx.HTTPError as exc:
+                self.metrics.record_attempt(None, time.monotonic() - started)
+                if attempt >= self.max_retries or not self._retryable(method, error=exc):
+                    self.metrics.record_call(attempt, failed=True)
+                    raise
+                response, error = None, exc
+            else:
+                self.metrics.record_attempt(response.status_code, time.monotonic() - started)
+                self.after_response(method, kwargs, response)
+                if attempt >= self.max_retries or not self._retryable(method, response=response):
+                    self.metrics.record_call(attempt, failed=response.status_code in RETRY_STATUSES)
+                    return response
+
+            attempt += 1
+            delay = self.backoff(attempt, response)
+            if delay > MAX_RETRY_AFTER:
+                self.metrics.record_call(attempt - 1, failed=True)
+                if response is None:
+                    raise error
+                return response
+            await asyncio.sleep(delay)
+
+    async def gather(self, aws, return_exceptions=True):
+        """gather_bounded with this client's concurrency."""
+        return await gather_bounded(aws, limit=self.concurrency, return_exceptions=return_exceptions)
+
+    async def get(self, endpoint, params=None, headers=None, **kwargs):
+        return await self.request("GET", endpoint, params=params, headers=headers, **kwargs)
+
+    async def post(self, endpoint, data=None, json=None, params=None, headers=None, **kwargs):
+        return await self.request("POST", endpoint, data=data, json=json, params=params, headers=headers, **kwargs)
+
+    async def put(self, endpoint, data=None, json=None, params=None, headers=None, **kwargs):
+        return await self.request("PUT", endpoint, data=data, json=json, params=params, headers=headers, **kwargs)
+
+    async def delete(self, endpoint, params=None, headers=None, **kwargs):
+        return await self.request("DELETE", endpoint, params=params, headers=headers, **kwargs)
+
+    async def patch(self, endpoint, data=None, json=None, params=None, headers=None, **kwargs):
+        return await self.request("PATCH", endpoint, data=data, json=json, params=params, headers=headers, **kwargs)
@@ -1,30 +1,229 @@
-
 # shared request logic
 # is like a control for talking to any web API
 
 import os
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
 import requests ##sends HTTP requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from .rate_limit import RateLimitExceeded
 
 load_dotenv()
 
+DEFAULT_TIMEOUT = (3.05, 30)     ## (connect, read) seconds; a hung upstream can't hold a worker forever
+DEFAULT_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+DEFAULT_MAX_RETRIES = 3
+BACKOFF_BASE = 0.5               ## seconds, doubled per attempt
+BACKOFF_MAX = 30
+MAX_RETRY_AFTER = 60             ## a longer Retry-After is returned to the caller instead of slept on
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+LATENCY_SAMPLES = 1000
+
+## one Session (= one connection pool) per base URL, shared by every client talking to it
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def shared_session(base_url, pool_size=DEFAULT_POOL_SIZE):
+    """The process-wide pooled Session for `base_url`."""
+    key = (base_url, pool_size)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            ## retries are done in BaseAPIClient.request, so they show up in metrics
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[key] = session
+        return session
+
+
+def close_shared_sessions():
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+def retry_after_seconds(response, now=None):
+    """Retry-After as seconds (delta or HTTP-date form), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - (now if now is not None else time.time()))
+
+
+def _never_sent(error):
+    ## connect timeout / refused / DNS: the server never saw the request, safe to repeat any method
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(error, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+class ClientMetrics:
+    """Request / retry / failure counts and recent latencies of one client (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0          ## logical calls
+        self.attempts = 0          ## HTTP attempts, retries included
+        self.retries = 0
+        self.failures = 0          ## calls that ended in an exception or a retryable status
+        self.statuses = {}
+        self.total_seconds = 0.0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def record_attempt(self, status, seconds):
+        with self._lock:
+            self.attempts += 1
+            key = status if status is not None else "error"
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+            self.total_seconds += seconds
+            self._latencies.append(seconds)
+
+    def record_call(self, retries, failed):
+        with self._lock:
+            self.requests += 1
+            self.retries += retries
+            self.failures += int(failed)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            data = {
+                "requests": self.requests,
+                "attempts": self.attempts,
+                "retries": self.retries,
+                "failures": self.failures,
+                "statuses": dict(self.statuses),
+                "avg_seconds": self.total_seconds / self.attempts if self.attempts else 0.0,
+            }
+        for name, q in (("p50_seconds", 0.50), ("p95_seconds", 0.95), ("max_seconds", 1.0)):
+            data[name] = latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+        return data
+
+
 class BaseAPIClient:
-    def __init__(self, base_url, api_key=None):
+    def __init__(self, base_url, api_key=None, timeout=DEFAULT_TIMEOUT, pool_size=DEFAULT_POOL_SIZE,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
         self.base_url = base_url
         self.api_key = api_key
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metrics = ClientMetrics()
+
+    @property
+    def session(self):
+        return shared_session(self.base_url, self.pool_size)
+
+    def backoff(self, attempt, response=None):
+        """Seconds to wait before retry number `attempt` (1-based): Retry-After, else full jitter."""
+        if response is not None:
+            retry_after = retry_after_seconds(response)
+            if retry_after is not None:
+                return retry_after
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def before_send(self, method, kwargs):
+        """
+        Hook run before every attempt (retries included), e.g. to wait for a
+        rate limiter. Raising RateLimitExceeded ends the call like a too-long
+        Retry-After: the previous response is returned, or the error raised.
+        """
+
+    def after_response(self, method, kwargs, response):
+        """Hook run on every response received, before deciding whether to retry."""
+
+    def _retryable(self, method, response=None, error=None):
+        if error is not None:
+            if not isinstance(error, (requests.ConnectionError, requests.Timeout)):
+                return False   ## bad URL, too many redirects, ...: the same again won't help
+            return method in IDEMPOTENT_METHODS or _never_sent(error)
+        if response.status_code not in RETRY_STATUSES:
+            return False
+        ## a POST that got a 5xx may have been applied; 429 means it was refused
+        return method in IDEMPOTENT_METHODS or response.status_code == 429
+
+    def request(self, method, endpoint, timeout=None, **kwargs):
+        """
+        One call through the pooled session, retried up to max_retries times
+        on connection errors, 429 and 5xx (non-idempotent methods only when
+        the request can't have been applied). Returns the last response, or
+        raises the last requests exception (or RateLimitExceeded from
+        before_send when there is no response yet).
+        """
+        method = method.upper()
+        url = f"{self.base_url}{endpoint}"
+        attempt, response = 0, None
+        while True:
+            try:
+                self.before_send(method, kwargs)
+            except RateLimitExceeded:
+                ## same rule as a long Retry-After: the caller decides, with the last response if any
+                self.metrics.record_call(max(attempt - 1, 0), failed=True)
+                if response is None:
+                    raise
+                return response
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except requests.RequestException as exc:
+                self.metrics.record_attempt(None, time.monotonic() - started)
+                if attempt >= self.max_retries or not self._retryable(method, error=exc):
+                    self.metrics.record_call(attempt, failed=True)
+                    raise
+                response, error = None, exc
+            else:
+                self.metrics.record_attempt(response.status_code, time.monotonic() - started)
+                self.after_response(method, kwargs, response)
+                if attempt >= self.max_retries or not self._retryable(method, response=response):
+                    self.metrics.record_call(attempt, failed=response.status_code in RETRY_STATUSES)
+                    return response
+
+            attempt += 1
+            delay = self.backoff(attempt, response)
+            if delay > MAX_RETRY_AFTER:
+                ## told to come back much later: let the caller decide
+                self.metrics.record_call(attempt - 1, failed=True)
+                if response is None:
+                    raise error
+                return response
+            if response is not None:
+                response.close()
+            time.sleep(delay)
 
-    def get(self, endpoint, params=None):
-        return requests.get(f"{self.base_url}{endpoint}", params=params)
+    def get(self, endpoint, params=None, headers=None, **kwargs):
+        return self.request("GET", endpoint, params=params, headers=headers, **kwargs)
 
-    def post(self, endpoint, data=None, json=None):
-        return requests.post(f"{self.base_url}{endpoint}", data=data, json=json)
+    def post(self, endpoint, data=None, json=None, params=None, headers=None, **kwargs):
+        return self.request("POST", endpoint, data=data, json=json, params=params, headers=headers, **kwargs)
 
-    def put(self, endpoint, data=None, json=None):
-        return requests.put(f"{self.base_url}{endpoint}", data=data, json=json)
+    def put(self, endpoint, data=None, json=None, params=None, headers=None, **kwargs):
+        return self.request("PUT", endpoint, data=data, json=json, params=params, headers=headers, **kwargs)
 
-    def delete(self, endpoint):
-        return requests.delete(f"{self.base_url}{endpoint}")
-    
-    def patch(self, endpoint, data=None, json=None, headers=None):
-        return requests.patch(f"{self.base_url}{endpoint}", data=data, json=json, headers=headers) ## just like put but calls requests.patch.
+    def delete(self, endpoint, params=None, headers=None, **kwargs):
+        return self.request("DELETE", endpoint, params=params, headers=headers, **kwargs)
 
+    def patch(self, endpoint, data=None, json=None, params=None, headers=None, **kwargs):
+        return self.request("PATCH", endpoint, data=data, json=json, params=params, headers=headers, **kwargs) ## just like put but calls requests.patch.
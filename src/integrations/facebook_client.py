@@ -1,14 +1,47 @@
 import os
-from .base_client import BaseAPIClient
+from .async_base_client import AsyncBaseAPIClient
+from .base_client import MAX_RETRY_AFTER, BaseAPIClient
+from .rate_limit import graph_rate_limiter, is_throttled
 ## It inherits from BaseAPIClient, so it automatically gets get, post, put, and delete
 
-class FacebookClient(BaseAPIClient):
+GRAPH_URL = "https://graph.facebook.com/v17.0"
+
+
+class GraphThrottlingMixin:
+    """
+    Every attempt waits for its access token's bucket in `rate_limiter`
+    (process-wide by default) and feeds the response's usage headers back. A
+    throttled call is retried after the pause instead of failing: Graph
+    didn't execute it. Waits longer than `max_rate_wait` (e.g. a token
+    paused for its "time to regain access") aren't slept through: the call
+    returns the throttled response, or raises RateLimitExceeded before the
+    first attempt.
+    """
+    rate_limiter = graph_rate_limiter
+    max_rate_wait = MAX_RETRY_AFTER
+
+    def _token(self, kwargs):
+        return (kwargs.get("params") or {}).get("access_token") or self.api_key
+
+    def after_response(self, method, kwargs, response):
+        self.rate_limiter.observe(self._token(kwargs), response)
+
+    def _retryable(self, method, response=None, error=None):
+        if response is not None and is_throttled(response):
+            return True
+        return super()._retryable(method, response=response, error=error)
+
+
+class FacebookClient(GraphThrottlingMixin, BaseAPIClient):
     def __init__(self):
         super().__init__(
-            base_url="https://graph.facebook.com/v17.0",
+            base_url=GRAPH_URL,
             api_key=os.getenv("FACEBOOK_API_KEY")
         )
 
+    def before_send(self, method, kwargs):
+        self.rate_limiter.acquire(self._token(kwargs), max_wait=self.max_rate_wait)
+
     def create_post(self, page_id, message):
         return self.post(
             f"/{page_id}/feed",
@@ -41,3 +74,52 @@ class FacebookClient(BaseAPIClient):
             f"/{post_id}",
             params={"access_token": self.api_key}
         )
+
+
+class AsyncFacebookClient(GraphThrottlingMixin, AsyncBaseAPIClient):
+    """
+    FacebookClient for asyncio: same methods, awaited. Bulk work goes through
+    gather(), e.g. await fb.gather(fb.create_post(page_id, m) for m in messages)
+    """
+    def __init__(self, concurrency=50):
+        super().__init__(
+            base_url=GRAPH_URL,
+            api_key=os.getenv("FACEBOOK_API_KEY"),
+            concurrency=concurrency,
+        )
+
+    async def before_send(self, method, kwargs):
+        await self.rate_limiter.acquire_async(self._token(kwargs), max_wait=self.max_rate_wait)
+
+    async def create_post(self, page_id, message):
+        return await self.post(
+            f"/{page_id}/feed",
+            json={"message": message},
+            params={"access_token": self.api_key}
+        )
+
+    async def upload_photo(self, page_id, image_url, caption=""):
+        return await self.post(
+            f"/{page_id}/photos",
+            json={"url": image_url, "caption": caption},
+            params={"access_token": self.api_key}
+        )
+
+    async def get_post(self, post_id):
+        return await self.get(
+            f"/{post_id}",
+            params={"access_token": self.api_key}
+        )
+
+    async def update_post(self, post_id, message):
+        return await self.post(
+            f"/{post_id}",
+            json={"message": message},
+            params={"access_token": self.api_key}
+        )
+
+    async def delete_post(self, post_id):
+        return await self.delete(
+            f"/{post_id}",
+            params={"access_token": self.api_key}
+        )
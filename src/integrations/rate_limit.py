@@ -0,0 +1,209 @@
+# client-side throttling for the Graph API
+# one token bucket per access token, slowed down by the usage Facebook reports back
+
+import asyncio
+import json
+import os
+import threading
+import time
+
+DEFAULT_RATE = float(os.getenv("FACEBOOK_RATE_PER_SECOND", "5"))   ## calls per second per token
+DEFAULT_BURST = int(os.getenv("FACEBOOK_RATE_BURST", "20"))
+SLOW_DOWN_AT = 50       ## % usage where the rate starts dropping
+STOP_AT = 95            ## % usage at (and above) which the rate is down to MIN_RATE_FACTOR
+MIN_RATE_FACTOR = 0.05
+DEFAULT_PAUSE = 60      ## seconds to stop when throttled without a "time to regain access"
+
+## Graph error codes meaning "throttled, request not executed"
+THROTTLE_ERROR_CODES = frozenset({4, 17, 32, 613, 80001, 80002, 80004, 80005, 80006, 80008})
+
+
+class RateLimitExceeded(Exception):
+    """The next free slot is further away than the caller is willing to wait."""
+
+    def __init__(self, delay):
+        super().__init__(f"rate limited for another {delay:.1f}s")
+        self.delay = delay
+
+
+class TokenBucket:
+    """
+    Token bucket that queues instead of refusing: acquire() reserves the
+    next free slot and waits for it, so callers go in arrival order. With
+    `max_wait`, a slot further away than that isn't taken and
+    RateLimitExceeded is raised instead. Reservations are made under a lock
+    and the waiting happens outside it, so it is shared safely by any number
+    of threads (and acquire_async() by coroutines).
+
+    Kept as a "theoretical arrival time" (GCRA), which behaves exactly like
+    a bucket of `burst` tokens refilled at `rate` per second.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, clock=time.monotonic):
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._rate = rate
+        self.burst = burst
+        self._tat = clock()          ## when the bucket will be full again
+        self._paused_until = 0.0
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._rate = rate
+
+    def pause(self, seconds):
+        """Hold every reservation made from now on for at least `seconds`."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    def reserve(self, max_wait=None):
+        """
+        Take the next slot; returns how many seconds to wait before using it.
+        Raises RateLimitExceeded, leaving the bucket as it was, when that is
+        more than `max_wait`.
+        """
+        with self._lock:
+            now = self._clock()
+            interval = 1.0 / self._rate
+            tat = max(self._tat, now, self._paused_until)
+            allowed_at = max(tat - (self.burst - 1) * interval, self._paused_until)
+            delay = max(0.0, allowed_at - now)
+            if max_wait is not None and delay > max_wait:
+                raise RateLimitExceeded(delay)
+            self._tat = max(tat, allowed_at) + interval
+            return delay
+
+    def acquire(self, max_wait=None):
+        delay = self.reserve(max_wait)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, max_wait=None):
+        delay = self.reserve(max_wait)
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+
+def _percent(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_usage(headers):
+    """
+    (highest usage %, seconds until access is regained) from X-App-Usage,
+    X-Business-Use-Case-Usage and X-Ad-Account-Usage. Usage is None when
+    none of them was there (or readable): nothing reported, not 0%.
+    """
+    usage, regain = None, 0.0
+
+    def read(name):
+        raw = headers.get(name)
+        if not raw:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def highest(*values):
+        return max(usage or 0.0, *values)
+
+    app = read("X-App-Usage")
+    if isinstance(app, dict):
+        usage = highest(*(_percent(app.get(k)) for k in ("call_count", "total_cputime", "total_time")))
+
+    account = read("X-Ad-Account-Usage")
+    if isinstance(account, dict):
+        usage = highest(_percent(account.get("acc_id_util_pct")))
+        regain = max(regain, _percent(account.get("reset_time_duration")))
+
+    business = read("X-Business-Use-Case-Usage")
+    if isinstance(business, dict):
+        for entries in business.values():
+            for entry in entries if isinstance(entries, list) else []:
+                if not isinstance(entry, dict):
+                    continue
+                usage = highest(*(_percent(entry.get(k)) for k in ("call_count", "total_cputime", "total_time")))
+                ## reported in minutes
+                regain = max(regain, _percent(entry.get("estimated_time_to_regain_access")) * 60)
+    return usage, regain
+
+
+def rate_factor(usage):
+    """Share of the base rate to use at `usage` %: 1 up to SLOW_DOWN_AT, MIN_RATE_FACTOR from STOP_AT."""
+    if usage <= SLOW_DOWN_AT:
+        return 1.0
+    if usage >= STOP_AT:
+        return MIN_RATE_FACTOR
+    span = (usage - SLOW_DOWN_AT) / (STOP_AT - SLOW_DOWN_AT)
+    return 1.0 - span * (1.0 - MIN_RATE_FACTOR)
+
+
+def is_throttled(response):
+    """True for a Graph "too many calls" answer (HTTP 429, or an error body with a throttle code)."""
+    if response.status_code == 429:
+        return True
+    if response.status_code < 400:
+        return False
+    try:
+        error = response.json().get("error", {})
+    except (ValueError, AttributeError):
+        return False
+    return isinstance(error, dict) and error.get("code") in THROTTLE_ERROR_CODES
+
+
+class GraphRateLimiter:
+    """
+    TokenBucket per access token (app or page token), shared by every client
+    in the process. Each response's usage headers set that token's rate
+    (see rate_factor); being throttled, or told how long until access is
+    back, pauses it.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, token):
+        with self._lock:
+            bucket = self._buckets.get(token)
+            if bucket is None:
+                bucket = self._buckets[token] = TokenBucket(self.rate, self.burst, clock=self._clock)
+            return bucket
+
+    def acquire(self, token, max_wait=None):
+        return self.bucket(token).acquire(max_wait)
+
+    async def acquire_async(self, token, max_wait=None):
+        return await self.bucket(token).acquire_async(max_wait)
+
+    def observe(self, token, response):
+        """
+        Adjust `token`'s bucket from a Graph response. A response without
+        usage headers leaves the rate alone (it says nothing about usage).
+        """
+        bucket = self.bucket(token)
+        usage, regain = parse_usage(response.headers)
+        if usage is not None:
+            bucket.set_rate(self.rate * rate_factor(usage))
+        if regain:
+            bucket.pause(regain)
+        elif is_throttled(response) or (usage or 0) >= 100:
+            bucket.pause(DEFAULT_PAUSE)
+        return usage
+
+
+## process-wide: every FacebookClient / AsyncFacebookClient shares it
+graph_rate_limiter = GraphRateLimiter()
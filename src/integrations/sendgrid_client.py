@@ -2,13 +2,39 @@
 ## It inherits from BaseAPIClient, so it automatically gets get, post, put, and delete
 ## SendGrid’s API (which is an email‑sending service)
 
+import json
 import os
+from dataclasses import dataclass
+
+import httpx
+import requests
+
+from .async_base_client import AsyncBaseAPIClient
 from .base_client import BaseAPIClient
 
+SENDGRID_URL = "https://api.sendgrid.com/v3"
+
+MAX_PERSONALIZATIONS = 1000            ## SendGrid's limit per /mail/send request
+MAX_PAYLOAD_BYTES = 20 * 1024 * 1024   ## well under the 30MB total message limit
+
+
+@dataclass
+class RecipientOutcome:
+    email: str
+    status: str            ## "accepted" | "rejected" | "invalid" | "duplicate" | "too_large"
+    http_status: int = None
+    message_id: str = ""   ## X-Message-Id of the request it went out in
+    error: str = ""
+    key: object = None     ## caller's reference, e.g. a lead id
+
+    @property
+    def accepted(self):
+        return self.status == "accepted"
+
 class SendGridClient(BaseAPIClient):
     def __init__(self):
         super().__init__(
-            base_url="https://api.sendgrid.com/v3",
+            base_url=SENDGRID_URL,
             api_key=os.getenv("SENDGRID_API_KEY")
         )
         self.headers = {"Authorization": f"Bearer {self.api_key}"}
@@ -32,7 +58,151 @@ class SendGridClient(BaseAPIClient):
     def delete_template(self, template_id):
         return self.delete(f"/templates/{template_id}", headers=self.headers)
 
+    def send_batch(self, from_email, subject, content, recipients, content_type="text/plain",
+                   template_id=None, max_personalizations=MAX_PERSONALIZATIONS,
+                   max_payload_bytes=MAX_PAYLOAD_BYTES):
+        """
+        Send one message to many recipients with as few requests as possible.
 
-    
+        recipients: [{"email": ..., "name": ..., "substitutions": {"-first_name-": "Jo"},
+                      "key": <anything>}, ...]   (only "email" is required)
+        With template_id the per-recipient dict goes out as dynamic_template_data
+        instead of substitutions.
 
+        Recipients are packed into personalization blocks of up to
+        max_personalizations per request, and a request is cut early when the
+        JSON body would pass max_payload_bytes. Returns one RecipientOutcome
+        per recipient, in input order; a failed request marks its whole block
+        "rejected" with the status and error SendGrid gave.
+        """
+        planned, outcomes = plan_batch_send(
+            from_email, subject, content, recipients, content_type, template_id,
+            max_personalizations, max_payload_bytes,
+        )
+        for indexes, payload in planned:
+            try:
+                response = self.post("/mail/send", json=payload, headers=self.headers)
+            except requests.RequestException as exc:
+                record_batch_outcomes(outcomes, recipients, indexes, payload, error=exc)
+            else:
+                record_batch_outcomes(outcomes, recipients, indexes, payload, response=response)
+        return outcomes
 
+
+class AsyncSendGridClient(AsyncBaseAPIClient):
+    """SendGridClient for asyncio; send_batch keeps up to `concurrency` requests in flight."""
+    def __init__(self, concurrency=20):
+        super().__init__(
+            base_url=SENDGRID_URL,
+            api_key=os.getenv("SENDGRID_API_KEY"),
+            concurrency=concurrency,
+        )
+        self.headers = {"Authorization": f"Bearer {self.api_key}"}
+
+    async def send_email(self, from_email, to_email, subject, content):
+        data = {
+            "personalizations": [{"to": [{"email": to_email}]}],
+            "from": {"email": from_email},
+            "subject": subject,
+            "content": [{"type": "text/plain", "value": content}]
+        }
+        return await self.post("/mail/send", json=data, headers=self.headers)
+
+    async def list_templates(self):
+        return await self.get("/templates", headers=self.headers)
+
+    async def update_template(self, template_id, name):
+        data = {"name": name}
+        return await self.patch(f"/templates/{template_id}", json=data, headers=self.headers)
+
+    async def delete_template(self, template_id):
+        return await self.delete(f"/templates/{template_id}", headers=self.headers)
+
+    async def send_batch(self, from_email, subject, content, recipients, content_type="text/plain",
+                         template_id=None, max_personalizations=MAX_PERSONALIZATIONS,
+                         max_payload_bytes=MAX_PAYLOAD_BYTES):
+        """SendGridClient.send_batch, with the requests sent concurrently."""
+        planned, outcomes = plan_batch_send(
+            from_email, subject, content, recipients, content_type, template_id,
+            max_personalizations, max_payload_bytes,
+        )
+
+        async def send(indexes, payload):
+            try:
+                response = await self.post("/mail/send", json=payload, headers=self.headers)
+            except httpx.HTTPError as exc:
+                record_batch_outcomes(outcomes, recipients, indexes, payload, error=exc)
+            else:
+                record_batch_outcomes(outcomes, recipients, indexes, payload, response=response)
+
+        await self.gather([send(indexes, payload) for indexes, payload in planned], return_exceptions=False)
+        return outcomes
+
+
+def plan_batch_send(from_email, subject, content, recipients, content_type="text/plain", template_id=None,
+                    max_personalizations=MAX_PERSONALIZATIONS, max_payload_bytes=MAX_PAYLOAD_BYTES):
+    """
+    Pack `recipients` into /mail/send bodies (see SendGridClient.send_batch).
+    Returns ([(recipient indexes, payload), ...], outcomes) where outcomes
+    already holds the recipients that won't be sent (invalid, duplicate, too_large).
+    """
+    message = {"from": {"email": from_email}, "subject": subject}
+    if template_id:
+        message["template_id"] = template_id
+    else:
+        message["content"] = [{"type": content_type, "value": content}]
+    data_key = "dynamic_template_data" if template_id else "substitutions"
+    base_size = len(json.dumps({**message, "personalizations": []}).encode())
+
+    planned = []
+    outcomes = [None] * len(recipients)
+    seen = set()
+    indexes, personalizations, batch_size = [], [], base_size
+
+    for index, recipient in enumerate(recipients):
+        email = (recipient.get("email") or "").strip()
+        key = recipient.get("key")
+        if "@" not in email:
+            outcomes[index] = RecipientOutcome(email, "invalid", error="Not an email address.", key=key)
+            continue
+        if email.lower() in seen:
+            outcomes[index] = RecipientOutcome(email, "duplicate", error="Already in this send.", key=key)
+            continue
+        seen.add(email.lower())
+
+        to = {"email": email}
+        if recipient.get("name"):
+            to["name"] = recipient["name"]
+        personalization = {"to": [to]}
+        if recipient.get("substitutions"):
+            personalization[data_key] = recipient["substitutions"]
+        size = len(json.dumps(personalization).encode()) + 1   ## + the comma
+        if base_size + size > max_payload_bytes:
+            outcomes[index] = RecipientOutcome(email, "too_large", error="Personalization exceeds the payload limit.", key=key)
+            continue
+
+        if len(personalizations) >= max_personalizations or batch_size + size > max_payload_bytes:
+            planned.append((indexes, {**message, "personalizations": personalizations}))
+            indexes, personalizations, batch_size = [], [], base_size
+        indexes.append(index)
+        personalizations.append(personalization)
+        batch_size += size
+    if personalizations:
+        planned.append((indexes, {**message, "personalizations": personalizations}))
+    return planned, outcomes
+
+
+def record_batch_outcomes(outcomes, recipients, indexes, payload, response=None, error=None):
+    """Fill in the outcome of every recipient of one /mail/send request."""
+    if response is not None:
+        http_status, message_id = response.status_code, response.headers.get("X-Message-Id", "")
+        error = response.text[:500] if http_status >= 300 else ""
+    else:
+        http_status, message_id, error = None, "", str(error)
+
+    status = "accepted" if http_status is not None and http_status < 300 else "rejected"
+    for index, personalization in zip(indexes, payload["personalizations"]):
+        outcomes[index] = RecipientOutcome(
+            personalization["to"][0]["email"], status, http_status, message_id, error,
+            recipients[index].get("key"),
+        )
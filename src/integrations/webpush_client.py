@@ -0,0 +1,156 @@
+## Web Push sender: one POST per subscription endpoint (FCM, Mozilla autopush, Apple, ...)
+## Endpoints are full URLs on many different hosts, so this doesn't go through BaseAPIClient.
+##
+## Pushes carry no payload ("tickle" push): the service worker wakes up and fetches
+## what to show, so nothing has to be encrypted per subscriber.
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import jwt
+import requests
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from requests.adapters import HTTPAdapter
+
+DEFAULT_WORKERS = 32
+DEFAULT_TIMEOUT = 10          # seconds per request
+DEFAULT_TTL = 24 * 60 * 60    # how long the push service may hold the message
+GONE_STATUSES = (404, 410)    # subscription expired / unsubscribed, never retry
+VAPID_TOKEN_LIFETIME = 12 * 60 * 60
+
+
+@dataclass(frozen=True)
+class PushResult:
+    key: object           # whatever the caller passed along with the endpoint
+    endpoint: str
+    status: int = None    # None when there was no response (timeout, connection error)
+    error: str = ""
+
+    @property
+    def ok(self):
+        return self.status is not None and 200 <= self.status < 300
+
+    @property
+    def gone(self):
+        return self.status in GONE_STATUSES
+
+
+def load_vapid_key(pem):
+    """The VAPID private key as a cryptography key object (None if not configured)."""
+    if not pem:
+        return None
+    try:
+        key = load_pem_private_key(pem.encode() if isinstance(pem, str) else pem, password=None)
+    except (ValueError, TypeError) as exc:
+        raise ValueError(f"VAPID private key is not a usable PEM key: {exc}") from None
+    if not isinstance(key, ec.EllipticCurvePrivateKey) or key.curve.name != "secp256r1":
+        raise ValueError("VAPID private key must be a P-256 (prime256v1) EC key.")
+    return key
+
+
+class WebPushClient:
+    """
+    Sends pushes from a bounded thread pool. Each push-service host gets its
+    own Session whose connection pool is as large as the worker pool, so
+    connections (and TLS handshakes) are reused across the whole fan-out.
+
+    VAPID (RFC 8292) is used when VAPID_PRIVATE_KEY (PEM) and VAPID_PUBLIC_KEY
+    (base64url, the key given to browsers) are set; tokens are signed once per
+    host and reused for VAPID_TOKEN_LIFETIME. A private key that isn't a
+    P-256 EC key is a ValueError here, not a failure on every push.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT, ttl=DEFAULT_TTL,
+                 urgency="normal", vapid_private_key=None, vapid_public_key=None, vapid_subject=None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.ttl = ttl
+        self.urgency = urgency
+        self.vapid_public_key = vapid_public_key or os.getenv("VAPID_PUBLIC_KEY")
+        self.vapid_subject = vapid_subject or os.getenv("VAPID_SUBJECT", "mailto:admin@localhost")
+        self.vapid_private_key = load_vapid_key(vapid_private_key or os.getenv("VAPID_PRIVATE_KEY"))
+        self._sessions = {}
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            session.close()
+
+    def _session(self, origin):
+        with self._lock:
+            session = self._sessions.get(origin)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[origin] = session
+            return session
+
+    def _vapid_authorization(self, origin):
+        if not (self.vapid_private_key and self.vapid_public_key):
+            return None
+        now = time.time()
+        with self._lock:
+            cached = self._tokens.get(origin)
+            # refresh an hour early so a token never expires mid-request
+            if cached is not None and cached[1] - 3600 > now:
+                return cached[0]
+
+        expires = int(now) + VAPID_TOKEN_LIFETIME
+        token = jwt.encode({"aud": origin, "exp": expires, "sub": self.vapid_subject},
+                           self.vapid_private_key, algorithm="ES256")
+        header = f"vapid t={token}, k={self.vapid_public_key}"
+        with self._lock:
+            self._tokens[origin] = (header, expires)
+        return header
+
+    def send(self, endpoint, key=None):
+        """Push to one endpoint; failures come back as a PushResult, never raised."""
+        parts = urlsplit(endpoint)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        headers = {"TTL": str(self.ttl), "Urgency": self.urgency}
+        try:
+            authorization = self._vapid_authorization(origin)
+        except (jwt.PyJWTError, ValueError, TypeError) as exc:
+            return PushResult(key, endpoint, None, f"VAPID signing failed: {exc}")
+        if authorization:
+            headers["Authorization"] = authorization
+        try:
+            response = self._session(origin).post(endpoint, headers=headers, timeout=self.timeout)
+        except requests.RequestException as exc:
+            return PushResult(key, endpoint, None, str(exc))
+        error = "" if 200 <= response.status_code < 300 else response.text[:200]
+        return PushResult(key, endpoint, response.status_code, error)
+
+    def send_many(self, subscriptions):
+        """
+        Push to every (key, endpoint) in `subscriptions` (any iterable, read
+        lazily) and yield a PushResult for each as it completes. At most
+        2 x max_workers requests are queued at a time, so a generator over
+        millions of rows is never materialized.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = set()
+            for key, endpoint in subscriptions:
+                pending.add(pool.submit(self.send, endpoint, key))
+                if len(pending) >= self.max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in pending:
+                yield future.result()
@@ -0,0 +1,58 @@
+import threading
+import unittest
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+## shared fixture for the integration client tests: a real HTTP server on a free local port
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    ## keep-alive, so connection reuse shows up as few distinct client ports
+    protocol_version = "HTTP/1.1"
+
+    @contextmanager
+    def tracked(self):
+        ## records the connection and how many requests overlap while the block runs
+        server = self.server
+        with server.lock:
+            server.connections.add(self.client_address)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            yield server
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServerMixin:
+    ## set `handler`; setUp serves it on self.base, tests script and inspect self.server:
+    ##   lock, connections, calls, script (consumed by the handler), in_flight / max_in_flight
+    handler = StubHandler
+
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.connections = set()
+        self.server.calls = []
+        self.server.script = []
+        self.server.in_flight = self.server.max_in_flight = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+
+class StubServerTestCase(StubServerMixin, unittest.TestCase):
+    pass
+
+
+class AsyncStubServerTestCase(StubServerMixin, unittest.IsolatedAsyncioTestCase):
+    pass
@@ -0,0 +1,127 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+
+from src.integrations.async_base_client import AsyncBaseAPIClient, aclose_shared_clients, gather_bounded
+from src.integrations.facebook_client import AsyncFacebookClient
+from src.integrations.sendgrid_client import AsyncSendGridClient
+from src.tests.stub_server import AsyncStubServerTestCase, StubHandler
+## python -m unittest -v src.tests.test_async_clients
+
+
+class SlowStubAPI(StubHandler):
+    ## answers after 50ms with the next scripted status (200 when the script is empty)
+
+    def _respond(self):
+        with self.tracked() as server:
+            with server.lock:
+                status = server.script.pop(0) if server.script else 200
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            time.sleep(0.05)
+            self.send_response(status)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+    do_GET = do_POST = _respond
+
+
+class TestAsyncBaseAPIClient(AsyncStubServerTestCase):
+    handler = SlowStubAPI
+
+    async def asyncTearDown(self):
+        await aclose_shared_clients()
+
+    async def test_gather_keeps_requests_in_flight_up_to_the_limit(self):
+        client = AsyncBaseAPIClient(self.base, concurrency=20)
+
+        started = time.monotonic()
+        responses = await client.gather(client.get(f"/item/{i}") for i in range(100))
+        elapsed = time.monotonic() - started
+
+        self.assertEqual([r.status_code for r in responses], [200] * 100)
+        self.assertLessEqual(self.server.max_in_flight, 20)
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertLessEqual(len(self.server.connections), 20)
+        ## 100 x 50ms serially would be 5s
+        self.assertLess(elapsed, 2.5)
+        self.assertEqual(client.metrics.snapshot()["requests"], 100)
+
+    async def test_retries_503(self):
+        self.server.script = [503]
+        client = AsyncBaseAPIClient(self.base, backoff_base=0.01)
+
+        response = await client.get("/flaky")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.metrics.snapshot()["retries"], 1)
+
+    async def test_connection_refused_raises_after_retries(self):
+        client = AsyncBaseAPIClient("http://127.0.0.1:9", max_retries=2, backoff_base=0.001)
+
+        with self.assertRaises(httpx.ConnectError):
+            await client.post("/x", json={})
+        self.assertEqual(client.metrics.snapshot()["attempts"], 3)
+
+
+class TestGatherBounded(unittest.IsolatedAsyncioTestCase):
+
+    async def test_order_limit_and_exceptions(self):
+        running = peak = 0
+
+        async def job(i):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.001 * (10 - i % 10))
+            running -= 1
+            if i == 7:
+                raise ValueError("boom")
+            return i
+
+        results = await gather_bounded((lambda i=i: job(i) for i in range(50)), limit=5)
+
+        self.assertLessEqual(peak, 5)
+        self.assertIsInstance(results[7], ValueError)
+        self.assertEqual([r for i, r in enumerate(results) if i != 7], [i for i in range(50) if i != 7])
+
+
+class TestAsyncIntegrationClients(unittest.IsolatedAsyncioTestCase):
+
+    @patch("src.integrations.facebook_client.AsyncBaseAPIClient.post", new_callable=AsyncMock)
+    async def test_facebook_create_post(self, mock_post):
+        fake_response = MagicMock()
+        fake_response.json.return_value = {"id": "post_123"}
+        mock_post.return_value = fake_response
+
+        fb = AsyncFacebookClient()
+        resp = await fb.create_post("page_1", "Happy Birthday!")
+
+        self.assertEqual(resp.json()["id"], "post_123")
+        mock_post.assert_awaited_once_with(
+            "/page_1/feed",
+            json={"message": "Happy Birthday!"},
+            params={"access_token": fb.api_key}
+        )
+
+    @patch("src.integrations.sendgrid_client.AsyncBaseAPIClient.post", new_callable=AsyncMock)
+    async def test_sendgrid_send_batch(self, mock_post):
+        fake_response = MagicMock()
+        fake_response.status_code = 202
+        fake_response.headers = {"X-Message-Id": "m"}
+        mock_post.return_value = fake_response
+        recipients = [{"email": f"lead{i}@example.com", "key": i} for i in range(2500)] + [{"email": "nope"}]
+
+        outcomes = await AsyncSendGridClient().send_batch("from@example.com", "Hi", "Body", recipients)
+
+        self.assertEqual(mock_post.await_count, 3)
+        self.assertEqual([o.status for o in outcomes].count("accepted"), 2500)
+        self.assertEqual(outcomes[-1].status, "invalid")
+        self.assertEqual([o.key for o in outcomes[:2500]], list(range(2500)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from src.integrations.base_client import BaseAPIClient, close_shared_sessions, retry_after_seconds
+from src.tests.stub_server import StubHandler, StubServerTestCase
+## python -m unittest -v src.tests.test_base_client
+
+
+class StubAPI(StubHandler):
+    ## the server pops one scripted (status, headers, delay) per request; 200 when the script is empty
+
+    def _respond(self):
+        server = self.server
+        with server.lock:
+            server.connections.add(self.client_address)
+            server.calls.append((self.command, self.path))
+            status, headers, delay = server.script.pop(0) if server.script else (200, {}, 0)
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        if delay:
+            time.sleep(delay)
+        body = b'{"ok": true}'
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _respond
+
+
+class TestBaseAPIClient(StubServerTestCase):
+    handler = StubAPI
+
+    def setUp(self):
+        super().setUp()
+        self.client = BaseAPIClient(self.base, timeout=(1, 1), backoff_base=0.01)
+
+    def tearDown(self):
+        close_shared_sessions()
+        super().tearDown()
+
+    def test_connections_are_pooled_and_shared_per_base_url(self):
+        other = BaseAPIClient(self.base)
+        for _ in range(10):
+            self.assertEqual(self.client.get("/ping", params={"a": 1}).status_code, 200)
+            self.assertEqual(other.post("/ping", json={"b": 2}, headers={"X-Test": "1"}).status_code, 200)
+
+        self.assertIs(self.client.session, other.session)
+        self.assertEqual(len(self.server.connections), 1)
+        self.assertEqual(self.server.calls[0], ("GET", "/ping?a=1"))
+
+    def test_retries_5xx_then_succeeds(self):
+        self.server.script = [(503, {}, 0), (502, {}, 0)]
+
+        response = self.client.get("/flaky")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.calls), 3)
+        metrics = self.client.metrics.snapshot()
+        self.assertEqual((metrics["requests"], metrics["attempts"], metrics["retries"]), (1, 3, 2))
+        self.assertEqual(metrics["statuses"], {503: 1, 502: 1, 200: 1})
+        self.assertEqual(metrics["failures"], 0)
+
+    @patch("src.integrations.base_client.time.sleep")
+    def test_429_honours_retry_after(self, mock_sleep):
+        self.server.script = [(429, {"Retry-After": "7"}, 0)]
+
+        response = self.client.post("/send", json={})
+
+        self.assertEqual(response.status_code, 200)
+        mock_sleep.assert_called_once_with(7.0)
+
+    @patch("src.integrations.base_client.time.sleep")
+    def test_long_retry_after_is_returned_not_slept(self, mock_sleep):
+        self.server.script = [(429, {"Retry-After": "3600"}, 0)]
+
+        response = self.client.get("/later")
+
+        self.assertEqual(response.status_code, 429)
+        mock_sleep.assert_not_called()
+        self.assertEqual(self.client.metrics.snapshot()["failures"], 1)
+
+    def test_post_is_not_retried_on_5xx(self):
+        self.server.script = [(500, {}, 0)]
+
+        response = self.client.post("/create", json={})
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(len(self.server.calls), 1)
+
+    def test_gives_up_after_max_retries(self):
+        self.server.script = [(503, {}, 0)] * 10
+
+        response = self.client.get("/down")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.calls), 1 + self.client.max_retries)
+        self.assertEqual(self.client.metrics.snapshot()["failures"], 1)
+
+    def test_read_timeout(self):
+        self.server.script = [(200, {}, 2)]
+        client = BaseAPIClient(self.base, timeout=(1, 0.2), max_retries=0)
+
+        started = time.monotonic()
+        with self.assertRaises(requests.ReadTimeout):
+            client.get("/hang")
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual(client.metrics.snapshot()["statuses"], {"error": 1})
+
+    def test_connection_refused_is_retried_even_for_post(self):
+        client = BaseAPIClient("http://127.0.0.1:9", max_retries=2, backoff_base=0.001)
+
+        with self.assertRaises(requests.ConnectionError):
+            client.post("/x", json={})
+        self.assertEqual(client.metrics.snapshot()["attempts"], 3)
+
+    def test_retry_after_http_date(self):
+        response = requests.Response()
+        response.headers["Retry-After"] = "Wed, 21 Oct 2015 07:28:10 GMT"
+        self.assertEqual(retry_after_seconds(response, now=1445412480.0), 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,237 @@
+import json
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from src.integrations.base_client import close_shared_sessions
+from src.integrations.async_base_client import aclose_shared_clients
+from src.integrations.facebook_client import AsyncFacebookClient, FacebookClient
+from src.integrations.rate_limit import (
+    GraphRateLimiter,
+    RateLimitExceeded,
+    TokenBucket,
+    parse_usage,
+    rate_factor,
+)
+from src.tests.stub_server import StubHandler, StubServerTestCase
+## python -m unittest -v src.tests.test_rate_limit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def fake_response(status=200, headers=None, body=None):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = headers or {}
+    response.json.return_value = body or {}
+    return response
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_then_steady_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, burst=3, clock=clock)
+
+        delays = [bucket.reserve() for _ in range(5)]
+
+        self.assertEqual(delays[:3], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(delays[3], 0.1)
+        self.assertAlmostEqual(delays[4], 0.2)
+
+    def test_refills_while_idle(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, burst=3, clock=clock)
+        for _ in range(3):
+            bucket.reserve()
+
+        clock.now += 10
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+
+    def test_pause_holds_everyone(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, burst=3, clock=clock)
+
+        bucket.pause(30)
+
+        self.assertAlmostEqual(bucket.reserve(), 30.0)
+        self.assertAlmostEqual(bucket.reserve(), 30.0)
+
+    def test_max_wait_refuses_without_reserving(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, burst=1, clock=clock)
+        bucket.pause(600)
+
+        with self.assertRaises(RateLimitExceeded) as raised:
+            bucket.reserve(max_wait=60)
+        self.assertAlmostEqual(raised.exception.delay, 600)
+
+        ## the refused call took no slot: the next one still starts right at the end of the pause
+        self.assertAlmostEqual(bucket.reserve(), 600)
+
+    def test_threads_queue_instead_of_failing(self):
+        bucket = TokenBucket(rate=100, burst=1)
+        stamps, lock = [], threading.Lock()
+
+        def worker():
+            for _ in range(5):
+                bucket.acquire()
+                with lock:
+                    stamps.append(time.monotonic())
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(stamps), 40)
+        ## 40 calls at 100/s with no burst: at least 39 intervals of 10ms
+        self.assertGreaterEqual(time.monotonic() - started, 0.38)
+
+
+class TestUsageHeaders(unittest.TestCase):
+
+    def test_parse_usage(self):
+        headers = {
+            "X-App-Usage": json.dumps({"call_count": 12, "total_cputime": 40, "total_time": 30}),
+            "X-Business-Use-Case-Usage": json.dumps({
+                "1234": [{"type": "pages", "call_count": 80, "total_cputime": 5, "total_time": 5,
+                          "estimated_time_to_regain_access": 2}],
+            }),
+        }
+        self.assertEqual(parse_usage(headers), (80.0, 120.0))
+        self.assertEqual(parse_usage({"X-App-Usage": json.dumps({"call_count": 0})}), (0.0, 0.0))
+        ## nothing reported is not the same as 0%
+        self.assertEqual(parse_usage({"X-App-Usage": "not json"}), (None, 0.0))
+        self.assertEqual(parse_usage({}), (None, 0.0))
+
+    def test_rate_factor(self):
+        self.assertEqual(rate_factor(10), 1.0)
+        self.assertEqual(rate_factor(50), 1.0)
+        self.assertAlmostEqual(rate_factor(72.5), 0.525)
+        self.assertEqual(rate_factor(99), 0.05)
+
+    def test_limiter_slows_down_per_token(self):
+        limiter = GraphRateLimiter(rate=10, burst=5)
+
+        limiter.observe("page-a", fake_response(headers={"X-App-Usage": json.dumps({"call_count": 72.5})}))
+        limiter.observe("page-b", fake_response(headers={"X-App-Usage": json.dumps({"call_count": 5})}))
+
+        self.assertAlmostEqual(limiter.bucket("page-a").rate, 5.25)
+        self.assertEqual(limiter.bucket("page-b").rate, 10)
+
+    def test_response_without_usage_keeps_the_rate(self):
+        limiter = GraphRateLimiter(rate=10, burst=5)
+        limiter.observe("t", fake_response(headers={"X-App-Usage": json.dumps({"call_count": 95})}))
+
+        limiter.observe("t", fake_response(500, body={"error": {"code": 2, "message": "Service temporarily unavailable"}}))
+
+        self.assertAlmostEqual(limiter.bucket("t").rate, 0.5)
+
+    def test_throttle_error_pauses(self):
+        clock = FakeClock()
+        limiter = GraphRateLimiter(rate=10, burst=5, clock=clock)
+
+        limiter.observe("t", fake_response(400, body={"error": {"code": 4, "message": "Application request limit reached"}}))
+
+        self.assertGreaterEqual(limiter.bucket("t").reserve(), 60)
+
+
+class ThrottlingGraph(StubHandler):
+    ## first call: throttled, with 0.3s until access is back; then OK
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.calls.append(time.monotonic())
+        if len(self.server.calls) <= self.server.throttled_calls:
+            status, body = 400, {"error": {"code": 80001, "message": "There have been too many calls"}}
+            usage = {"1": [{"type": "pages", "call_count": 100,
+                            "estimated_time_to_regain_access": self.server.regain_minutes}]}
+        else:
+            status, body = 200, {"id": "post_1"}
+            usage = {"1": [{"type": "pages", "call_count": 20}]}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("X-Business-Use-Case-Usage", json.dumps(usage))
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class TestFacebookClientThrottling(StubServerTestCase):
+    handler = ThrottlingGraph
+
+    def setUp(self):
+        super().setUp()
+        self.server.throttled_calls = 1
+        self.server.regain_minutes = 0.005
+
+    def tearDown(self):
+        close_shared_sessions()
+        super().tearDown()
+
+    def client(self):
+        fb = FacebookClient()
+        fb.base_url = self.base
+        fb.backoff_base = 0.001
+        fb.rate_limiter = GraphRateLimiter(rate=1000, burst=10)
+        return fb
+
+    def test_throttled_call_waits_and_succeeds(self):
+        fb = self.client()
+
+        resp = fb.create_post("page_1", "Happy Birthday!")
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(self.server.calls), 2)
+        self.assertGreaterEqual(self.server.calls[1] - self.server.calls[0], 0.29)
+        self.assertEqual(fb.metrics.snapshot()["retries"], 1)
+
+    def test_long_pause_returns_the_throttled_response(self):
+        ## 30 minutes until access is back: not slept through by a worker
+        self.server.regain_minutes = 30
+        fb = self.client()
+
+        started = time.monotonic()
+        resp = fb.create_post("page_1", "Happy Birthday!")
+
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()["error"]["code"], 80001)
+        self.assertEqual(len(self.server.calls), 1)
+
+        ## while the token is paused, calls give up before sending anything
+        with self.assertRaises(RateLimitExceeded):
+            fb.get_post("post_1")
+        self.assertEqual(len(self.server.calls), 1)
+
+
+
+class TestAsyncFacebookClientThrottling(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncTearDown(self):
+        await aclose_shared_clients()
+
+    async def test_paused_token_gives_up_before_sending(self):
+        fb = AsyncFacebookClient()
+        fb.base_url = "http://127.0.0.1:9"   ## nothing listens here: any attempt would fail to connect
+        fb.rate_limiter = GraphRateLimiter(rate=1000, burst=10)
+        fb.rate_limiter.bucket(fb.api_key).pause(600)
+
+        with self.assertRaises(RateLimitExceeded):
+            await fb.get_post("post_1")
+        self.assertEqual(fb.metrics.snapshot()["attempts"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,9 @@
+import json
 import unittest
 from unittest.mock import patch, MagicMock
+
+import requests
+
 from src.integrations.sendgrid_client import SendGridClient
 ## python -m unittest -v src.tests.test_sendgrid_client
 ## python -m unittest -v src/tests/test_sendgrid_client.py
@@ -64,5 +68,84 @@ class TestSendGridClient(unittest.TestCase):
         self.assertEqual(resp.json()["message"], "Template deleted")
         mock_delete.assert_called_once()
 
+
+class TestSendGridBatch(unittest.TestCase):
+
+    @staticmethod
+    def accepted(message_id="msg"):
+        fake_response = MagicMock()
+        fake_response.status_code = 202
+        fake_response.headers = {"X-Message-Id": message_id}
+        return fake_response
+
+    @patch("src.integrations.sendgrid_client.BaseAPIClient.post")
+    def test_packs_1000_personalizations_per_request(self, mock_post):
+        mock_post.return_value = self.accepted()
+        recipients = [{"email": f"lead{i}@example.com", "substitutions": {"-name-": f"Lead {i}"}, "key": i}
+                      for i in range(2500)]
+
+        outcomes = SendGridClient().send_batch("from@example.com", "Hi -name-", "Hello -name-", recipients)
+
+        self.assertEqual(mock_post.call_count, 3)
+        sizes = [len(call.kwargs["json"]["personalizations"]) for call in mock_post.call_args_list]
+        self.assertEqual(sizes, [1000, 1000, 500])
+        first = mock_post.call_args_list[0].kwargs["json"]["personalizations"][0]
+        self.assertEqual(first, {"to": [{"email": "lead0@example.com"}], "substitutions": {"-name-": "Lead 0"}})
+        self.assertEqual(len(outcomes), 2500)
+        self.assertTrue(all(o.accepted and o.message_id == "msg" for o in outcomes))
+        self.assertEqual([o.key for o in outcomes], list(range(2500)))
+
+    @patch("src.integrations.sendgrid_client.BaseAPIClient.post")
+    def test_splits_on_payload_size(self, mock_post):
+        mock_post.return_value = self.accepted()
+        recipients = [{"email": f"lead{i}@example.com", "substitutions": {"-bio-": "x" * 1000}} for i in range(30)]
+
+        SendGridClient().send_batch("from@example.com", "Hi", "Body", recipients, max_payload_bytes=10_000)
+
+        self.assertGreater(mock_post.call_count, 3)
+        for call in mock_post.call_args_list:
+            self.assertLessEqual(len(json.dumps(call.kwargs["json"]).encode()), 10_000)
+        sent = sum(len(call.kwargs["json"]["personalizations"]) for call in mock_post.call_args_list)
+        self.assertEqual(sent, 30)
+
+    @patch("src.integrations.sendgrid_client.BaseAPIClient.post")
+    def test_per_recipient_outcomes(self, mock_post):
+        rejected = MagicMock()
+        rejected.status_code = 400
+        rejected.headers = {}
+        rejected.text = '{"errors": [{"message": "bad"}]}'
+        mock_post.side_effect = [self.accepted("m1"), rejected, requests.ConnectionError("down")]
+        recipients = [
+            {"email": "a@example.com"}, {"email": "b@example.com"},
+            {"email": "not-an-email"}, {"email": "A@example.com"},
+            {"email": "c@example.com"}, {"email": "d@example.com"}, {"email": "e@example.com"},
+        ]
+
+        outcomes = SendGridClient().send_batch("from@example.com", "Hi", "Body", recipients, max_personalizations=2)
+
+        self.assertEqual([o.status for o in outcomes],
+                         ["accepted", "accepted", "invalid", "duplicate", "rejected", "rejected", "rejected"])
+        self.assertEqual(outcomes[0].message_id, "m1")
+        self.assertEqual(outcomes[4].http_status, 400)
+        self.assertIn("bad", outcomes[4].error)
+        self.assertEqual(outcomes[5].http_status, 400)
+        self.assertIsNone(outcomes[6].http_status)
+        self.assertIn("down", outcomes[6].error)
+
+    @patch("src.integrations.sendgrid_client.BaseAPIClient.post")
+    def test_dynamic_template_data(self, mock_post):
+        mock_post.return_value = self.accepted()
+
+        SendGridClient().send_batch("from@example.com", "Hi", None,
+                                    [{"email": "a@example.com", "name": "A", "substitutions": {"first": "A"}}],
+                                    template_id="d-123")
+
+        payload = mock_post.call_args.kwargs["json"]
+        self.assertEqual(payload["template_id"], "d-123")
+        self.assertNotIn("content", payload)
+        self.assertEqual(payload["personalizations"],
+                         [{"to": [{"email": "a@example.com", "name": "A"}], "dynamic_template_data": {"first": "A"}}])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+from src.integrations.webpush_client import WebPushClient
+from src.tests.stub_server import StubHandler, StubServerTestCase
+## python -m unittest -v src.tests.test_webpush_client
+
+
+class StubPushService(StubHandler):
+    ## 410 under /gone/, 404 under /missing/, 201 otherwise; (path, headers) per request in server.calls
+
+    def do_POST(self):
+        with self.tracked() as server:
+            with server.lock:
+                server.calls.append((self.path, dict(self.headers)))
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+            status = 410 if self.path.startswith("/gone/") else 404 if self.path.startswith("/missing/") else 201
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+
+class TestWebPushClient(StubServerTestCase):
+    handler = StubPushService
+
+    def test_send_many_reports_every_subscription(self):
+        subscriptions = [(i, f"{self.base}/{'gone' if i % 10 == 0 else 'push'}/{i}") for i in range(200)]
+
+        with WebPushClient(max_workers=4) as client:
+            results = list(client.send_many(iter(subscriptions)))
+
+        self.assertEqual(sorted(r.key for r in results), list(range(200)))
+        self.assertEqual(sum(r.ok for r in results), 180)
+        self.assertEqual(sorted(r.key for r in results if r.gone), list(range(0, 200, 10)))
+
+    def test_connections_are_reused_and_bounded(self):
+        subscriptions = ((i, f"{self.base}/push/{i}") for i in range(300))
+
+        with WebPushClient(max_workers=4) as client:
+            results = list(client.send_many(subscriptions))
+
+        self.assertEqual(len(results), 300)
+        self.assertLessEqual(self.server.max_in_flight, 4)
+        self.assertLessEqual(len(self.server.connections), 4)
+
+    def test_push_headers(self):
+        with WebPushClient(ttl=60, urgency="high") as client:
+            result = client.send(f"{self.base}/push/1", key="a")
+
+        self.assertTrue(result.ok)
+        self.assertEqual(result.status, 201)
+        path, headers = self.server.calls[0]
+        self.assertEqual(path, "/push/1")
+        self.assertEqual(headers["TTL"], "60")
+        self.assertEqual(headers["Urgency"], "high")
+        self.assertEqual(headers["Content-Length"], "0")
+        self.assertNotIn("Authorization", headers)
+
+    def test_404_counts_as_gone(self):
+        with WebPushClient() as client:
+            result = client.send(f"{self.base}/missing/1")
+        self.assertTrue(result.gone)
+        self.assertFalse(result.ok)
+
+    def test_network_error_is_a_result(self):
+        with WebPushClient(timeout=1) as client:
+            result = client.send("http://127.0.0.1:9/push/1", key=7)
+        self.assertIsNone(result.status)
+        self.assertFalse(result.ok)
+        self.assertFalse(result.gone)
+        self.assertEqual(result.key, 7)
+
+    def test_vapid_authorization(self):
+        key = ec.generate_private_key(ec.SECP256R1())
+        pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption()).decode()
+
+        with WebPushClient(vapid_private_key=pem, vapid_public_key="BPub", vapid_subject="mailto:ops@example.com") as client:
+            self.assertTrue(client.send(f"{self.base}/push/1").ok)
+            self.assertTrue(client.send(f"{self.base}/push/2").ok)
+
+        headers = [h["Authorization"] for _, h in self.server.calls]
+        self.assertEqual(headers[0], headers[1])   ## signed once per host
+        token, public = headers[0][len("vapid t="):].split(", k=")
+        self.assertEqual(public, "BPub")
+        claims = jwt.decode(token, key.public_key(), algorithms=["ES256"], audience=self.base)
+        self.assertEqual(claims["sub"], "mailto:ops@example.com")
+
+    def test_unusable_vapid_key_fails_at_construction(self):
+        rsa_pem = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+        ).decode()
+        for pem in ("not a key", rsa_pem):
+            with self.subTest(pem=pem[:20]), self.assertRaises(ValueError):
+                WebPushClient(vapid_private_key=pem, vapid_public_key="BPub")
+
+
+
+if __name__ == "__main__":
+    unittest.main()